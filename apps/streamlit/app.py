@@ -7,6 +7,7 @@ import json
 import math
 from pathlib import Path
 import sys
+import time
 import uuid
 
 import streamlit as st
@@ -17,11 +18,32 @@ if str(REPO_ROOT) not in sys.path:
 
 from apps.streamlit.dsl_render_utils import dsl_to_highlighted_html, infer_message_sigil
 from apps.streamlit.vars_panel_v02 import resolve_vars_panel_data
-from chatdsl_core.parser_v02 import ParseError, parse_program, program_to_dicts
+from chatdsl_core.parser_v02 import ParseError, Program, parse_program, program_to_dicts
+from chatdsl_core.checkpoint_v02 import CheckpointObserver, ExecutionCheckpoint
 from chatdsl_core.executor_v02 import execute_program
+from chatdsl_core.jobs_v02 import Job, JobManager
 from chatdsl_core.model_adapters_v02 import make_gemini_caller, make_gemini_cheap_caller
-from chatdsl_core.gemini_client_v02 import call_gemini
+from chatdsl_core.gemini_client_v02 import call_gemini_detailed
+from chatdsl_core.generation_v02 import GenerationPolicy
+from chatdsl_core.blob_store_v02 import gc_blobs
+from chatdsl_core.metrics_v02 import (
+    MetricsObserver,
+    RuntimeMetrics,
+    serve_metrics,
+    write_metrics_file,
+)
+from chatdsl_core.observers_v02 import ExecutionObserver
+from chatdsl_core.recovery_v02 import RecoveryPolicy
+from chatdsl_core.log_retention_v02 import (
+    RETENTION_LEVELS,
+    compact_execution_logs,
+    load_log_text,
+    referenced_blob_digests,
+    resolve_log_retention,
+)
 from chatdsl_core.state_store_v02 import load_chats, save_chats
+from chatdsl_core.trace_export_v02 import chrome_trace_json
+from chatdsl_core.usage_v02 import summarize_chat_usage, summarize_log_usage
 from chatdsl_core.versioning_v02 import (
     backfill_history_metadata,
     build_edit_run_context,
@@ -32,6 +54,19 @@ from chatdsl_core.versioning_v02 import (
     next_version_for_thread,
     project_visible_history,
 )
+from chatdsl_core.var_snapshots_v02 import (
+    index_messages_by_id,
+    record_vars_snapshots,
+    resolve_vars_snapshot,
+)
+from chatdsl_core.value_store_v02 import (
+    externalize_large_values,
+    gc_values,
+    is_value_ref,
+    read_value_prefix,
+    referenced_value_digests,
+    value_size_bytes,
+)
 
 
 GRUVBOX_DARK_CSS = """
@@ -668,7 +703,12 @@ def _render_dsl_text(text: object, sigil: str = "@", preview: bool = False) -> N
 
 
 def _format_var_preview(value: object, max_len: int = 140) -> str:
-    if isinstance(value, str):
+    if is_value_ref(value):
+        try:
+            preview = read_value_prefix(value, max_len + 1).replace("\n", "\\n")
+        except ValueError:
+            preview = "(stored value missing)"
+    elif isinstance(value, str):
         preview = value.replace("\n", "\\n")
     elif isinstance(value, (dict, list, tuple)):
         try:
@@ -683,6 +723,8 @@ def _format_var_preview(value: object, max_len: int = 140) -> str:
 
 
 def _approx_token_count(value: object) -> int:
+    if is_value_ref(value):
+        return value_size_bytes(value) // 4
     if isinstance(value, str):
         return len(value) // 4
     if isinstance(value, (dict, list, tuple)):
@@ -709,20 +751,59 @@ def _format_trace_path(node_path: object) -> str:
     return "-"
 
 
+def _format_ms(seconds: object) -> str:
+    if isinstance(seconds, (int, float)):
+        return f"{seconds * 1000:.1f}"
+    return "-"
+
+
+def _run_timings(meta: dict) -> dict | None:
+    """A run's saved timings plus its save time, known only to the session that ran it."""
+    timings = meta.get("run_timings")
+    if not isinstance(timings, dict):
+        return None
+    persist_s = st.session_state.get("persist_s_by_run", {}).get(meta.get("run_id"))
+    return timings if persist_s is None else {**timings, "persist_s": persist_s}
+
+
+def _format_usage(usage: dict, scope: str) -> str:
+    text = (
+        f"{usage['calls']} model calls in {scope} · "
+        f"{usage['prompt_tokens']} prompt / {usage['candidates_tokens']} output tokens"
+    )
+    if usage["cached_tokens"]:
+        text += f" ({usage['cached_tokens']} cached)"
+    if usage["retries"]:
+        text += f" · {usage['retries']} retries"
+    return text
+
+
 def _trace_rows(logs: list[dict]) -> list[dict]:
     rows: list[dict] = []
     for log in logs:
         if not isinstance(log, dict):
             continue
         kind = str(log.get("node_kind", ""))
+        timings = log.get("timings") if isinstance(log.get("timings"), dict) else {}
         if kind == "step":
+            status = log.get("execution", "")
+            recovery = log.get("recovery") if isinstance(log.get("recovery"), dict) else {}
+            if recovery.get("retries"):
+                status += f" after {len(recovery['retries'])} retry(s)"
+            elif recovery.get("repairs"):
+                status += " (repaired)"
             rows.append(
                 {
                     "Path": _format_trace_path(log.get("node_path")),
                     "Kind": "step",
-                    "Status": log.get("execution", ""),
+                    "Status": status,
                     "Line": log.get("start_line_no", ""),
                     "Summary": log.get("text", ""),
+                    "Start ms": _format_ms(timings.get("started_at_s")),
+                    "Prefilters ms": _format_ms(timings.get("prefilters_s")),
+                    "Model ms": _format_ms(timings.get("model_call_s")),
+                    "Total ms": _format_ms(timings.get("total_s")),
+                    "Tokens": (log.get("model_call") or {}).get("usage", {}).get("total_tokens", "-"),
                 }
             )
             continue
@@ -734,11 +815,78 @@ def _trace_rows(logs: list[dict]) -> list[dict]:
                     "Status": log.get("execution", ""),
                     "Line": log.get("start_line_no", ""),
                     "Summary": f"{log.get('condition_var')}={log.get('condition_value')}",
+                    "Start ms": _format_ms(timings.get("started_at_s")),
+                    "Prefilters ms": "-",
+                    "Model ms": "-",
+                    "Total ms": _format_ms(timings.get("total_s")),
+                    "Tokens": "-",
                 }
             )
     return rows
 
 
+def _render_log_blobs(log: dict, key_prefix: str) -> None:
+    for field, label in (("prompt", "Full prompt"), ("raw_response", "Raw response")):
+        ref = log.get(f"{field}_ref")
+        if not isinstance(ref, dict):
+            continue
+        if not ref.get("stored"):
+            st.caption(f"{label} not retained ({ref.get('chars', '?')} chars).")
+            continue
+        if st.checkbox(f"Load {label.lower()}", key=f"blob_{key_prefix}_{field}"):
+            text = load_log_text(log, field)
+            if text is None:
+                st.caption(f"{label} is no longer in the blob store.")
+            else:
+                st.code(text, language="text")
+
+
+@st.cache_resource
+def _runtime_metrics() -> RuntimeMetrics:
+    metrics = RuntimeMetrics()
+    port = os.environ.get("CHATDSL_METRICS_PORT", "").strip()
+    if port:
+        serve_metrics(int(port), registry=metrics.registry)
+    return metrics
+
+
+def _export_metrics(metrics: RuntimeMetrics) -> None:
+    path = os.environ.get("CHATDSL_METRICS_FILE", "").strip()
+    if path:
+        write_metrics_file(path, registry=metrics.registry)
+
+
+def _render_trace_download(logs: list, run_timings: object, run_id: object, key: str) -> None:
+    if not logs:
+        return
+    # Popovers render eagerly, so the trace is only built once asked for, and once per run.
+    if not st.checkbox("Prepare trace (Chrome/Perfetto)", key=f"trace_prepare_{key}"):
+        return
+    cache = st.session_state.setdefault("trace_json_by_run", {})
+    cache_key = run_id or key
+    if cache_key not in cache:
+        cache[cache_key] = chrome_trace_json(
+            logs, run_timings if isinstance(run_timings, dict) else None
+        )
+    st.download_button(
+        "Download trace",
+        data=cache[cache_key],
+        file_name=f"chatdsl-trace-{run_id or 'run'}.json",
+        mime="application/json",
+        key=f"trace_{key}",
+    )
+
+
+@st.cache_resource
+def _job_manager() -> JobManager:
+    return JobManager()
+
+
+def _session_id() -> str:
+    """Owner of this browser session's jobs; the job manager is shared by every session."""
+    return st.session_state.setdefault("session_id", new_message_id("session"))
+
+
 def _run_dsl(
     input_text: str,
     use_gemini: bool,
@@ -753,6 +901,9 @@ def _run_dsl(
 ) -> None:
     if input_text.strip() == "":
         return
+    if active_chat.get("pending_job_ids"):
+        st.warning("A run is still in progress in this chat. Send again once it finishes.")
+        return
 
     user_message_id = new_message_id("msg")
     run_id = new_message_id("run")
@@ -777,58 +928,244 @@ def _run_dsl(
         vars_before = dict(edit_context.vars_before)
         execution_history = list(edit_context.visible_history_before)
         source_cutoff_index = edit_context.source_cutoff_index
+        if source_cutoff_index is None:
+            source_cutoff_index = cutoff_index_for_version_view(chat_history, edited_from_id)
 
+    run_started = time.perf_counter()
     try:
         program = parse_program(input_text, sigil=sigil, predeclared_vars=vars_before.keys())
     except ParseError as e:
         st.error(f"Parse error: {e}")
         st.stop()
+    parse_done = time.perf_counter()
 
-    ctx = dict(vars_before)
     chat_lines = _timeline_chat_lines(execution_history)
     if input_text.strip():
         chat_lines.append(input_text)
-    try:
-        call_model = None
-        cheap_model_call = None
-        if use_gemini:
-            call_model = make_gemini_caller(model=model, timeout_s=timeout_s)
-            cheap_model_call = make_gemini_cheap_caller(model=cheap_model, timeout_s=timeout_s)
+    active_chat.pop("failed_run", None)
+    _submit_dsl_job(
+        active_chat,
+        program,
+        chat_lines,
+        use_gemini,
+        timeout_s,
+        model,
+        cheap_model,
+        payload={
+            "input_text": input_text,
+            "sigil": sigil,
+            "user_message_id": user_message_id,
+            "run_id": run_id,
+            "thread_id": thread_id,
+            "version": version,
+            "edited_from_id": edited_from_id,
+            "source_cutoff_index": source_cutoff_index,
+            "history_len": len(chat_history),
+            "vars_before": vars_before,
+            "steps": program_to_dicts(program),
+            "parse_s": round(parse_done - run_started, 6),
+        },
+    )
+
+
+def _submit_dsl_job(
+    chat: dict,
+    program: Program,
+    chat_lines: list[str],
+    use_gemini: bool,
+    timeout_s: float,
+    model: str | None,
+    cheap_model: str | None,
+    payload: dict,
+    resume_from: ExecutionCheckpoint | None = None,
+) -> None:
+    metrics = _runtime_metrics()
+    call_model = None
+    cheap_model_call = None
+    if use_gemini:
+        call_model = make_gemini_caller(model=model, timeout_s=timeout_s)
+        cheap_model_call = make_gemini_cheap_caller(model=cheap_model, timeout_s=timeout_s)
+    # Session state is only readable from the script thread.
+    prefetch_prefilters = bool(st.session_state.get("prefetch_prefilters", True))
+    recovery = RecoveryPolicy(max_retries=int(st.session_state.get("repair_retries", 1)))
+    generation = GenerationPolicy() if st.session_state.get("budget_output_tokens", False) else None
+    checkpointer = CheckpointObserver(resume_from)
+    vars_before = payload["vars_before"]
+
+    def work(progress: ExecutionObserver) -> tuple:
+        started = time.perf_counter()
         ctx, logs, outputs = execute_program(
             program,
-            ctx,
+            dict(vars_before),
             call_model=call_model,
             chat_history=chat_lines,
             cheap_model_call=cheap_model_call,
+            prefetch_prefilters=prefetch_prefilters,
+            observers=[MetricsObserver(metrics), progress, checkpointer],
+            resume_from=resume_from,
+            recovery=recovery,
+            generation=generation,
         )
-    except Exception as e:
-        st.error(f"Execution error: {e}")
-        st.stop()
+        return ctx, logs, outputs, time.perf_counter() - started
+
+    job_id = _job_manager().submit(
+        chat["id"], work, payload={**payload, "checkpointer": checkpointer}, owner=_session_id()
+    )
+    chat.setdefault("pending_job_ids", []).append(job_id)
+    # Saved with the chat and advanced as steps finish, so a restart can resume the run.
+    chat["running_run"] = {
+        "job_id": job_id,
+        "payload": {**payload, "vars_before": externalize_large_values(vars_before)},
+        "checkpoint": resume_from.to_dict() if resume_from is not None else None,
+        "logs_count": len(resume_from.logs) if resume_from is not None else 0,
+    }
+
+
+def _stored_checkpoint(checkpoint: ExecutionCheckpoint, state: dict, chat: dict) -> dict:
+    """The checkpoint as saved in chat state: compacted logs, large values in the value store."""
+    stored = ExecutionCheckpoint(
+        node_path=checkpoint.node_path,
+        initial_vars=externalize_large_values(checkpoint.initial_vars),
+        commits=[
+            {**commit, "updates": externalize_large_values(commit["updates"])}
+            for commit in checkpoint.commits
+        ],
+        logs=compact_execution_logs(checkpoint.logs, resolve_log_retention(state, chat)),
+        error=checkpoint.error,
+    )
+    return stored.to_dict()
+
+
+def _record_run_progress(job: Job, chat: dict, state: dict) -> None:
+    running = chat.get("running_run")
+    progress = job.payload["checkpointer"].progress
+    if not running or running["job_id"] != job.job_id or progress is None:
+        return
+    if len(progress.logs) == running["logs_count"]:
+        return
+    running["checkpoint"] = _stored_checkpoint(progress, state, chat)
+    running["logs_count"] = len(progress.logs)
+    save_chats(state)
+
+
+def _interrupted_run(chat: dict, job_id: str, reason: str = "interrupted by an app restart") -> bool:
+    """Turn the saved progress of a run whose result is gone into a resumable failed run."""
+    running = chat.get("running_run")
+    if not running or running["job_id"] != job_id:
+        return False
+    chat.pop("running_run")
+    checkpoint = running["checkpoint"]
+    if checkpoint is None:
+        checkpoint = ExecutionCheckpoint(
+            node_path=[0], initial_vars=running["payload"]["vars_before"]
+        ).to_dict()
+    chat["failed_run"] = {
+        "payload": running["payload"],
+        "checkpoint": checkpoint,
+        "error": reason,
+    }
+    return True
 
-    steps_dicts = program_to_dicts(program)
+
+def _resume_dsl_run(
+    chat: dict,
+    use_gemini: bool,
+    timeout_s: float,
+    model: str | None,
+    cheap_model: str | None,
+) -> None:
+    failed_run = chat.pop("failed_run")
+    payload = failed_run["payload"]
+    checkpoint = ExecutionCheckpoint.from_dict(failed_run["checkpoint"])
+    chat_history = chat["history"]
+    # History is append-only, so the run sees the same timeline it failed on.
+    if payload["edited_from_id"]:
+        edit_context = build_edit_run_context(chat_history, payload["edited_from_id"])
+        execution_history = list(edit_context.visible_history_before)
+    else:
+        execution_history = chat_history[: payload["history_len"]]
+    chat_lines = _timeline_chat_lines(execution_history)
+    chat_lines.append(payload["input_text"])
+    program = parse_program(
+        payload["input_text"],
+        sigil=payload["sigil"],
+        predeclared_vars=payload["vars_before"].keys(),
+    )
+    _submit_dsl_job(
+        chat,
+        program,
+        chat_lines,
+        use_gemini,
+        timeout_s,
+        model,
+        cheap_model,
+        payload=payload,
+        resume_from=checkpoint,
+    )
+
+
+def _finish_dsl_job(job: Job, chat: dict, state: dict) -> None:
+    payload = job.payload
+    if chat.get("running_run", {}).get("job_id") == job.job_id:
+        chat.pop("running_run")
+    if job.status == "failed":
+        toast = getattr(st, "toast", None) or st.error
+        toast(f"Execution error in {chat.get('name', 'chat')}: {job.error}")
+        # Kept on the chat so the error outlives this rerun; resumable when checkpointed.
+        checkpoint = payload["checkpointer"].checkpoint
+        stored_payload = {key: value for key, value in payload.items() if key != "checkpointer"}
+        stored_payload["vars_before"] = externalize_large_values(payload["vars_before"])
+        chat["failed_run"] = {
+            "payload": stored_payload,
+            "checkpoint": _stored_checkpoint(checkpoint, state, chat) if checkpoint is not None else None,
+            "error": job.error,
+        }
+        return
+    ctx, logs, outputs, execute_s = job.result
+    chat_history = chat["history"]
+    user_message_id = payload["user_message_id"]
+    run_id = payload["run_id"]
+    steps_dicts = payload["steps"]
+
+    metrics = _runtime_metrics()
+    vars_before = externalize_large_values(payload["vars_before"])
+    ctx = externalize_large_values(ctx)
+    logs = compact_execution_logs(logs, resolve_log_retention(state, chat))
 
     user_meta = {
-        "thread_id": thread_id,
-        "version": version,
+        "thread_id": payload["thread_id"],
+        "version": payload["version"],
         "run_id": run_id,
         "parsed_steps": steps_dicts,
         "execution_logs": logs,
-        "vars_before": vars_before,
-        "vars_after": ctx,
+        "run_timings": {
+            "parse_s": payload["parse_s"],
+            "execute_s": round(execute_s, 6),
+        },
     }
-    if edited_from_id:
-        user_meta["edited_from_message_id"] = edited_from_id
-        user_meta["source_cutoff_index"] = (
-            cutoff_index_for_version_view(chat_history, edited_from_id)
-            if source_cutoff_index is None
-            else source_cutoff_index
-        )
+    # Delta-encode against the previous run in this message's own edit branch.
+    if payload["edited_from_id"]:
+        timeline = build_edit_run_context(chat_history, payload["edited_from_id"]).visible_history_before
+    else:
+        timeline = project_visible_history(chat_history)
+    record_vars_snapshots(
+        chat_history,
+        user_message_id,
+        user_meta,
+        vars_before,
+        ctx,
+        timeline=timeline,
+        messages_by_id=index_messages_by_id(chat_history),
+    )
+    if payload["edited_from_id"]:
+        user_meta["edited_from_message_id"] = payload["edited_from_id"]
+        user_meta["source_cutoff_index"] = payload["source_cutoff_index"]
 
     chat_history.append(
         {
             "id": user_message_id,
             "role": "user",
-            "content": input_text,
+            "content": payload["input_text"],
             "mode": "dsl",
             "meta": user_meta,
         }
@@ -862,21 +1199,103 @@ def _run_dsl(
                     "source_user_message_id": user_message_id,
                     "parsed_steps": steps_dicts,
                     "execution_logs": logs,
-                    "vars_after": ctx,
                 },
             }
         )
-    active_chat["vars"] = ctx
+    chat["vars"] = ctx
+    persist_started = time.perf_counter()
     save_chats(state)
+    # Only known once the save is done, so it stays in the session, not the record.
+    persist_s = round(time.perf_counter() - persist_started, 6)
+    st.session_state.setdefault("persist_s_by_run", {})[run_id] = persist_s
+    metrics.record_run_timings({**user_meta["run_timings"], "persist_s": persist_s})
+    _export_metrics(metrics)
 
     last_runs = st.session_state.setdefault("last_run_by_chat", {})
-    last_runs[active_chat["id"]] = {
+    last_runs[chat["id"]] = {
         "steps": steps_dicts,
         "logs": logs,
         "vars": ctx,
     }
 
 
+def _collect_dsl_jobs(state: dict) -> None:
+    """Hand finished background runs back into their chats; runs only on the script thread."""
+    jobs = _job_manager()
+    dirty = False
+    for chat in state.get("chats", []):
+        pending = chat.get("pending_job_ids")
+        if not pending:
+            continue
+        # Job ids are saved with the chat, so other sessions see them; only the owner claims.
+        handoff = jobs.collect(list(pending), owner=_session_id())
+        for job_id in handoff.claimed_elsewhere:
+            pending.remove(job_id)
+            if chat.get("running_run", {}).get("job_id") == job_id:
+                chat.pop("running_run")
+            dirty = True
+        for job_id in handoff.lost:
+            pending.remove(job_id)
+            dirty = True
+            if _interrupted_run(chat, job_id):
+                st.warning(
+                    f"A run in {chat.get('name', 'chat')} was interrupted by an app restart. "
+                    "Resume it from its last completed step."
+                )
+            else:
+                st.warning(
+                    f"A run in {chat.get('name', 'chat')} was interrupted by an app restart. Send it again."
+                )
+        for job_id in handoff.expired:
+            pending.remove(job_id)
+            dirty = True
+            if _interrupted_run(chat, job_id, "result expired before it was collected"):
+                st.warning(
+                    f"A run in {chat.get('name', 'chat')} finished but was not collected in time. "
+                    "Resume it from its last completed step."
+                )
+            else:
+                st.warning(
+                    f"A run in {chat.get('name', 'chat')} finished but was not collected in time. Send it again."
+                )
+        for job in handoff.claimed:
+            pending.remove(job.job_id)
+            dirty = True
+            _finish_dsl_job(job, chat, state)
+        if not pending:
+            chat.pop("pending_job_ids", None)
+    if dirty:
+        save_chats(state)
+
+
+def _render_pending_runs(active_chat_id: str) -> None:
+    jobs = _job_manager()
+    finished = False
+    for chat in st.session_state.chats_state.get("chats", []):
+        for job_id in chat.get("pending_job_ids", []):
+            job = jobs.get(job_id)
+            if job is None or job.finished:
+                # Another session's finished job is left for that session to claim.
+                finished = finished or job is None or job.owner in (None, _session_id())
+                continue
+            if job.owner == _session_id():
+                _record_run_progress(job, chat, st.session_state.chats_state)
+            if chat.get("id") != active_chat_id:
+                continue
+            with st.chat_message("user"):
+                _render_dsl_text(job.payload["input_text"], sigil=job.payload["sigil"])
+            with st.chat_message("assistant"):
+                for out in job.partial_outputs:
+                    st.write(out)
+                if job.status == "queued":
+                    st.caption("Queued…")
+                else:
+                    st.caption(f"Running… {job.steps_done} step(s) done")
+    if finished:
+        # A full rerun lets `_collect_dsl_jobs` hand the result into the chat.
+        st.rerun()
+
+
 def _run_raw(
     raw_text: str,
     timeout_s: float,
@@ -887,11 +1306,12 @@ def _run_raw(
     if raw_text.strip() == "":
         return
     try:
-        response_text = call_gemini(raw_text, model=model, timeout_s=timeout_s)
+        result = call_gemini_detailed(raw_text, model=model, timeout_s=timeout_s)
     except Exception as e:
         st.error(f"Execution error: {e}")
         st.stop()
 
+    response_text = result.text
     run_id = new_message_id("run")
     user_message_id = new_message_id("msg")
     chat_history.append(
@@ -913,6 +1333,7 @@ def _run_raw(
                 "run_id": run_id,
                 "source_user_message_id": user_message_id,
                 "raw_response": response_text,
+                "model_call": result.metadata(),
             },
         }
     )
@@ -921,12 +1342,15 @@ def _run_raw(
 if "chats_state" not in st.session_state:
     st.session_state.chats_state = load_chats()
 state = st.session_state.chats_state
+_collect_dsl_jobs(state)
 active_chat = _ensure_active_chat(state)
 chat_history = active_chat["history"]
 chat_vars = active_chat["vars"]
 
 if backfill_history_metadata(chat_history):
     save_chats(state)
+# Built once per render; snapshot lookups and source-message lookups below reuse it.
+messages_by_id = index_messages_by_id(chat_history)
 
 if (
     st.session_state.get("edit_target_chat_id") is not None
@@ -1056,6 +1480,31 @@ with st.sidebar:
     dsl_sigil = "@"
     if mode == "Use DSL":
         use_gemini = st.toggle("Run executor (turn off for debugging)", value=True)
+        st.toggle(
+            "Prefetch prefilters",
+            value=True,
+            key="prefetch_prefilters",
+            help="Start the next step's /FROM ... /IN prefilters while the current step's model call runs.",
+        )
+        st.number_input(
+            "Repair retries per step",
+            min_value=0,
+            max_value=3,
+            value=1,
+            step=1,
+            key="repair_retries",
+            help="Re-ask the model for a step whose reply breaks the JSON contract, quoting the error. "
+            "Fenced or wrapped JSON and losslessly convertible values are repaired without a retry.",
+        )
+        st.toggle(
+            "Budget output tokens per step",
+            value=False,
+            key="budget_output_tokens",
+            help="Cap each step's output tokens from its /DEF types and /OUT intent, and each "
+            "prefilter's from its scope size; structured-only steps also run at temperature 0. "
+            "Thinking models count thinking tokens against the cap, so replies may be cut short "
+            "and re-requested with a wider budget.",
+        )
         entered_sigil = st.text_input(
             "Sigil",
             value=st.session_state.get("dsl_sigil", "@"),
@@ -1094,6 +1543,67 @@ with st.sidebar:
         step=10,
     )
 
+    chat_usage = summarize_chat_usage(chat_history)
+    if chat_usage["calls"]:
+        st.subheader("Usage")
+        st.caption(_format_usage(chat_usage, "this chat"))
+
+    st.subheader("Storage")
+    retention_options = list(RETENTION_LEVELS)
+    global_retention = resolve_log_retention(state)
+    selected_global_retention = st.selectbox(
+        "Log retention (all chats)",
+        retention_options,
+        index=retention_options.index(global_retention),
+        help="full keeps prompts and raw responses in the blob store; truncated keeps a preview; hashes keeps only digests.",
+    )
+    if selected_global_retention != state.get("log_retention", global_retention):
+        state["log_retention"] = selected_global_retention
+        save_chats(state)
+    chat_retention_options = ["inherit", *retention_options]
+    chat_retention = active_chat.get("log_retention")
+    if chat_retention not in RETENTION_LEVELS:
+        chat_retention = "inherit"
+    selected_chat_retention = st.selectbox(
+        "Log retention (this chat)",
+        chat_retention_options,
+        index=chat_retention_options.index(chat_retention),
+    )
+    if selected_chat_retention != chat_retention:
+        if selected_chat_retention == "inherit":
+            active_chat.pop("log_retention", None)
+        else:
+            active_chat["log_retention"] = selected_chat_retention
+        save_chats(state)
+    gc_cols = st.columns([0.55, 0.45], vertical_alignment="bottom")
+    with gc_cols[0]:
+        blob_max_age_days = st.number_input(
+            "Prune blobs older than (days)", min_value=1, max_value=3650, value=30, step=1
+        )
+    with gc_cols[1]:
+        blob_budget_mb = st.number_input(
+            "Blob budget (MB, 0 = none)", min_value=0, max_value=100_000, value=0, step=50
+        )
+    if st.button(
+        "Prune unreferenced blobs",
+        use_container_width=True,
+        help="Blobs and stored variable values still referenced by a saved chat are always kept.",
+    ):
+        summary = gc_blobs(
+            max_age_s=float(blob_max_age_days) * 86400.0,
+            max_total_bytes=int(blob_budget_mb) * 1024 * 1024 if blob_budget_mb else None,
+            referenced=referenced_blob_digests(state),
+        )
+        value_summary = gc_values(
+            referenced_value_digests(state), max_age_s=float(blob_max_age_days) * 86400.0
+        )
+        st.caption(
+            f"Removed {summary['removed']} blobs ({summary['removed_bytes']} bytes); "
+            f"{summary['remaining']} remain ({summary['remaining_bytes']} bytes). "
+            f"Removed {value_summary['removed']} stored values ({value_summary['removed_bytes']} bytes); "
+            f"{value_summary['remaining']} remain ({value_summary['remaining_bytes']} bytes)."
+        )
+
     edit_msg = None
     if st.session_state.get("edit_target_chat_id") == active_chat.get("id"):
         edit_msg = _find_message_by_id(
@@ -1263,8 +1773,12 @@ if dialog_available:
             else:
                 st.caption("No assistant responses linked to this run.")
 
-        vars_before = selected_meta.get("vars_before")
-        vars_after = selected_meta.get("vars_after")
+        vars_before = resolve_vars_snapshot(
+            chat_history, selected_msg, "before", messages_by_id=messages_by_id
+        )
+        vars_after = resolve_vars_snapshot(
+            chat_history, selected_msg, "after", messages_by_id=messages_by_id
+        )
         if vars_before is not None:
             st.write("Vars Before")
             st.json(vars_before)
@@ -1394,6 +1908,7 @@ vars_data = resolve_vars_panel_data(
     active_last_run=active_last_run,
     history_view_msg=history_view_msg,
     display_history=display_history,
+    messages_by_id=messages_by_id,
 )
 
 if mode == "Use DSL" and vars_data is not None:
@@ -1448,6 +1963,17 @@ with chat_slot:
                             st.json(meta["step_log"].get("parsed_json"))
                             st.write("Execution Log")
                             st.json(meta["step_log"])
+                            _render_log_blobs(meta["step_log"], f"{active_chat['id']}_{idx}")
+                            source_meta = (
+                                messages_by_id.get(meta.get("source_user_message_id"))
+                                or {}
+                            ).get("meta", {})
+                            _render_trace_download(
+                                source_meta.get("execution_logs", []),
+                                _run_timings(source_meta),
+                                meta.get("run_id"),
+                                f"{active_chat['id']}_{idx}",
+                            )
                         elif meta and "execution_logs" in meta:
                             st.write("Parsed Program")
                             st.json(meta.get("parsed_steps"))
@@ -1455,10 +1981,34 @@ with chat_slot:
                             trace_rows = _trace_rows(meta.get("execution_logs", []))
                             if trace_rows:
                                 st.table(trace_rows)
+                            source_msg = messages_by_id.get(meta.get("source_user_message_id"))
+                            run_timings = _run_timings((source_msg or {}).get("meta", {}))
+                            run_usage = summarize_log_usage(meta.get("execution_logs", []))
+                            if run_usage["calls"]:
+                                st.caption(_format_usage(run_usage, "this run"))
+                            if isinstance(run_timings, dict):
+                                st.caption(
+                                    "Parse {} ms · execute {} ms · persist {} ms".format(
+                                        _format_ms(run_timings.get("parse_s")),
+                                        _format_ms(run_timings.get("execute_s")),
+                                        _format_ms(run_timings.get("persist_s")),
+                                    )
+                                )
+                            _render_trace_download(
+                                meta.get("execution_logs", []),
+                                run_timings,
+                                meta.get("run_id"),
+                                f"{active_chat['id']}_{idx}",
+                            )
                             st.write("Execution Logs")
                             st.json(meta.get("execution_logs"))
                             st.write("Vars After")
-                            st.json(meta.get("vars_after"))
+                            run_vars_after = meta.get("vars_after")
+                            if run_vars_after is None and source_msg is not None:
+                                run_vars_after = resolve_vars_snapshot(
+                                    chat_history, source_msg, "after", messages_by_id=messages_by_id
+                                )
+                            st.json(run_vars_after)
                         elif meta:
                             st.json(meta)
                         else:
@@ -1502,3 +2052,44 @@ with chat_slot:
                                 st.rerun()
                 else:
                     st.write(content)
+
+    failed_run = active_chat.get("failed_run")
+    if mode == "Use DSL" and failed_run and not active_chat.get("pending_job_ids"):
+        if failed_run["checkpoint"] is None:
+            st.warning(f"The last run failed: {failed_run['error']}")
+        else:
+            steps_done = ExecutionCheckpoint.from_dict(failed_run["checkpoint"]).steps_done
+            st.warning(
+                f"The last run failed after {steps_done} completed step(s): {failed_run['error']}"
+            )
+        resume_cols = st.columns(2)
+        with resume_cols[0]:
+            if failed_run["checkpoint"] is not None and st.button(
+                "Resume from failed step",
+                key=f"resume_{active_chat['id']}",
+                help="Rerun from the failed step, reusing the completed steps' results",
+                use_container_width=True,
+            ):
+                _resume_dsl_run(
+                    active_chat, use_gemini, timeout_s, selected_model, selected_cheap_model
+                )
+                save_chats(state)
+                st.rerun()
+        with resume_cols[1]:
+            if st.button(
+                "Dismiss" if failed_run["checkpoint"] is None else "Discard failed run",
+                key=f"discard_failed_{active_chat['id']}",
+                use_container_width=True,
+            ):
+                active_chat.pop("failed_run", None)
+                save_chats(state)
+                st.rerun()
+
+    if any(chat.get("pending_job_ids") for chat in state.get("chats", [])):
+        fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+        if fragment is not None:
+            # Polls every chat's runs so one finishing elsewhere is still handed off.
+            fragment(run_every=1.0)(_render_pending_runs)(active_chat["id"])
+        else:
+            _render_pending_runs(active_chat["id"])
+            st.button("Refresh run progress", key="refresh_pending_runs")
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import Any, Mapping, Sequence
 
+from chatdsl_core.var_snapshots_v02 import resolve_vars_snapshot
+
 
 def resolve_vars_panel_data(
     *,
@@ -10,17 +12,23 @@ def resolve_vars_panel_data(
     active_last_run: Mapping[str, Any] | None,
     history_view_msg: Mapping[str, Any] | None,
     display_history: Sequence[Mapping[str, Any]],
+    messages_by_id: Mapping[str, Mapping[str, Any]] | None = None,
 ) -> dict[str, Any] | None:
     if mode != "Use DSL":
         return None
 
     if history_view_msg is not None:
+        full_history = active_chat.get("history")
+        if not isinstance(full_history, Sequence):
+            full_history = display_history
         for msg in reversed(display_history):
             if msg.get("role") != "user" or msg.get("mode") != "dsl":
                 continue
-            meta = msg.get("meta", {})
-            if isinstance(meta.get("vars_after"), dict):
-                return dict(meta["vars_after"])
+            vars_after = resolve_vars_snapshot(
+                full_history, msg, "after", messages_by_id=messages_by_id
+            )
+            if vars_after is not None:
+                return vars_after
         return {}
 
     if active_last_run is not None:
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import importlib
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from chatdsl_core import executor_v02, parser_v02
+
+from . import workloads
+from .common import BenchCase, build_arg_parser, run_suite
+from .simulated_backend import sample_response
+
+
+_ARCHIVE_DIR = Path(__file__).resolve().parents[1] / "archive"
+ACTIVE = "active"
+WORKLOADS: Dict[str, Tuple[Callable[[int], workloads.Workload], Sequence[int]]] = {
+    # Every version parses plain /THEN + /OUT chains; /DEF and @refs start at v0.2.
+    "plain": (workloads.plain_steps, (10, 100, 1000)),
+    "chain": (workloads.flat_steps, (10, 100, 1000)),
+}
+
+
+@dataclass
+class DslVersion:
+    """
+    One implementation under comparison. `execute` runs parsed steps with an
+    injected model call; it is None for versions whose executor cannot take
+    one (v0.1 only calls Gemini), which are compared on parsing only.
+    """
+
+    name: str
+    parse: Callable[[str], Any]
+    execute: Optional[Callable[[Any, Callable[[str, Mapping[str, Any]], str]], Any]]
+    workloads: Sequence[str] = field(default_factory=lambda: tuple(WORKLOADS))
+
+
+def _import_isolated(directory: Path, names: Sequence[str]) -> Dict[str, ModuleType]:
+    """
+    Import top-level modules from an archive snapshot. Snapshots import their
+    siblings by bare name (`from parser_v02 import Step`), so the directory
+    goes first on sys.path and same-named modules are swapped out of
+    sys.modules for the duration, then restored.
+    """
+    saved_path = list(sys.path)
+    shadowed = {name: sys.modules.pop(name) for name in names if name in sys.modules}
+    sys.path.insert(0, str(directory))
+    try:
+        return {name: importlib.import_module(name) for name in names}
+    finally:
+        sys.path[:] = saved_path
+        for name in names:
+            sys.modules.pop(name, None)
+        sys.modules.update(shadowed)
+
+
+def _load_v01() -> DslVersion:
+    modules = _import_isolated(_ARCHIVE_DIR / "v0.1", ("example_parser",))
+    return DslVersion("v0.1", modules["example_parser"].parse_dsl, None, workloads=("plain",))
+
+
+def _load_v0x(name: str) -> DslVersion:
+    modules = _import_isolated(_ARCHIVE_DIR / name, ("parser_v02", "executor_v02"))
+    execute = modules["executor_v02"].execute_steps
+    return DslVersion(
+        name,
+        modules["parser_v02"].parse_dsl,
+        lambda steps, call_model: execute(steps, {}, call_model=call_model),
+    )
+
+
+def _load_active() -> DslVersion:
+    return DslVersion(
+        ACTIVE,
+        parser_v02.parse_dsl,
+        lambda steps, call_model: executor_v02.execute_steps(steps, {}, call_model=call_model),
+    )
+
+
+VERSIONS: Dict[str, Callable[[], DslVersion]] = {
+    "v0.1": _load_v01,
+    "v0.2": lambda: _load_v0x("v0.2"),
+    "v0.3": lambda: _load_v0x("v0.3"),
+    ACTIVE: _load_active,
+}
+
+
+def _stub_model(prompt: str, response_schema: Mapping[str, Any]) -> str:
+    return sample_response(response_schema)
+
+
+def _cases_for(version: DslVersion, workload: str, size: int) -> List[BenchCase]:
+    text, _ = WORKLOADS[workload][0](size)
+    targets: List[Tuple[str, Callable[[], Callable[[], object]]]] = [
+        ("parse", lambda: lambda: version.parse(text)),
+    ]
+    if version.execute is not None:
+        execute = version.execute
+
+        def execute_setup() -> Callable[[], object]:
+            steps = version.parse(text)
+            return lambda: execute(steps, _stub_model)
+
+        targets.append(("execute", execute_setup))
+    return [
+        BenchCase(
+            name=f"{target}/{workload}={size}/{version.name}",
+            group=workload,
+            size=size,
+            setup=setup,
+            params={"target": target, "version": version.name},
+            series=f"{target}/{workload}/{version.name}",
+        )
+        for target, setup in targets
+    ]
+
+
+def build_cases(quick: bool = False, versions: Sequence[str] = tuple(VERSIONS)) -> List[BenchCase]:
+    loaded = [VERSIONS[name]() for name in versions]
+    cases: List[BenchCase] = []
+    for workload, (_, sizes) in WORKLOADS.items():
+        for size in sizes[:1] if quick else sizes:
+            for version in loaded:
+                if workload in version.workloads:
+                    cases.extend(_cases_for(version, workload, size))
+    return cases
+
+
+def relative_to_active(results: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Median wall time of each archived case over the active version's on the same workload."""
+    active: Dict[Tuple[str, str, int], float] = {}
+    for result in results:
+        if result["params"]["version"] == ACTIVE:
+            key = (result["params"]["target"], result["group"], result["size"])
+            active[key] = result["wall_s"]["median"]
+    rows: List[Dict[str, Any]] = []
+    for result in results:
+        version = result["params"]["version"]
+        key = (result["params"]["target"], result["group"], result["size"])
+        if version == ACTIVE or not active.get(key):
+            continue
+        rows.append(
+            {
+                "target": key[0],
+                "workload": key[1],
+                "size": key[2],
+                "version": version,
+                "ratio_to_active": round(result["wall_s"]["median"] / active[key], 3),
+            }
+        )
+    return rows
+
+
+def _annotate(report: Dict[str, Any]) -> List[str]:
+    rows = relative_to_active(report["results"])
+    report["relative_to_active"] = rows
+    return [
+        f"{row['target']}/{row['workload']}={row['size']}: {row['version']} takes "
+        f"x{row['ratio_to_active']} the active time"
+        for row in rows
+    ]
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser("Parse/execute overhead of archived versions relative to the active one.")
+    parser.add_argument(
+        "--version",
+        dest="versions",
+        action="append",
+        choices=sorted(VERSIONS),
+        help="version to include (repeatable; default: all)",
+    )
+    args = parser.parse_args(argv)
+    versions = args.versions or tuple(VERSIONS)
+    if ACTIVE not in versions:
+        versions = [*versions, ACTIVE]
+    return run_suite("archive_versions", build_cases(args.quick, versions), args, annotate=_annotate)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
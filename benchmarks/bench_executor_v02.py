@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from chatdsl_core.executor_v02 import execute_program
+from chatdsl_core.parser_v02 import Program, ProgramNode, Step, parse_program
+
+from . import workloads
+from .common import BenchCase, build_arg_parser, run_suite
+from .simulated_backend import SimulatedBackend
+
+
+WORKLOADS: Dict[str, Tuple[Callable[[int], workloads.Workload], Sequence[int], bool]] = {
+    # group: (builder, sizes, compare prefetch on/off)
+    "chain": (workloads.flat_steps, (5, 25, 100), False),
+    "prefiltered": (workloads.prefiltered_steps, (5, 25, 100), True),
+    "if_depth": (workloads.nested_ifs, (4, 16, 64), False),
+    "from_items": (workloads.many_from_items, (4, 16, 64), False),
+}
+_SCOPE_TEXT = "\n".join(f"fact {index}: something worth knowing" for index in range(40))
+
+
+def _count_steps(program: Program) -> int:
+    def walk(items: List[ProgramNode]) -> int:
+        return sum(1 if isinstance(item, Step) else walk(item.items) for item in items)
+
+    return walk(program.items)
+
+
+def _initial_context(predeclared: Sequence[str]) -> Dict[str, Any]:
+    return {name: True if name.startswith("g") else _SCOPE_TEXT for name in predeclared}
+
+
+def _case(
+    group: str,
+    size: int,
+    prefetch: bool,
+    step_latency: str,
+    cheap_latency: str,
+) -> BenchCase:
+    builder = WORKLOADS[group][0]
+    text, predeclared = builder(size)
+    program = parse_program(text, predeclared_vars=predeclared)
+    steps = _count_steps(program)
+
+    def setup() -> Callable[[], Dict[str, Any]]:
+        backend = SimulatedBackend(step_latency=step_latency, cheap_latency=cheap_latency, seed=size)
+
+        def run() -> Dict[str, Any]:
+            backend.reset()
+            started = time.perf_counter()
+            _, logs, _ = execute_program(
+                program,
+                _initial_context(predeclared),
+                call_model=backend.call_model,
+                cheap_model_call=backend.cheap_model_call,
+                prefetch_prefilters=prefetch,
+            )
+            wall = time.perf_counter() - started
+            speculative = sum(
+                1
+                for log in logs
+                for prefilter in log.get("prefilter_logs", [])
+                if prefilter.get("speculative")
+            )
+            return {
+                "steps": steps,
+                "model_calls": backend.step_calls,
+                "cheap_calls": backend.cheap_calls,
+                "critical_path_sleep_s": round(backend.main_thread_sleep_s, 6),
+                "overlapped_sleep_s": round(backend.background_sleep_s, 6),
+                "executor_overhead_s": round(max(0.0, wall - backend.main_thread_sleep_s), 6),
+                "speculative_prefilters": speculative,
+            }
+
+        return run
+
+    mode = "prefetch" if prefetch else "serial"
+    return BenchCase(
+        name=f"execute_program/{group}={size}/{mode}",
+        group=group,
+        size=size,
+        setup=setup,
+        params={"prefetch": prefetch, "step_latency": step_latency, "cheap_latency": cheap_latency},
+        units=steps,
+    )
+
+
+def build_cases(
+    quick: bool = False,
+    step_latency: str = "fixed:0.002",
+    cheap_latency: str = "fixed:0.001",
+) -> List[BenchCase]:
+    cases: List[BenchCase] = []
+    for group, (_, sizes, compare_prefetch) in WORKLOADS.items():
+        for size in sizes[:1] if quick else sizes:
+            cases.append(_case(group, size, False, step_latency, cheap_latency))
+            if compare_prefetch:
+                cases.append(_case(group, size, True, step_latency, cheap_latency))
+    return cases
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser("Executor benchmarks against a simulated-latency model backend.")
+    parser.add_argument(
+        "--step-latency",
+        default="fixed:0.002",
+        help="main model latency: zero, fixed:S, uniform:LO,HI or lognormal:MU,SIGMA",
+    )
+    parser.add_argument("--cheap-latency", default="fixed:0.001", help="prefilter model latency")
+    args = parser.parse_args(argv)
+    cases = build_cases(
+        quick=args.quick, step_latency=args.step_latency, cheap_latency=args.cheap_latency
+    )
+    return run_suite("executor_v02", cases, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from chatdsl_core.parser_v02 import _validate_program, parse_dsl, parse_program, program_to_dicts
+
+from . import workloads
+from .common import BenchCase, build_arg_parser, run_suite
+
+
+SIZES: Dict[str, Tuple[Callable[[int], workloads.Workload], Sequence[int], bool]] = {
+    # group: (builder, sizes, flat program so parse_dsl applies)
+    "steps": (workloads.flat_steps, (10, 100, 1000, 5000), True),
+    "if_depth": (workloads.nested_ifs, (4, 16, 64, 256), False),
+    "as_lines": (workloads.long_as_body, (10, 100, 1000, 10000), True),
+    "from_items": (workloads.many_from_items, (4, 16, 64, 256), True),
+    "predeclared": (workloads.many_predeclared, (10, 1000, 10000, 100000), True),
+}
+
+
+def _cases_for(group: str, size: int) -> List[BenchCase]:
+    builder, _, flat = SIZES[group]
+    text, predeclared = builder(size)
+
+    def parse_setup() -> Callable[[], object]:
+        return lambda: parse_program(text, predeclared_vars=predeclared)
+
+    def validate_setup() -> Callable[[], object]:
+        program = parse_program(text, predeclared_vars=predeclared)
+        return lambda: _validate_program(program, sigil="@", predeclared_vars=predeclared)
+
+    def to_dicts_setup() -> Callable[[], object]:
+        program = parse_program(text, predeclared_vars=predeclared)
+        return lambda: program_to_dicts(program)
+
+    def parse_dsl_setup() -> Callable[[], object]:
+        return lambda: parse_dsl(text, predeclared_vars=predeclared)
+
+    targets = [
+        ("parse_program", parse_setup),
+        ("validate_program", validate_setup),
+        ("program_to_dicts", to_dicts_setup),
+    ]
+    if flat:
+        targets.append(("parse_dsl", parse_dsl_setup))
+    return [
+        BenchCase(
+            name=f"{target}/{group}={size}",
+            group=group,
+            size=size,
+            setup=setup,
+            params={"target": target, "chars": len(text)},
+        )
+        for target, setup in targets
+    ]
+
+
+def build_cases(quick: bool = False) -> List[BenchCase]:
+    cases: List[BenchCase] = []
+    for group, (_, sizes, _) in SIZES.items():
+        for size in sizes[:1] if quick else sizes:
+            cases.extend(_cases_for(group, size))
+    return cases
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_arg_parser("Parser and validator scaling benchmarks.").parse_args(argv)
+    return run_suite("parser_v02", build_cases(quick=args.quick), args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import importlib
+import json
+import pickle
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from chatdsl_core import state_store_v02
+
+from . import workloads
+from .common import BenchCase, build_arg_parser, redirect_state_dir, run_suite
+
+
+@dataclass
+class StorageBackend:
+    """
+    A storage engine under test. `save` and `load` persist a whole chats
+    state under `directory`, which each case gets to itself; `files` lists
+    what `save` leaves there so bytes on disk can be reported.
+    """
+
+    name: str
+    save: Callable[[Path, Dict[str, Any]], None]
+    load: Callable[[Path], Dict[str, Any]]
+    files: Callable[[Path], List[Path]]
+
+
+def _state_store_save(directory: Path, state: Dict[str, Any]) -> None:
+    with redirect_state_dir(directory):
+        state_store_v02.save_chats(state)
+
+
+def _state_store_load(directory: Path) -> Dict[str, Any]:
+    with redirect_state_dir(directory):
+        return state_store_v02.load_chats()
+
+
+def _compact_json_save(directory: Path, state: Dict[str, Any]) -> None:
+    path = directory / "chats.json"
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(state, separators=(",", ":")), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def _compact_json_load(directory: Path) -> Dict[str, Any]:
+    return json.loads((directory / "chats.json").read_text(encoding="utf-8"))
+
+
+def _pickle_save(directory: Path, state: Dict[str, Any]) -> None:
+    path = directory / "chats.pickle"
+    tmp_path = path.with_suffix(".pickle.tmp")
+    tmp_path.write_bytes(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+    tmp_path.replace(path)
+
+
+def _pickle_load(directory: Path) -> Dict[str, Any]:
+    return pickle.loads((directory / "chats.pickle").read_bytes())
+
+
+def _files_named(*names: str) -> Callable[[Path], List[Path]]:
+    return lambda directory: [directory / name for name in names if (directory / name).exists()]
+
+
+BACKENDS: Dict[str, StorageBackend] = {
+    # What the app uses today: indented JSON via save_chats/load_chats.
+    "state_store": StorageBackend(
+        "state_store", _state_store_save, _state_store_load, _files_named("chats.json")
+    ),
+    "compact_json": StorageBackend(
+        "compact_json", _compact_json_save, _compact_json_load, _files_named("chats.json")
+    ),
+    "pickle": StorageBackend("pickle", _pickle_save, _pickle_load, _files_named("chats.pickle")),
+}
+# (chats, messages per chat)
+SIZES: Sequence[Tuple[int, int]] = ((4, 100), (4, 500), (4, 2_500), (4, 10_000))
+_QUICK_SIZES: Sequence[Tuple[int, int]] = ((2, 100),)
+
+
+def resolve_backend(spec: str) -> StorageBackend:
+    """A registered backend name, or `module:attribute` naming a StorageBackend to import."""
+    if spec in BACKENDS:
+        return BACKENDS[spec]
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"unknown storage backend {spec!r}; registered: {sorted(BACKENDS)}")
+    backend = getattr(importlib.import_module(module_name), attr)
+    if not isinstance(backend, StorageBackend):
+        raise ValueError(f"{spec} is not a StorageBackend")
+    return backend
+
+
+def _one_run() -> List[Dict[str, Any]]:
+    """The messages one `_run_dsl` call appends: a user message and its replies."""
+    run = workloads.synthetic_history(3, seed=1, run_logs=True)
+    for msg in run:
+        msg["id"] = f"{msg['id']}-appended"
+    return run
+
+
+def _cases_for(
+    backend: StorageBackend,
+    n_chats: int,
+    per_chat: int,
+    workdir: Path,
+) -> List[BenchCase]:
+    size = n_chats * per_chat
+    label = f"{backend.name}/messages={size}"
+    directory = workdir / f"{backend.name}-{size}"
+
+    def state() -> Dict[str, Any]:
+        return workloads.synthetic_chats_state(n_chats, per_chat)
+
+    def disk_bytes() -> int:
+        return sum(path.stat().st_size for path in backend.files(directory))
+
+    def save_setup() -> Callable[[], Dict[str, Any]]:
+        loaded = state()
+        directory.mkdir(parents=True, exist_ok=True)
+
+        def run() -> Dict[str, Any]:
+            backend.save(directory, loaded)
+            return {"bytes_written": disk_bytes()}
+
+        return run
+
+    def load_setup() -> Callable[[], Dict[str, Any]]:
+        directory.mkdir(parents=True, exist_ok=True)
+        backend.save(directory, state())
+
+        def run() -> Dict[str, Any]:
+            backend.load(directory)
+            return {"bytes_read": disk_bytes()}
+
+        return run
+
+    def run_save_setup() -> Callable[[], Dict[str, Any]]:
+        # The persist step of one `_run_dsl` call: append a run, save the whole state.
+        loaded = state()
+        history = loaded["chats"][0]["history"]
+        appended = _one_run()
+        directory.mkdir(parents=True, exist_ok=True)
+
+        def run() -> Dict[str, Any]:
+            history.extend(appended)
+            backend.save(directory, loaded)
+            del history[-len(appended):]
+            return {"bytes_written_per_run": disk_bytes()}
+
+        return run
+
+    series_params = {"backend": backend.name, "chats": n_chats, "messages": size}
+    return [
+        BenchCase(
+            name=f"{target}/{label}",
+            group=backend.name,
+            size=size,
+            setup=setup,
+            params={**series_params, "target": target},
+            units=size,
+            series=f"{target}/{backend.name}",
+        )
+        for target, setup in (
+            ("save_chats", save_setup),
+            ("load_chats", load_setup),
+            ("run_persist", run_save_setup),
+        )
+    ]
+
+
+def build_cases(
+    workdir: Path,
+    quick: bool = False,
+    backends: Sequence[str] = tuple(BACKENDS),
+) -> List[BenchCase]:
+    resolved = [resolve_backend(spec) for spec in backends]
+    cases: List[BenchCase] = []
+    for n_chats, per_chat in _QUICK_SIZES if quick else SIZES:
+        for backend in resolved:
+            cases.extend(_cases_for(backend, n_chats, per_chat, workdir))
+    return cases
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser("Chat state storage benchmarks.")
+    parser.add_argument(
+        "--backend",
+        dest="backends",
+        action="append",
+        help=f"backend to run (repeatable): one of {sorted(BACKENDS)} or module:attribute",
+    )
+    parser.add_argument("--workdir", type=Path, help="directory for written state (default: a temp dir)")
+    parser.set_defaults(budget=5.0)
+    args = parser.parse_args(argv)
+    backends = args.backends or tuple(BACKENDS)
+    if args.workdir is not None:
+        return run_suite("storage_v02", build_cases(args.workdir, args.quick, backends), args)
+    with tempfile.TemporaryDirectory(prefix="chatdsl-bench-storage-") as workdir:
+        return run_suite("storage_v02", build_cases(Path(workdir), args.quick, backends), args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
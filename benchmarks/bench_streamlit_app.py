@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import copy
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from . import workloads
+from .common import BenchCase, build_arg_parser, redirect_state_dir, run_suite
+
+try:
+    from streamlit.testing.v1 import AppTest
+except ImportError:  # streamlit is an app dependency, not a core one
+    AppTest = None  # type: ignore[assignment,misc]
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "apps" / "streamlit" / "app.py"
+# Messages in each chat of the synthetic state.
+SIZES: Sequence[int] = (50, 500, 2_000)
+_QUICK_SIZES: Sequence[int] = (50,)
+_N_CHATS = 3
+_RUN_TIMEOUT_S = 600.0
+_POLL_S = 0.005
+_STUB_PROGRAM = "Summarize the latest notes\n/DEF summary /TYPE str\n/THEN Report on @summary\n/OUT report"
+_EXECUTOR_TOGGLE = "Run executor (turn off for debugging)"
+
+
+def _check(app: Any) -> None:
+    if app.exception:
+        raise RuntimeError(f"app raised during the benchmark: {app.exception[0].value}")
+
+
+def _open_app(state: Dict[str, Any]) -> Any:
+    app = AppTest.from_file(str(APP_PATH), default_timeout=_RUN_TIMEOUT_S)
+    app.session_state["chats_state"] = copy.deepcopy(state)
+    app.run()
+    _check(app)
+    # Stubbed runs: the executor's built-in responses instead of Gemini.
+    next(toggle for toggle in app.toggle if toggle.label == _EXECUTOR_TOGGLE).set_value(False).run()
+    _check(app)
+    return app
+
+
+def _interactions(state: Dict[str, Any]) -> List[Tuple[str, Callable[[], Callable[[], None]]]]:
+    history = state["chats"][0]["history"]
+    chat_id = state["chats"][0]["id"]
+    first_user_id = next(msg["id"] for msg in history if msg.get("role") == "user")
+
+    def open_app() -> Callable[[], None]:
+        def run() -> None:
+            app = AppTest.from_file(str(APP_PATH), default_timeout=_RUN_TIMEOUT_S)
+            app.session_state["chats_state"] = copy.deepcopy(state)
+            app.run()
+            _check(app)
+
+        return run
+
+    def switch_chat() -> Callable[[], None]:
+        app = _open_app(state)
+        targets = [chat["id"] for chat in state["chats"][:2]]
+        turn = [0]
+
+        def run() -> None:
+            turn[0] += 1
+            app.button(key=f"select_{targets[turn[0] % 2]}").click().run()
+            _check(app)
+
+        return run
+
+    def open_versions() -> Callable[[], None]:
+        app = _open_app(state)
+        thread_id = workloads.largest_thread(history)
+
+        def run() -> None:
+            app.session_state["versions_target_chat_id"] = chat_id
+            app.session_state["versions_target_thread_id"] = thread_id
+            app.session_state["versions_open"] = True
+            app.run()
+            _check(app)
+
+        return run
+
+    def view_history() -> Callable[[], None]:
+        app = _open_app(state)
+
+        def run() -> None:
+            app.session_state["history_view_chat_id"] = chat_id
+            app.session_state["history_view_message_id"] = first_user_id
+            app.run()
+            _check(app)
+
+        return run
+
+    def send_dsl_run() -> Callable[[], None]:
+        app = _open_app(state)
+        baseline = len(history)
+
+        def run() -> None:
+            app.chat_input(key="chat_composer").set_value(_STUB_PROGRAM).run()
+            _check(app)
+            # Runs execute on the app's job queue; rerun until the result is handed off.
+            while app.session_state["chats_state"]["chats"][0].get("pending_job_ids"):
+                time.sleep(_POLL_S)
+                app.run()
+                _check(app)
+            # Keep every sample on the same history size.
+            del app.session_state["chats_state"]["chats"][0]["history"][baseline:]
+
+        return run
+
+    return [
+        ("open_app", open_app),
+        ("switch_chat", switch_chat),
+        ("open_versions_dialog", open_versions),
+        ("view_history_version", view_history),
+        ("send_dsl_run", send_dsl_run),
+    ]
+
+
+def build_cases(quick: bool = False) -> List[BenchCase]:
+    cases: List[BenchCase] = []
+    for size in _QUICK_SIZES if quick else SIZES:
+        state = workloads.synthetic_chats_state(_N_CHATS, size)
+        for interaction, setup in _interactions(state):
+            cases.append(
+                BenchCase(
+                    name=f"{interaction}/messages={size}",
+                    group=interaction,
+                    size=size,
+                    setup=setup,
+                    params={"interaction": interaction, "chats": _N_CHATS},
+                    series=interaction,
+                )
+            )
+    return cases
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser("Full-rerun latency of the Streamlit app under AppTest.")
+    parser.set_defaults(repeat=3, budget=10.0)
+    args = parser.parse_args(argv)
+    if AppTest is None:
+        print("streamlit is not installed; install the app requirements to run this suite", file=sys.stderr)
+        return 2
+    with tempfile.TemporaryDirectory(prefix="chatdsl-bench-app-") as workdir:
+        with redirect_state_dir(Path(workdir)):
+            return run_suite("streamlit_app", build_cases(quick=args.quick), args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import copy
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from chatdsl_core.versioning_v02 import (
+    backfill_history_metadata,
+    build_edit_run_context,
+    cutoff_index_for_version_view,
+    get_thread_versions,
+    project_visible_history_indices,
+)
+
+from . import workloads
+from .common import BenchCase, build_arg_parser, run_suite
+
+
+HISTORIES: Dict[str, Tuple[float, Sequence[int]]] = {
+    # group: (hidden_edit_fraction, sizes in messages)
+    # Edits of visible runs only, as the chat view offers them.
+    "history": (0.0, (1_000, 10_000, 100_000)),
+    # A quarter of edits re-edit a hidden first version via source_cutoff_index,
+    # which projects recursively; sizes stay small because cost compounds per edit.
+    "hidden_edits": (0.25, (100, 200, 400, 800, 1_600, 3_200)),
+}
+_QUICK_SIZES = {"history": 200, "hidden_edits": 100}
+
+
+@lru_cache(maxsize=4)
+def _history(group: str, size: int) -> List[Dict[str, Any]]:
+    return workloads.synthetic_history(size, hidden_edit_fraction=HISTORIES[group][0])
+
+
+def _user_ids(history: List[Dict[str, Any]]) -> List[str]:
+    return [msg["id"] for msg in history if msg.get("role") == "user"]
+
+
+def _targets(group: str, size: int) -> List[Tuple[str, Callable[[], Callable[[], object]]]]:
+    def history() -> List[Dict[str, Any]]:
+        return _history(group, size)
+
+    def project_full() -> Callable[[], object]:
+        loaded = history()
+        return lambda: project_visible_history_indices(loaded)
+
+    def project_mid() -> Callable[[], object]:
+        loaded = history()
+        return lambda: project_visible_history_indices(loaded, cutoff_index=len(loaded) // 2)
+
+    def cutoff_latest() -> Callable[[], object]:
+        loaded = history()
+        latest = _user_ids(loaded)[-1]
+        return lambda: cutoff_index_for_version_view(loaded, latest)
+
+    def cutoff_oldest_visible() -> Callable[[], object]:
+        # Still visible at the end, so every later cutoff is projected: the worst case.
+        loaded = history()
+        oldest = next(
+            loaded[idx]["id"]
+            for idx in project_visible_history_indices(loaded)
+            if loaded[idx].get("role") == "user"
+        )
+        return lambda: cutoff_index_for_version_view(loaded, oldest)
+
+    def edit_context_latest() -> Callable[[], object]:
+        loaded = history()
+        latest = _user_ids(loaded)[-1]
+        return lambda: build_edit_run_context(loaded, latest)
+
+    def thread_versions() -> Callable[[], object]:
+        loaded = history()
+        thread_id = workloads.largest_thread(loaded)
+        return lambda: get_thread_versions(loaded, thread_id)
+
+    def backfill_steady() -> Callable[[], object]:
+        loaded = copy.deepcopy(history())
+        return lambda: backfill_history_metadata(loaded)
+
+    def backfill_legacy() -> Callable[[], object]:
+        # Backfill mutates, so each run fills a fresh shallow copy; the copy is part of the timing.
+        legacy = workloads.legacy_history(size)
+        return lambda: backfill_history_metadata([dict(msg) for msg in legacy])
+
+    return [
+        ("project_visible_history_indices/full", project_full),
+        ("project_visible_history_indices/mid_cutoff", project_mid),
+        ("cutoff_index_for_version_view/latest", cutoff_latest),
+        ("cutoff_index_for_version_view/oldest_visible", cutoff_oldest_visible),
+        ("build_edit_run_context/latest", edit_context_latest),
+        ("get_thread_versions/largest_thread", thread_versions),
+        ("backfill_history_metadata/steady", backfill_steady),
+        ("backfill_history_metadata/legacy", backfill_legacy),
+    ]
+
+
+def build_cases(quick: bool = False) -> List[BenchCase]:
+    cases: List[BenchCase] = []
+    for group, (_, sizes) in HISTORIES.items():
+        for size in (_QUICK_SIZES[group],) if quick else sizes:
+            for target, setup in _targets(group, size):
+                cases.append(
+                    BenchCase(
+                        name=f"{target}/{group}={size}",
+                        group=group,
+                        size=size,
+                        setup=setup,
+                        params={"target": target},
+                        units=size,
+                        series=f"{target}/{group}",
+                    )
+                )
+    return cases
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser("Versioning and history-projection scaling benchmarks.")
+    parser.set_defaults(budget=2.0)
+    args = parser.parse_args(argv)
+    return run_suite("versioning_v02", build_cases(quick=args.quick), args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Set
+
+
+DEFAULT_THRESHOLD = 1.5
+# Cases faster than this are dominated by timer noise; they never count as regressions.
+DEFAULT_MIN_DELTA_S = 0.0005
+
+
+@dataclass
+class BenchCase:
+    """
+    One benchmark measurement. `setup` runs untimed and returns the callable
+    that is timed; that callable may return a dict of extra numeric metrics,
+    which are recorded from its last run. With `units` (e.g. executed steps)
+    the report also carries per-unit wall, CPU and peak memory. Cases that
+    share a `series` are listed smallest first; once one exceeds the
+    suite's time budget the larger ones are skipped.
+    """
+
+    name: str
+    group: str
+    size: int
+    setup: Callable[[], Callable[[], Any]]
+    repeat: Optional[int] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+    units: Optional[int] = None
+    series: Optional[str] = None
+
+
+@contextmanager
+def redirect_state_dir(directory: Path) -> Iterator[None]:
+    """
+    Point the state store, blob store and value store at `directory` so a
+    benchmark never writes to the app's real `apps/streamlit/state`.
+    """
+    from chatdsl_core import blob_store_v02, state_store_v02, value_store_v02
+
+    patches = [
+        (state_store_v02, "_STATE_DIR", directory),
+        (state_store_v02, "_VARS_PATH", directory / "vars.json"),
+        (state_store_v02, "_HISTORY_PATH", directory / "chat_history.json"),
+        (state_store_v02, "_CHATS_PATH", directory / "chats.json"),
+        (blob_store_v02, "_BLOBS_DIR", directory / "blobs"),
+        (value_store_v02, "_VALUES_DIR", directory / "values"),
+    ]
+    saved = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, value in patches:
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
+
+
+def _percentile(values: Sequence[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure_case(
+    case: BenchCase,
+    repeat: int,
+    warmup: int = 1,
+    budget_s: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Time `case`. When the first warmup run alone exceeds `budget_s`, that
+    run is reported as the only sample (flagged `over_budget`, no memory
+    figures) instead of repeating it.
+    """
+    fn = case.setup()
+    extra: Any = None
+    for index in range(warmup):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        extra = fn()
+        cpu_s = time.process_time() - cpu_start
+        wall_s = time.perf_counter() - wall_start
+        if index == 0 and budget_s is not None and wall_s > budget_s:
+            return _single_sample_result(case, wall_s, cpu_s, extra)
+
+    wall: List[float] = []
+    cpu: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(case.repeat or repeat):
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            extra = fn()
+            cpu.append(time.process_time() - cpu_start)
+            wall.append(time.perf_counter() - wall_start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    # Memory is measured on a separate run so tracing overhead stays out of timings.
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        fn()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result: Dict[str, Any] = {
+        "name": case.name,
+        "group": case.group,
+        "size": case.size,
+        "params": dict(case.params),
+        "repeat": len(wall),
+        "wall_s": {
+            "min": min(wall),
+            "median": statistics.median(wall),
+            "p95": _percentile(wall, 95),
+            "mean": statistics.fmean(wall),
+        },
+        "cpu_s": statistics.median(cpu),
+        "peak_bytes": max(0, peak - before),
+        "retained_bytes": max(0, after - before),
+    }
+    _add_derived(result, case, extra)
+    return result
+
+
+def _single_sample_result(case: BenchCase, wall_s: float, cpu_s: float, extra: Any) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        "name": case.name,
+        "group": case.group,
+        "size": case.size,
+        "params": dict(case.params),
+        "repeat": 1,
+        "wall_s": {"min": wall_s, "median": wall_s, "p95": wall_s, "mean": wall_s},
+        "cpu_s": cpu_s,
+        "peak_bytes": None,
+        "retained_bytes": None,
+        "over_budget": True,
+    }
+    _add_derived(result, case, extra)
+    return result
+
+
+def _add_derived(result: Dict[str, Any], case: BenchCase, extra: Any) -> None:
+    if case.units:
+        result["per_unit"] = {
+            "units": case.units,
+            "wall_s": result["wall_s"]["median"] / case.units,
+            "cpu_s": result["cpu_s"] / case.units,
+            "peak_bytes": None if result["peak_bytes"] is None else result["peak_bytes"] / case.units,
+        }
+    if isinstance(extra, Mapping):
+        result["extra"] = {
+            key: value for key, value in extra.items() if isinstance(value, (int, float, str, bool))
+        }
+
+
+def build_report(
+    suite: str,
+    results: List[Dict[str, Any]],
+    skipped: Sequence[str] = (),
+) -> Dict[str, Any]:
+    return {
+        "suite": suite,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+        "skipped": list(skipped),
+    }
+
+
+def write_report(path: Path, report: Mapping[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+def load_report(path: Path) -> Dict[str, Any]:
+    loaded = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(loaded, dict) or not isinstance(loaded.get("results"), list):
+        raise ValueError(f"{path} is not a benchmark report")
+    return loaded
+
+
+def compare_reports(
+    current: Mapping[str, Any],
+    baseline: Mapping[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta_s: float = DEFAULT_MIN_DELTA_S,
+) -> List[Dict[str, Any]]:
+    """
+    Return the cases whose median wall time grew past `threshold` times the
+    baseline median. Cases missing from either report are ignored.
+    """
+    baseline_by_name = {
+        result["name"]: result for result in baseline.get("results", []) if isinstance(result, dict)
+    }
+    regressions: List[Dict[str, Any]] = []
+    for result in current.get("results", []):
+        base = baseline_by_name.get(result.get("name"))
+        if base is None:
+            continue
+        now_s = float(result["wall_s"]["median"])
+        base_s = float(base["wall_s"]["median"])
+        if base_s <= 0 or now_s - base_s < min_delta_s:
+            continue
+        ratio = now_s / base_s
+        if ratio > threshold:
+            regressions.append(
+                {
+                    "name": result["name"],
+                    "baseline_s": base_s,
+                    "current_s": now_s,
+                    "ratio": round(ratio, 3),
+                }
+            )
+    return regressions
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.3f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}us"
+
+
+def format_results(results: Sequence[Mapping[str, Any]]) -> str:
+    width = max((len(str(result["name"])) for result in results), default=4)
+    lines = [f"{'case':<{width}}  {'median':>10}  {'p95':>10}  {'cpu':>10}  {'peak KiB':>9}"]
+    for result in results:
+        wall = result["wall_s"]
+        peak = "-" if result["peak_bytes"] is None else f"{result['peak_bytes'] / 1024:.1f}"
+        lines.append(
+            f"{result['name']:<{width}}  {_format_seconds(wall['median']):>10}  "
+            f"{_format_seconds(wall['p95']):>10}  {_format_seconds(result['cpu_s']):>10}  "
+            f"{peak:>9}"
+        )
+    return "\n".join(lines)
+
+
+def build_arg_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--quick", action="store_true", help="smallest sizes only (smoke run)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="compare against this JSON report")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="fail when a case's median exceeds baseline median times this factor",
+    )
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="seconds per run; past it a case is sampled once and larger sizes in its series are skipped",
+    )
+    return parser
+
+
+def run_suite(
+    suite: str,
+    cases: Sequence[BenchCase],
+    args: argparse.Namespace,
+    annotate: Optional[Callable[[Dict[str, Any]], List[str]]] = None,
+) -> int:
+    """
+    Measure cases, print a table, write/compare reports; returns a process
+    exit code. `annotate` may add suite-specific fields to the report before
+    it is written and returns extra lines to print.
+    """
+    results: List[Dict[str, Any]] = []
+    skipped: List[str] = []
+    over_budget: Set[str] = set()
+    for case in cases:
+        if args.filter not in case.name:
+            continue
+        if case.series is not None and case.series in over_budget:
+            skipped.append(case.name)
+            continue
+        result = measure_case(case, repeat=args.repeat, budget_s=args.budget)
+        results.append(result)
+        over = args.budget is not None and result["wall_s"]["median"] > args.budget
+        if over and case.series is not None:
+            over_budget.add(case.series)
+    report = build_report(suite, results, skipped)
+    print(format_results(results))
+    if skipped:
+        print(f"skipped over budget: {', '.join(skipped)}")
+    if annotate is not None:
+        for line in annotate(report):
+            print(line)
+    if args.output is not None:
+        write_report(args.output, report)
+        print(f"report written to {args.output}")
+    if args.baseline is not None:
+        regressions = compare_reports(report, load_report(args.baseline), threshold=args.threshold)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['name']}: {_format_seconds(regression['baseline_s'])} -> "
+                f"{_format_seconds(regression['current_s'])} (x{regression['ratio']})"
+            )
+        if regressions:
+            return 1
+    return 0
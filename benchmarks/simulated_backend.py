@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, Optional
+
+
+LatencySampler = Callable[[random.Random], float]
+
+_SCHEMA_SAMPLE_VALUES: Dict[str, Any] = {
+    "string": "simulated value",
+    "integer": 7,
+    "number": 0.5,
+    "boolean": True,
+}
+
+
+def parse_latency(spec: str) -> LatencySampler:
+    """
+    Parse a latency distribution spec in seconds:
+    `zero`, `fixed:0.02`, `uniform:0.01,0.05`, or `lognormal:MU,SIGMA`
+    (parameters of the underlying normal, e.g. `lognormal:-3.5,0.5`).
+    """
+    kind, _, raw_args = spec.partition(":")
+    args = [float(part) for part in raw_args.split(",") if part.strip()]
+    if kind == "zero" and not args:
+        return lambda rng: 0.0
+    if kind == "fixed" and len(args) == 1:
+        value = max(0.0, args[0])
+        return lambda rng: value
+    if kind == "uniform" and len(args) == 2:
+        low, high = args
+        return lambda rng: max(0.0, rng.uniform(low, high))
+    if kind == "lognormal" and len(args) == 2:
+        mu, sigma = args
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"unsupported latency spec {spec!r}")
+
+
+def sample_response(response_schema: Mapping[str, Any], out: str = "simulated output") -> str:
+    """Build a JSON response that satisfies a step response schema."""
+    payload: Dict[str, Any] = {"error": 0, "out": out}
+    vars_schema = response_schema.get("properties", {}).get("vars")
+    if isinstance(vars_schema, Mapping):
+        payload["vars"] = {
+            name: _SCHEMA_SAMPLE_VALUES.get(prop.get("type"), "simulated value")
+            for name, prop in vars_schema.get("properties", {}).items()
+        }
+    return json.dumps(payload)
+
+
+class SimulatedBackend:
+    """
+    Stand-in ModelCall/CheapModelCall pair that sleeps per a latency
+    distribution and returns schema-valid JSON. Sleep totals are split by
+    whether they happened on the thread that created the backend, so
+    callers can separate time spent waiting on the critical path from
+    overlapped (prefetched) waits.
+    """
+
+    def __init__(
+        self,
+        step_latency: str = "zero",
+        cheap_latency: str = "zero",
+        seed: int = 0,
+        bool_value: Optional[bool] = True,
+    ) -> None:
+        self._step_latency = parse_latency(step_latency)
+        self._cheap_latency = parse_latency(cheap_latency)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._main_thread = threading.get_ident()
+        self.bool_value = bool_value
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.step_calls = 0
+            self.cheap_calls = 0
+            self.main_thread_sleep_s = 0.0
+            self.background_sleep_s = 0.0
+
+    def _sleep(self, sampler: LatencySampler) -> None:
+        with self._lock:
+            delay = sampler(self._rng)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            if threading.get_ident() == self._main_thread:
+                self.main_thread_sleep_s += delay
+            else:
+                self.background_sleep_s += delay
+
+    def call_model(self, prompt: str, response_schema: Mapping[str, Any]) -> str:
+        self._sleep(self._step_latency)
+        with self._lock:
+            self.step_calls += 1
+        response = json.loads(sample_response(response_schema))
+        if self.bool_value is not None:
+            for name, value in response.get("vars", {}).items():
+                if isinstance(value, bool):
+                    response["vars"][name] = self.bool_value
+        return json.dumps(response)
+
+    def cheap_model_call(self, prompt: str) -> str:
+        self._sleep(self._cheap_latency)
+        with self._lock:
+            self.cheap_calls += 1
+        return "simulated filtered text"
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from chatdsl_core.blob_store_v02 import blob_digest
+from chatdsl_core.var_snapshots_v02 import record_vars_snapshots
+
+
+# Synthetic DSL programs shared by the parser, executor and cross-version suites.
+# Each builder returns (dsl_text, predeclared_vars).
+
+Workload = Tuple[str, List[str]]
+
+
+def flat_steps(n_steps: int) -> Workload:
+    """A chain of steps, each defining one variable read by the next step."""
+    lines: List[str] = []
+    for index in range(n_steps):
+        if index == 0:
+            lines.append(f"Draft section {index} of the report")
+        else:
+            lines.append(f"/THEN Extend section {index} using @v{index - 1}")
+            lines.append(f"/FROM @v{index - 1}")
+        lines.append(f"/DEF v{index} /TYPE str /AS text for section {index}")
+        lines.append(f"/OUT section {index} summary")
+    return "\n".join(lines), []
+
+
+def plain_steps(n_steps: int) -> Workload:
+    """A chain of `/THEN` + `/OUT` steps with no variables: the syntax every archived version parses."""
+    lines: List[str] = []
+    for index in range(n_steps):
+        lines.append(f"/THEN Extend section {index}" if index else "Draft section 0 of the report")
+        lines.append(f"/OUT section {index} summary")
+    return "\n".join(lines), []
+
+
+def nested_ifs(depth: int) -> Workload:
+    """A step at every level of `depth` nested `/IF` blocks, guarded by predeclared bools."""
+    lines: List[str] = []
+    for level in range(depth):
+        lines.append(f"/THEN Work at level {level}" if level else f"Work at level {level}")
+        lines.append(f"/OUT level {level}")
+        lines.append(f"/IF @g{level}")
+    lines.append("/THEN Innermost work" if depth else "Innermost work")
+    lines.append(f"/OUT level {depth}")
+    lines.extend("/END" for _ in range(depth))
+    return "\n".join(lines), [f"g{level}" for level in range(depth)]
+
+
+def prefiltered_steps(n_steps: int) -> Workload:
+    """Steps that each prefilter the same predeclared source, so every prefilter can be prefetched."""
+    lines: List[str] = []
+    for index in range(n_steps):
+        prefix = "/THEN " if index else ""
+        lines.append(f"{prefix}Answer question {index}")
+        lines.append(f"/FROM facts for question {index} /IN @source")
+        lines.append(f"/OUT answer {index}")
+    return "\n".join(lines), ["source"]
+
+
+def long_as_body(n_lines: int) -> Workload:
+    """One step whose `/AS` description continues over `n_lines` lines."""
+    body = "\n".join(f"detail line {index} mentioning @topic" for index in range(n_lines))
+    text = f"Summarize the topic\n/FROM @topic\n/DEF summary /TYPE str\n/AS {body}"
+    return text, ["topic"]
+
+
+def many_from_items(n_items: int) -> Workload:
+    """One step reading `n_items` predeclared variables plus as many scoped prefilters."""
+    var_items = ", ".join(f"@x{index}" for index in range(n_items))
+    nat_items = ", ".join(f"facts about item {index} /IN @x{index}" for index in range(n_items))
+    text = f"Combine inputs\n/FROM {var_items}, {nat_items}\n/OUT combined"
+    return text, [f"x{index}" for index in range(n_items)]
+
+
+def many_predeclared(n_vars: int) -> Workload:
+    """A short program validated against `n_vars` predeclared variables."""
+    text = "Use a few inputs\n/FROM @p0, @p1\n/OUT done\n/THEN Follow up on @p2\n/FROM @p2\n/OUT done"
+    return text, [f"p{index}" for index in range(max(n_vars, 3))]
+
+
+# Synthetic chat histories shared by the versioning, storage and app suites.
+
+
+@dataclass
+class _Run:
+    user_id: str
+    thread: "_Thread"
+    # Previous visible run when this one was appended; following these links
+    # from the newest visible run walks the projected timeline backwards.
+    parent: Optional["_Run"]
+
+
+@dataclass
+class _Thread:
+    thread_id: str
+    first: Optional[_Run] = None
+    version: int = 0
+    # Last cutoff at which the first version was still visible, once an edit hid it.
+    first_hidden_cutoff: Optional[int] = None
+
+
+def synthetic_history(
+    n_messages: int,
+    edit_fraction: float = 0.2,
+    hidden_edit_fraction: float = 0.0,
+    seed: int = 0,
+    run_logs: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Append-only DSL chat history shaped like the app writes it: each run is
+    a user message followed by one or two assistant replies, with delta
+    vars snapshots. About `edit_fraction` of runs edit one of the last 50
+    visible runs (mostly the last few), so threads grow edits of edits. `hidden_edit_fraction` of
+    edits instead re-edit a thread's first version after a later edit hid
+    it, pointing `source_cutoff_index` at the last index where it was
+    visible, as the version picker does. With `run_logs`, runs carry the
+    parsed steps, execution logs and per-reply step logs that `_run_dsl`
+    persists at the default (`full`) log retention.
+    """
+    rng = random.Random(seed)
+    history: List[Dict[str, Any]] = []
+    threads: List[_Thread] = []
+    head: Optional[_Run] = None
+    vars_after: Dict[str, Any] = {}
+
+    while len(history) < n_messages:
+        run_no = len(history)
+        user_id = f"msg-u{run_no}"
+        meta: Dict[str, Any] = {"run_id": f"run-{run_no}"}
+        parent = head
+        hidden = [thread for thread in threads[-50:] if thread.first_hidden_cutoff is not None]
+        if hidden and rng.random() < edit_fraction * hidden_edit_fraction:
+            thread = rng.choice(hidden)
+            assert thread.first is not None
+            parent = thread.first.parent
+            meta["edited_from_message_id"] = thread.first.user_id
+            meta["source_cutoff_index"] = thread.first_hidden_cutoff
+        elif head is not None and rng.random() < edit_fraction:
+            target = head
+            for _ in range(min(49, int(rng.expovariate(1 / 3)))):
+                if target.parent is None:
+                    break
+                target = target.parent
+            thread = target.thread
+            parent = target.parent
+            meta["edited_from_message_id"] = target.user_id
+            meta["source_cutoff_index"] = len(history) - 1
+            if target is thread.first:
+                thread.first_hidden_cutoff = len(history) - 1
+        else:
+            thread = _Thread(user_id)
+            threads.append(thread)
+        thread.version += 1
+        meta["thread_id"] = thread.thread_id
+        meta["version"] = thread.version
+        head = _Run(user_id, thread, parent)
+        if thread.first is None:
+            thread.first = head
+
+        vars_before = dict(vars_after)
+        vars_after = dict(vars_before)
+        vars_after[f"v{run_no % 40}"] = f"value from run {run_no}"
+        # Delta chains span at most _KEYFRAME_INTERVAL runs, so a recent tail
+        # resolves the same base as the full history without an O(n) index.
+        record_vars_snapshots(history[-64:], user_id, meta, vars_before, vars_after)
+        n_steps = rng.choice((1, 2))
+        step_logs = [_synthetic_step_log(run_no, step) for step in range(n_steps)] if run_logs else []
+        if run_logs:
+            meta["parsed_steps"] = [_synthetic_parsed_step(run_no, step) for step in range(n_steps)]
+            meta["execution_logs"] = step_logs
+        history.append(
+            {
+                "id": user_id,
+                "role": "user",
+                "content": f"Summarize item {run_no}\n/DEF v{run_no % 40}\n/THEN Report\n/OUT summary",
+                "mode": "dsl",
+                "meta": meta,
+            }
+        )
+        for step in range(n_steps):
+            reply_meta: Dict[str, Any] = {"run_id": meta["run_id"], "source_user_message_id": user_id}
+            if run_logs:
+                reply_meta["step_log"] = step_logs[step]
+            history.append(
+                {
+                    "id": f"msg-a{run_no}-{step}",
+                    "role": "assistant",
+                    "content": f"output {step} for run {run_no}",
+                    "mode": "dsl",
+                    "meta": reply_meta,
+                }
+            )
+    return history[:n_messages]
+
+
+def largest_thread(history: List[Dict[str, Any]]) -> str:
+    """The thread id with the most versions in a synthetic history."""
+    counts: Dict[str, int] = {}
+    for msg in history:
+        if msg.get("role") == "user":
+            thread_id = msg["meta"]["thread_id"]
+            counts[thread_id] = counts.get(thread_id, 0) + 1
+    return max(counts, key=lambda thread_id: counts[thread_id])
+
+
+def _synthetic_parsed_step(run_no: int, step: int) -> Dict[str, Any]:
+    return {
+        "node_kind": "step",
+        "index": step,
+        "start_line_no": 1 + step * 2,
+        "text": f"Summarize item {run_no}" if step == 0 else "Report",
+        "sigil": "@",
+        "from_items": [],
+        "defs": [],
+        "out_text": "summary",
+        "commands": [{"name": "OUT", "payload": "summary", "line_no": 2 + step * 2}],
+    }
+
+
+def _synthetic_step_log(run_no: int, step: int) -> Dict[str, Any]:
+    prompt = f"Instruction for run {run_no} step {step}.\n" + "Context line from the chat history.\n" * 40
+    raw = '{"error": 0, "out": "output %d for run %d"}' % (step, run_no)
+    return {
+        "node_kind": "step",
+        "node_path": [step],
+        "depth": 0,
+        "execution": "executed",
+        "step_index": step,
+        "start_line_no": 1 + step * 2,
+        "text": f"Step {step}",
+        "output": f"output {step} for run {run_no}",
+        "response_schema": {
+            "type": "object",
+            "properties": {"error": {"type": "integer"}, "out": {"type": "string"}},
+            "required": ["error", "out"],
+        },
+        "parsed_json": {"error": 0, "out": f"output {step} for run {run_no}"},
+        "staged_updates": {},
+        "prefilter_logs": [],
+        "model_call": {"model": "gemini-2.5-flash", "usage": {"prompt_tokens": 420, "candidates_tokens": 18}},
+        "timings": {"started_at_s": 0.0, "prompt_s": 0.0001, "model_call_s": 0.8, "total_s": 0.81},
+        # Compacted at `full` retention: text lives in the blob store.
+        "prompt_ref": {"digest": blob_digest(prompt), "chars": len(prompt), "stored": True},
+        "prompt_preview": prompt[:400] + "…",
+        "raw_response_ref": {"digest": blob_digest(raw), "chars": len(raw), "stored": True},
+        "raw_response_preview": raw,
+    }
+
+
+def synthetic_chats_state(n_chats: int, messages_per_chat: int, seed: int = 0) -> Dict[str, Any]:
+    """A `chats.json` state of `n_chats` chats with full run logs and vars, as `save_chats` receives it."""
+    chats: List[Dict[str, Any]] = []
+    for index in range(n_chats):
+        history = synthetic_history(messages_per_chat, seed=seed + index, run_logs=True)
+        chats.append(
+            {
+                "id": f"chat-{index + 1}",
+                "name": f"Chat {index + 1}",
+                "history": history,
+                "vars": {f"v{slot}": f"value for slot {slot} " * 8 for slot in range(40)},
+            }
+        )
+    return {"active_chat_id": "chat-1", "chats": chats}
+
+
+def legacy_history(n_messages: int) -> List[Dict[str, Any]]:
+    """History records without ids or versioning meta, as written before versioned runs."""
+    out: List[Dict[str, Any]] = []
+    for index in range(n_messages):
+        if index % 3 == 0:
+            out.append({"role": "user", "mode": "dsl", "content": f"run {index}"})
+        else:
+            out.append({"role": "assistant", "mode": "dsl", "content": f"reply {index}"})
+    return out
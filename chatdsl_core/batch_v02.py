@@ -0,0 +1,313 @@
+"""Run with: python -m chatdsl_core.batch_v02 PROGRAM.dsl INPUT.jsonl OUTPUT.jsonl"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Set, TextIO, Tuple
+
+from .cancellation_v02 import CancelToken, RunCancelled
+from .executor_v02 import CheapModelCall, ModelCall, execute_program
+from .generation_v02 import GenerationPolicy
+from .parser_v02 import Program, parse_program
+from .recovery_v02 import RecoveryPolicy
+
+
+DEFAULT_WORKERS = 4
+_CANCELLED_ERROR = "Cancelled: "
+
+
+@dataclass
+class BatchSummary:
+    rows_total: int
+    rows_run: int
+    rows_skipped: int
+    rows_failed: int
+    elapsed_s: float
+    rows_cancelled: int = 0
+
+
+def iter_jsonl_rows(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the JSON objects of a JSONL file, skipping blank lines."""
+    with path.open(encoding="utf-8") as handle:
+        for line_no, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f"{path}:{line_no}: expected a JSON object of variable bindings")
+            yield row
+
+
+def load_completed_rows(output_path: Path, retry_failed: bool = False) -> Set[int]:
+    """
+    Return the row indices already recorded in `output_path`. A trailing
+    partial line left by an interrupted run is cut off so appends stay valid
+    JSONL. With `retry_failed`, rows recorded as failed are not counted.
+    """
+    if not output_path.exists():
+        return set()
+    data = output_path.read_text(encoding="utf-8")
+    if data and not data.endswith("\n"):
+        data = data[: data.rfind("\n") + 1]
+        output_path.write_text(data, encoding="utf-8")
+
+    completed: Set[int] = set()
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if retry_failed and not record.get("ok"):
+            continue
+        completed.add(int(record["row_index"]))
+    return completed
+
+
+def run_row(
+    program: Program,
+    row_index: int,
+    row: Dict[str, Any],
+    required_vars: Sequence[str],
+    call_model: Optional[ModelCall] = None,
+    cheap_model_call: Optional[CheapModelCall] = None,
+    prefetch_prefilters: bool = False,
+    cancel_token: Optional[CancelToken] = None,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
+) -> Dict[str, Any]:
+    """Execute one row; failures are recorded in the result instead of raised."""
+    started = time.perf_counter()
+    missing = [name for name in required_vars if name not in row]
+    if missing:
+        return {
+            "row_index": row_index,
+            "ok": False,
+            "outputs": [],
+            "vars_after": dict(row),
+            "logs": [],
+            "error": f"Missing variables: {', '.join(missing)}",
+            "timings": {"execute_s": 0.0},
+        }
+    ctx = dict(row)
+    try:
+        ctx, logs, outputs = execute_program(
+            program,
+            ctx,
+            call_model=call_model,
+            cheap_model_call=cheap_model_call,
+            prefetch_prefilters=prefetch_prefilters,
+            cancel_token=cancel_token,
+            recovery=recovery,
+            generation=generation,
+        )
+    except Exception as exc:  # one bad row must not stop the batch
+        return {
+            "row_index": row_index,
+            "ok": False,
+            "outputs": [],
+            "vars_after": ctx,
+            "logs": [],
+            "error": f"{_CANCELLED_ERROR if isinstance(exc, RunCancelled) else 'Execution error: '}{exc}",
+            "timings": {"execute_s": round(time.perf_counter() - started, 6)},
+        }
+    return {
+        "row_index": row_index,
+        "ok": True,
+        "outputs": outputs,
+        "vars_after": ctx,
+        "logs": logs,
+        "error": None,
+        "timings": {"execute_s": round(time.perf_counter() - started, 6)},
+    }
+
+
+def _write_record(handle: TextIO, record: Dict[str, Any]) -> None:
+    handle.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    handle.flush()
+
+
+def run_batch(
+    program_text: str,
+    rows: Iterable[Dict[str, Any]],
+    output_path: Path,
+    call_model: Optional[ModelCall] = None,
+    cheap_model_call: Optional[CheapModelCall] = None,
+    workers: int = DEFAULT_WORKERS,
+    sigil: str = "@",
+    predeclared_vars: Optional[Sequence[str]] = None,
+    resume: bool = True,
+    retry_failed: bool = False,
+    prefetch_prefilters: bool = False,
+    cancel_token: Optional[CancelToken] = None,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
+) -> BatchSummary:
+    """
+    Parse `program_text` once and execute it for every row of initial
+    variable bindings on a pool of `workers` threads, appending one JSONL
+    record per row to `output_path` as rows finish (so records are in
+    completion order; `row_index` ties them back to the input).
+
+    `predeclared_vars` defaults to the keys of the first row; rows missing
+    any of them are recorded as failed. With `resume`, rows already in
+    `output_path` are skipped, so an interrupted batch can be restarted
+    with the same arguments; with `retry_failed` a rerun row gets a second
+    record, and the last record for a row index is the current one.
+
+    `cancel_token` is shared by every row: once it is cancelled or its
+    deadline passes, no further rows start and rows it interrupted are left
+    unrecorded, so resuming runs them again. `recovery` and `generation` are
+    passed to each row's execution.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    started = time.perf_counter()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    completed = load_completed_rows(output_path, retry_failed) if resume else set()
+    if not resume:
+        output_path.write_text("", encoding="utf-8")
+
+    row_iter = enumerate(rows)
+    first = next(row_iter, None)
+    required = list(predeclared_vars) if predeclared_vars is not None else list(first[1] if first else {})
+    program = parse_program(program_text, sigil=sigil, predeclared_vars=required)
+
+    def pending() -> Iterator[Tuple[int, Dict[str, Any]]]:
+        if first is not None:
+            yield first
+        yield from row_iter
+
+    rows_total = rows_run = rows_skipped = rows_failed = rows_cancelled = 0
+    with output_path.open("a", encoding="utf-8") as handle, ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="chatdsl-batch"
+    ) as pool:
+        in_flight: Set[Future] = set()
+
+        def drain(block_until: int) -> None:
+            nonlocal rows_run, rows_failed, rows_cancelled
+            while len(in_flight) > block_until:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.discard(future)
+                    record = future.result()
+                    if not record["ok"] and record["error"].startswith(_CANCELLED_ERROR):
+                        rows_cancelled += 1
+                        continue
+                    rows_run += 1
+                    if not record["ok"]:
+                        rows_failed += 1
+                    _write_record(handle, record)
+
+        for row_index, row in pending():
+            rows_total += 1
+            if row_index in completed:
+                rows_skipped += 1
+                continue
+            if cancel_token is not None and cancel_token.cancelled:
+                rows_cancelled += 1
+                continue
+            in_flight.add(
+                pool.submit(
+                    run_row,
+                    program,
+                    row_index,
+                    row,
+                    required,
+                    call_model,
+                    cheap_model_call,
+                    prefetch_prefilters,
+                    cancel_token,
+                    recovery,
+                    generation,
+                )
+            )
+            # Bound queued rows so large datasets stream instead of loading up front.
+            drain(workers * 2)
+        drain(0)
+
+    return BatchSummary(
+        rows_total=rows_total,
+        rows_run=rows_run,
+        rows_skipped=rows_skipped,
+        rows_failed=rows_failed,
+        elapsed_s=round(time.perf_counter() - started, 6),
+        rows_cancelled=rows_cancelled,
+    )
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Execute a DSL program once per row of a JSONL dataset of initial variables."
+    )
+    parser.add_argument("program", type=Path, help="DSL program file")
+    parser.add_argument("input", type=Path, help="JSONL file, one object of variable bindings per line")
+    parser.add_argument("output", type=Path, help="JSONL results file (appended to when resuming)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="rows executed concurrently")
+    parser.add_argument("--sigil", default="@", help="variable sigil used by the program")
+    parser.add_argument(
+        "--vars",
+        help="comma-separated variables every row must bind (default: keys of the first row)",
+    )
+    parser.add_argument("--no-resume", action="store_true", help="overwrite the output instead of resuming")
+    parser.add_argument("--retry-failed", action="store_true", help="when resuming, rerun rows that failed")
+    parser.add_argument("--prefetch-prefilters", action="store_true", help="speculatively prefetch prefilters")
+    parser.add_argument("--stub", action="store_true", help="use the executor's built-in stub responses")
+    parser.add_argument("--model", help="Gemini model for steps (default: GEMINI_MODEL)")
+    parser.add_argument("--cheap-model", help="Gemini model for prefilters")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-call timeout in seconds")
+    parser.add_argument(
+        "--deadline", type=float, help="stop starting rows after this many seconds; resume to finish"
+    )
+    parser.add_argument(
+        "--repair-retries",
+        type=int,
+        help="repair malformed step replies and re-ask up to this many times per step",
+    )
+    parser.add_argument(
+        "--budget-output-tokens", action="store_true", help="size each call's output budget from the step"
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    call_model: Optional[ModelCall] = None
+    cheap_model_call: Optional[CheapModelCall] = None
+    if not args.stub:
+        from .model_adapters_v02 import make_gemini_caller, make_gemini_cheap_caller
+
+        call_model = make_gemini_caller(model=args.model, timeout_s=args.timeout)
+        cheap_model_call = make_gemini_cheap_caller(model=args.cheap_model, timeout_s=args.timeout)
+
+    predeclared = [name.strip() for name in args.vars.split(",") if name.strip()] if args.vars else None
+    summary = run_batch(
+        args.program.read_text(encoding="utf-8"),
+        iter_jsonl_rows(args.input),
+        args.output,
+        call_model=call_model,
+        cheap_model_call=cheap_model_call,
+        workers=args.workers,
+        sigil=args.sigil,
+        predeclared_vars=predeclared,
+        resume=not args.no_resume,
+        retry_failed=args.retry_failed,
+        prefetch_prefilters=args.prefetch_prefilters,
+        cancel_token=CancelToken.after(args.deadline) if args.deadline is not None else None,
+        recovery=RecoveryPolicy(max_retries=args.repair_retries) if args.repair_retries is not None else None,
+        generation=GenerationPolicy() if args.budget_output_tokens else None,
+    )
+    print(
+        f"{summary.rows_run} rows run, {summary.rows_skipped} skipped, "
+        f"{summary.rows_failed} failed, {summary.rows_cancelled} cancelled in {summary.elapsed_s:.2f}s",
+        file=sys.stderr,
+    )
+    return 1 if summary.rows_failed or summary.rows_cancelled else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import hashlib
+import time
+import zlib
+from pathlib import Path
+from typing import AbstractSet, Any, Dict, List, Optional, Tuple
+
+from . import state_store_v02
+
+
+_BLOBS_DIR = state_store_v02._STATE_DIR / "blobs"
+_BLOB_SUFFIX = ".z"
+_COMPRESSION_LEVEL = 6
+
+
+def blob_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _blob_path(digest: str) -> Path:
+    return _BLOBS_DIR / digest[:2] / f"{digest}{_BLOB_SUFFIX}"
+
+
+def put_blob(text: str) -> str:
+    """
+    Store text under its content hash and return the digest.
+    Writing the same text twice is a no-op apart from refreshing its mtime.
+    """
+    if not isinstance(text, str):
+        raise ValueError("blob text must be a string")
+    digest = blob_digest(text)
+    path = _blob_path(digest)
+    if path.exists():
+        path.touch()
+        return digest
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_bytes(zlib.compress(text.encode("utf-8"), _COMPRESSION_LEVEL))
+    tmp_path.replace(path)
+    return digest
+
+
+def get_blob(digest: str) -> Optional[str]:
+    if not isinstance(digest, str) or len(digest) < 2:
+        return None
+    path = _blob_path(digest)
+    if not path.exists():
+        return None
+    return zlib.decompress(path.read_bytes()).decode("utf-8")
+
+
+def has_blob(digest: str) -> bool:
+    return isinstance(digest, str) and len(digest) >= 2 and _blob_path(digest).exists()
+
+
+def _list_blobs() -> List[Tuple[Path, float, int]]:
+    if not _BLOBS_DIR.exists():
+        return []
+    out: List[Tuple[Path, float, int]] = []
+    for path in _BLOBS_DIR.glob(f"*/*{_BLOB_SUFFIX}"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        out.append((path, stat.st_mtime, stat.st_size))
+    return out
+
+
+def blob_store_stats() -> Dict[str, int]:
+    blobs = _list_blobs()
+    return {
+        "count": len(blobs),
+        "total_bytes": sum(size for _, _, size in blobs),
+    }
+
+
+def gc_blobs(
+    max_age_s: Optional[float] = None,
+    max_total_bytes: Optional[int] = None,
+    now: Optional[float] = None,
+    referenced: Optional[AbstractSet[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Delete blobs older than `max_age_s`, then delete the oldest remaining blobs
+    until the store fits in `max_total_bytes`. Returns a summary of the pass.
+
+    Digests in `referenced` (see `log_retention_v02.referenced_blob_digests`)
+    are never deleted and still count towards the size budget, so only
+    unreferenced blobs are swept.
+    """
+    current = time.time() if now is None else now
+    blobs = sorted(_list_blobs(), key=lambda it: it[1])
+    removed = 0
+    removed_bytes = 0
+    kept: List[Tuple[Path, float, int]] = []
+    pinned: List[Tuple[Path, float, int]] = []
+
+    for path, mtime, size in blobs:
+        if referenced is not None and path.name[: -len(_BLOB_SUFFIX)] in referenced:
+            pinned.append((path, mtime, size))
+            continue
+        if max_age_s is not None and current - mtime > max_age_s:
+            path.unlink(missing_ok=True)
+            removed += 1
+            removed_bytes += size
+            continue
+        kept.append((path, mtime, size))
+
+    if max_total_bytes is not None:
+        total = sum(size for _, _, size in kept) + sum(size for _, _, size in pinned)
+        while kept and total > max_total_bytes:
+            path, _, size = kept.pop(0)
+            path.unlink(missing_ok=True)
+            removed += 1
+            removed_bytes += size
+            total -= size
+
+    kept.extend(pinned)
+    return {
+        "removed": removed,
+        "removed_bytes": removed_bytes,
+        "remaining": len(kept),
+        "remaining_bytes": sum(size for _, _, size in kept),
+    }
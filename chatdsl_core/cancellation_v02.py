@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+_CURRENT: contextvars.ContextVar[Optional["CancelToken"]] = contextvars.ContextVar(
+    "chatdsl_cancel_token", default=None
+)
+
+
+class RunCancelled(RuntimeError):
+    """Raised when a run is cancelled or its deadline passes."""
+
+
+class CancelToken:
+    """
+    Run-level deadline and cancellation flag. `deadline` is a
+    `time.monotonic()` timestamp (None for no deadline); `cancel()` may be
+    called from any thread.
+    """
+
+    def __init__(self, deadline: Optional[float] = None) -> None:
+        self.deadline = deadline
+        self._budget_s = None if deadline is None else max(0.0, deadline - time.monotonic())
+        self._cancelled = threading.Event()
+        self._reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self._children: "weakref.WeakSet[CancelToken]" = weakref.WeakSet()
+
+    @classmethod
+    def after(cls, seconds: float) -> "CancelToken":
+        return cls(time.monotonic() + seconds)
+
+    def child(self) -> "CancelToken":
+        """A token with this deadline that is cancelled along with this one, and can also be cancelled alone."""
+        token = CancelToken(self.deadline)
+        token._budget_s = self._budget_s
+        with self._lock:
+            self._children.add(token)
+        if self._cancelled.is_set():
+            token.cancel(self._reason or "cancelled")
+        return token
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._cancelled.is_set():
+            self._reason = reason
+            self._cancelled.set()
+        with self._lock:
+            children = list(self._children)
+        for token in children:
+            token.cancel(reason)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (0 once cancelled), or None without a deadline."""
+        if self._cancelled.is_set():
+            return 0.0
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def cancelled(self) -> bool:
+        return self.remaining() == 0.0
+
+    def reason(self) -> Optional[str]:
+        if self._cancelled.is_set():
+            return self._reason
+        if self.cancelled:
+            return f"deadline of {self._budget_s:.1f}s exceeded"
+        return None
+
+    def check(self) -> None:
+        reason = self.reason()
+        if reason is not None:
+            raise RunCancelled(f"Run stopped: {reason}")
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to `seconds`, waking early on cancel or deadline; True if the run should stop."""
+        remaining = self.remaining()
+        timeout = seconds if remaining is None else min(seconds, remaining)
+        self._cancelled.wait(timeout)
+        return self.cancelled
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    """The token of the run executing on this thread, if any (read by model clients)."""
+    return _CURRENT.get()
+
+
+@contextmanager
+def use_cancel_token(token: Optional[CancelToken]) -> Iterator[None]:
+    reset = _CURRENT.set(token)
+    try:
+        yield
+    finally:
+        _CURRENT.reset(reset)
+
+
+def call_cancellable(token: CancelToken, fn: Callable[..., T], *args: Any) -> T:
+    """
+    Call `fn(*args)` on a helper thread with `token` current, and stop
+    waiting as soon as the token is cancelled or its deadline passes. The
+    abandoned call finishes in the background and its result is dropped;
+    clients that read `current_cancel_token()` cut their own timeouts short.
+    """
+    token.check()
+    done = threading.Event()
+    outcome: dict = {}
+
+    def run() -> None:
+        try:
+            outcome["value"] = fn(*args)
+        except BaseException as exc:  # re-raised on the caller's thread
+            outcome["error"] = exc
+        finally:
+            done.set()
+
+    context = contextvars.copy_context()
+    context.run(_CURRENT.set, token)
+    threading.Thread(target=context.run, args=(run,), name="chatdsl-cancellable", daemon=True).start()
+    while not done.wait(_poll_interval(token)):
+        token.check()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
+
+def _poll_interval(token: CancelToken) -> float:
+    remaining = token.remaining()
+    return 0.05 if remaining is None else min(0.05, max(remaining, 0.001))
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional
+
+from .observers_v02 import ExecutionObserver
+
+
+@dataclass
+class ExecutionCheckpoint:
+    """
+    Everything a run committed before `node_path`: the node that failed, was
+    about to run when the run was cancelled, or follows the last finished
+    node in a progress checkpoint. Passing it as `resume_from` to
+    `execute_program` with the same program and initial variables restarts
+    execution at that node instead of from the top.
+
+    `commits` are `(node_path, updates)` pairs in commit order; the variable
+    scope of each enclosing `/IF` branch is rebuilt from them, so values a
+    finished branch discarded stay discarded.
+    """
+
+    node_path: List[int]
+    initial_vars: Dict[str, Any]
+    commits: List[Dict[str, Any]] = field(default_factory=list)
+    logs: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def outputs(self) -> List[str]:
+        return [
+            log["output"]
+            for log in self.logs
+            if log.get("node_kind") == "step" and isinstance(log.get("output"), str)
+        ]
+
+    @property
+    def ended_at_s(self) -> float:
+        """End of the latest finished node, on the clock its logs' `started_at_s` use."""
+        ends = [0.0]
+        for log in self.logs:
+            timings = log.get("timings")
+            if isinstance(timings, Mapping) and isinstance(timings.get("started_at_s"), (int, float)):
+                ends.append(float(timings["started_at_s"]) + float(timings.get("total_s") or 0.0))
+        return max(ends)
+
+    @property
+    def steps_done(self) -> int:
+        return sum(1 for log in self.logs if log.get("node_kind") == "step")
+
+    def scopes(self) -> List[Dict[str, Any]]:
+        """Variables of the root scope, then of each `/IF` branch enclosing `node_path`."""
+        scopes: List[Dict[str, Any]] = [dict(self.initial_vars)]
+        scopes.extend({} for _ in self.node_path[:-1])
+        for commit in self.commits:
+            parent = list(commit["node_path"][:-1])
+            depth = len(parent)
+            if depth < len(scopes) and parent == self.node_path[:depth]:
+                scopes[depth].update(commit["updates"])
+        return scopes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "node_path": list(self.node_path),
+            "initial_vars": dict(self.initial_vars),
+            "commits": [dict(commit) for commit in self.commits],
+            "logs": list(self.logs),
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "ExecutionCheckpoint":
+        return cls(
+            node_path=[int(index) for index in data["node_path"]],
+            initial_vars=dict(data.get("initial_vars") or {}),
+            commits=[dict(commit) for commit in data.get("commits") or []],
+            logs=list(data.get("logs") or []),
+            error=data.get("error"),
+        )
+
+
+class CheckpointObserver(ExecutionObserver):
+    """
+    Records commits and logs as nodes finish. After each finished node
+    `progress` is replaced with a checkpoint that resumes right after it, so
+    a caller can persist the run as it goes and resume it after a crash.
+    After a failed run `checkpoint` holds the state to resume from, and
+    stays None after a successful one. When observing a resumed run, pass
+    the checkpoint it resumes from so a second failure still carries the
+    commits made before the first.
+    """
+
+    def __init__(self, resume_from: Optional[ExecutionCheckpoint] = None) -> None:
+        self._initial_vars = dict(resume_from.initial_vars) if resume_from is not None else None
+        self._commits: List[Dict[str, Any]] = (
+            [dict(commit) for commit in resume_from.commits] if resume_from is not None else []
+        )
+        self._logs: List[Dict[str, Any]] = list(resume_from.logs) if resume_from is not None else []
+        self._failed_path: Optional[List[int]] = None
+        self.progress: Optional[ExecutionCheckpoint] = None
+        self.checkpoint: Optional[ExecutionCheckpoint] = None
+
+    def on_program_start(self, context: Mapping[str, Any]) -> None:
+        if self._initial_vars is None:
+            self._initial_vars = dict(context)
+
+    def on_commit(self, node_path: List[int], staged_updates: Dict[str, Any]) -> None:
+        self._commits.append({"node_path": list(node_path), "updates": dict(staged_updates)})
+
+    def on_condition(self, node_path: List[int], condition_var: str, value: bool) -> None:
+        # The /IF log precedes its branch's logs; this stand-in is replaced when the /IF exits.
+        self._logs.append(
+            {
+                "node_kind": "if",
+                "node_path": list(node_path),
+                "depth": len(node_path) - 1,
+                "condition_var": condition_var,
+                "condition_value": value,
+                "execution": "entered" if value else "skipped",
+            }
+        )
+
+    def on_node_exit(
+        self,
+        node_kind: str,
+        node_path: List[int],
+        log: Optional[Dict[str, Any]],
+        error: Optional[BaseException],
+    ) -> None:
+        # Exits unwind innermost first, so the first failing exit is the failed node.
+        if error is not None:
+            if self._failed_path is None:
+                self._failed_path = list(node_path)
+            return
+        if log is None:
+            return
+        if node_kind == "if":
+            for index, logged in enumerate(self._logs):
+                if logged.get("node_kind") == "if" and logged.get("node_path") == node_path:
+                    self._logs[index] = log
+        else:
+            self._logs.append(log)
+        self.progress = ExecutionCheckpoint(
+            node_path=[*node_path[:-1], node_path[-1] + 1],
+            initial_vars=dict(self._initial_vars or {}),
+            commits=list(self._commits),
+            logs=list(self._logs),
+        )
+
+    def on_program_end(self, logs: List[Dict[str, Any]], error: Optional[BaseException]) -> None:
+        if error is None or self._failed_path is None:
+            return
+        self.checkpoint = ExecutionCheckpoint(
+            node_path=self._failed_path,
+            initial_vars=dict(self._initial_vars or {}),
+            commits=list(self._commits),
+            logs=list(logs),
+            error=str(error) or type(error).__name__,
+        )
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional
+
+
+class LayeredContext(MutableMapping[str, Any]):
+    """
+    Copy-on-write variable scope chained to a parent scope.
+
+    `child()` is O(1): writes land in the child's own layer and never touch
+    the parent, so an `/IF` branch or a per-step overlay can be discarded by
+    simply dropping the child. Reads walk the chain, which is as deep as the
+    `/IF` nesting. The root layer wraps the caller's dict without copying it,
+    so root writes are visible to the caller immediately.
+    """
+
+    __slots__ = ("_local", "_parent", "_deleted")
+
+    def __init__(
+        self,
+        local: Optional[Dict[str, Any]] = None,
+        parent: Optional["LayeredContext"] = None,
+    ) -> None:
+        self._local: Dict[str, Any] = {} if local is None else local
+        self._parent = parent
+        self._deleted: set[str] = set()
+
+    def child(self) -> "LayeredContext":
+        return LayeredContext(parent=self)
+
+    @property
+    def parent(self) -> Optional["LayeredContext"]:
+        return self._parent
+
+    def local_items(self) -> Dict[str, Any]:
+        return dict(self._local)
+
+    def _chain(self) -> List["LayeredContext"]:
+        chain: List[LayeredContext] = []
+        scope: Optional[LayeredContext] = self
+        while scope is not None:
+            chain.append(scope)
+            scope = scope._parent
+        return chain
+
+    def __getitem__(self, key: str) -> Any:
+        scope: Optional[LayeredContext] = self
+        while scope is not None:
+            local = scope._local
+            if key in local:
+                return local[key]
+            if key in scope._deleted:
+                break
+            scope = scope._parent
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        scope: Optional[LayeredContext] = self
+        while scope is not None:
+            if key in scope._local:
+                return True
+            if key in scope._deleted:
+                return False
+            scope = scope._parent
+        return False
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._local[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._local.pop(key, None)
+        if self._parent is not None and key in self._parent:
+            self._deleted.add(key)
+
+    def __iter__(self) -> Iterator[str]:
+        # Root-first order keeps the insertion order a flat dict copy would have.
+        seen: set[str] = set()
+        for scope in reversed(self._chain()):
+            for key in scope._local:
+                if key in seen:
+                    continue
+                seen.add(key)
+                if key in self:
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def flatten(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self}
+
+    def __repr__(self) -> str:
+        return f"LayeredContext({self.flatten()!r})"
@@ -2,10 +2,26 @@ from __future__ import annotations
 
 import json
 import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from functools import lru_cache
-from typing import Any, Callable, Dict, List, Optional, Tuple, TypedDict
-
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, TypedDict, Union
+
+from .cancellation_v02 import CancelToken, call_cancellable
+from .checkpoint_v02 import ExecutionCheckpoint
+from .context_v02 import LayeredContext
+from .generation_v02 import (
+    GenerationConfig,
+    GenerationPolicy,
+    prefilter_generation_config,
+    step_generation_config,
+    use_generation_config,
+)
+from .observers_v02 import ExecutionObserver, combine_observers
 from .parser_v02 import FromItem, IfNode, Program, ProgramNode, Step
+from .recovery_v02 import RecoveryPolicy, build_repair_prompt, coerce_def_value, extract_json_object
+from .value_store_v02 import is_value_ref, read_value
 
 
 class ResponseSchema(TypedDict):
@@ -14,9 +30,20 @@ class ResponseSchema(TypedDict):
     required: List[str]
 
 
-ModelCall = Callable[[str, ResponseSchema], str]
-CheapModelCall = Callable[[str], str]
+@dataclass
+class ModelReply:
+    """Model text plus call metadata (usage, latency, ...) for the execution log."""
+
+    text: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+ModelCall = Callable[[str, ResponseSchema], Union[str, ModelReply]]
+CheapModelCall = Callable[[str], Union[str, ModelReply]]
 _BUILTIN_VAR_NAMES = {"ALL", "CHAT"}
+_DEFAULT_MAX_WASTED_PREFETCHES = 4
+_REJECTED_RESPONSE_CHARS = 2000
+_MISSING = object()
 
 
 @lru_cache(maxsize=None)
@@ -27,6 +54,8 @@ def _ref_pattern(sigil: str) -> re.Pattern[str]:
 def _render_value(value: Any) -> str:
     if isinstance(value, str):
         return value
+    if is_value_ref(value):
+        return read_value(value)
     return json.dumps(value, ensure_ascii=False)
 
 
@@ -46,7 +75,7 @@ def _interpolate(text: str, values: Dict[str, Any], sigil: str) -> str:
     return pattern.sub(repl, text or "")
 
 
-def _resolve_accessible_inputs(step: Step, context: Dict[str, Any]) -> Dict[str, Any]:
+def _resolve_accessible_inputs(step: Step, context: Mapping[str, Any]) -> Dict[str, Any]:
     if step.from_items is None:
         return {"CHAT": context["CHAT"]} if "CHAT" in context else {}
 
@@ -61,8 +90,31 @@ def _render_chat_history_text(chat_history: List[str]) -> str:
     return "\n\n".join(lines)
 
 
-def _build_builtin_values(context: Dict[str, Any], chat_history: List[str]) -> Dict[str, str]:
+def _required_builtin_names(step: Step) -> set[str]:
+    if step.from_items is None:
+        return {"CHAT"}
+    names: set[str] = set()
+    for item in step.from_items:
+        name = item.value if item.kind == "var" else (item.scope_var or "ALL")
+        if name in _BUILTIN_VAR_NAMES:
+            names.add(name)
+    return names
+
+
+def _build_builtin_values(
+    context: Mapping[str, Any],
+    chat_history: List[str],
+    names: Optional[Iterable[str]] = None,
+) -> Dict[str, str]:
+    wanted = set(_BUILTIN_VAR_NAMES if names is None else names)
+    if not wanted:
+        return {}
     chat_text = _render_chat_history_text(chat_history)
+    out: Dict[str, str] = {}
+    if "CHAT" in wanted:
+        out["CHAT"] = chat_text
+    if "ALL" not in wanted:
+        return out
 
     vars_lines: List[str] = []
     for name, value in context.items():
@@ -76,10 +128,8 @@ def _build_builtin_values(context: Dict[str, Any], chat_history: List[str]) -> D
     if vars_lines:
         all_parts.append("Variables:\n" + "\n".join(vars_lines))
 
-    return {
-        "CHAT": chat_text,
-        "ALL": "\n\n".join(all_parts).strip(),
-    }
+    out["ALL"] = "\n\n".join(all_parts).strip()
+    return out
 
 
 def _format_required_var_line(var_name: str, type_name: str, description: str) -> str:
@@ -93,7 +143,7 @@ def _format_required_var_line(var_name: str, type_name: str, description: str) -
 
 def build_step_prompt(
     step: Step,
-    context: Dict[str, Any],
+    context: Mapping[str, Any],
     nat_inputs: Optional[List[Tuple[str, str]]] = None,
 ) -> str:
     sigil = step.sigil
@@ -230,35 +280,154 @@ def _build_prefilter_prompt(description: str, scope_var: str, scope_text: str, s
     )
 
 
+def _split_reply(reply: Union[str, ModelReply]) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    if isinstance(reply, ModelReply):
+        return reply.text, dict(reply.metadata)
+    return reply, None
+
+
+def _elapsed(start: float, end: Optional[float] = None) -> float:
+    return round((time.perf_counter() if end is None else end) - start, 6)
+
+
+@dataclass
+class _PrefilterResult:
+    filtered_text: str
+    started_at_s: float
+    duration_s: float
+    model_call: Optional[Dict[str, Any]]
+
+
 def _run_prefilter(
     item: FromItem,
-    runtime_context: Dict[str, Any],
+    runtime_context: Mapping[str, Any],
     cheap_model_call: Optional[CheapModelCall],
     sigil: str,
-) -> Tuple[str, str]:
+    clock_origin: float,
+    generation: Optional[GenerationPolicy] = None,
+) -> _PrefilterResult:
+    started = time.perf_counter()
     scope_var = item.scope_var or "ALL"
     scope_text = _render_value(runtime_context.get(scope_var, ""))
     prompt = _build_prefilter_prompt(item.value, scope_var, scope_text, sigil)
+    model_call = None
     if cheap_model_call is None:
         filtered_text = scope_text
     else:
-        filtered_text = cheap_model_call(prompt)
+        config = prefilter_generation_config(scope_text, generation) if generation is not None else None
+        with use_generation_config(config):
+            filtered_text, model_call = _split_reply(cheap_model_call(prompt))
     if not isinstance(filtered_text, str):
         raise ValueError("cheap prefilter call must return a string")
-    label = f"{item.value} (from {sigil}{scope_var})"
-    return label, filtered_text
+    return _PrefilterResult(
+        filtered_text=filtered_text,
+        started_at_s=_elapsed(clock_origin, started),
+        duration_s=_elapsed(started),
+        model_call=model_call,
+    )
 
 
-def _parse_runtime_response(raw_response: str, step: Step) -> Dict[str, Any]:
+def _prefilter_label(item: FromItem, sigil: str) -> str:
+    return f"{item.value} (from {sigil}{item.scope_var or 'ALL'})"
+
+
+class _PrefilterPrefetcher:
+    """
+    Runs the next step's natural-language prefilters while the current step's
+    model call is in flight. A speculative result is only used when the scope
+    variable still holds the exact value it was computed from; otherwise it is
+    discarded and counted as wasted. Speculation stops for the rest of the run
+    once `max_wasted` results have been discarded.
+    """
+
+    def __init__(
+        self,
+        cheap_model_call: CheapModelCall,
+        max_wasted: int,
+        clock_origin: Optional[float] = None,
+        generation: Optional[GenerationPolicy] = None,
+    ) -> None:
+        self._cheap_model_call = cheap_model_call
+        self._generation = generation
+        self._clock_origin = time.perf_counter() if clock_origin is None else clock_origin
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chatdsl-prefetch")
+        self._pending: Dict[Tuple[int, int], Tuple[Future[_PrefilterResult], str, Any]] = {}
+        self.max_wasted = max_wasted
+        self.wasted = 0
+        self.hits = 0
+
+    def start(self, current_step: Step, next_step: Step, context: Mapping[str, Any]) -> None:
+        if self.wasted >= self.max_wasted:
+            return
+        written = {spec.var_name for spec in current_step.defs}
+        for item_index, item in enumerate(next_step.from_items or []):
+            if item.kind != "nat":
+                continue
+            scope_var = item.scope_var or "ALL"
+            if scope_var in _BUILTIN_VAR_NAMES or scope_var in written or scope_var not in context:
+                continue
+            scope_value = context[scope_var]
+            future = self._pool.submit(
+                _run_prefilter,
+                item,
+                {scope_var: scope_value},
+                self._cheap_model_call,
+                next_step.sigil,
+                self._clock_origin,
+                self._generation,
+            )
+            self._pending[(id(next_step), item_index)] = (future, scope_var, scope_value)
+
+    def take(
+        self, step: Step, item_index: int, context: Mapping[str, Any]
+    ) -> Optional[_PrefilterResult]:
+        entry = self._pending.pop((id(step), item_index), None)
+        if entry is None:
+            return None
+        future, scope_var, scope_value = entry
+        if context.get(scope_var, _MISSING) is not scope_value:
+            future.cancel()
+            self.wasted += 1
+            return None
+        try:
+            result = future.result()
+        except Exception:
+            # Fall back to a regular call so failures surface from the normal path.
+            self.wasted += 1
+            return None
+        self.hits += 1
+        return result
+
+    def close(self) -> None:
+        for future, _, _ in self._pending.values():
+            future.cancel()
+            self.wasted += 1
+        self._pending.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_runtime_response(
+    raw_response: str,
+    step: Step,
+    recovery: Optional[RecoveryPolicy] = None,
+    repairs: Optional[List[str]] = None,
+) -> Dict[str, Any]:
     try:
         parsed = json.loads(raw_response)
     except json.JSONDecodeError as exc:
-        snippet = raw_response.strip().replace("\n", "\\n")
-        if len(snippet) > 220:
-            snippet = snippet[:220] + "..."
-        raise ValueError(
-            f"Step {step.index} (line {step.start_line_no}): model response is not valid JSON. Raw response starts with: {snippet!r}"
-        ) from exc
+        extracted = None
+        if recovery is not None and recovery.lenient_json:
+            extracted = extract_json_object(raw_response)
+        if extracted is None:
+            snippet = raw_response.strip().replace("\n", "\\n")
+            if len(snippet) > 220:
+                snippet = snippet[:220] + "..."
+            raise ValueError(
+                f"Step {step.index} (line {step.start_line_no}): model response is not valid JSON. Raw response starts with: {snippet!r}"
+            ) from exc
+        parsed = extracted
+        if repairs is not None:
+            repairs.append("extracted_json")
 
     if not isinstance(parsed, dict):
         raise ValueError(
@@ -282,6 +451,11 @@ def _parse_runtime_response(raw_response: str, step: Step) -> Dict[str, Any]:
             f"Step {step.index} (line {step.start_line_no}): 'out' must be a JSON string"
         )
 
+    if error_val == 1:
+        raise RuntimeError(
+            f"Step {step.index} (line {step.start_line_no}): model returned error=1"
+        )
+
     if step.defs:
         vars_val = parsed.get("vars")
         if not isinstance(vars_val, dict):
@@ -294,11 +468,6 @@ def _parse_runtime_response(raw_response: str, step: Step) -> Dict[str, Any]:
                 f"Step {step.index} (line {step.start_line_no}): missing /DEF values in vars: {missing}"
             )
 
-    if error_val == 1:
-        raise RuntimeError(
-            f"Step {step.index} (line {step.start_line_no}): model returned error=1"
-        )
-
     return parsed
 
 
@@ -342,136 +511,407 @@ def _validate_def_value(step: Step, var_name: str, type_name: str, value: Any) -
     )
 
 
-def _execute_step_node(
-    step: Step,
-    context: Dict[str, Any],
-    logs: List[Dict[str, Any]],
-    visible_outputs: List[str],
-    chat_lines: List[str],
+def _check_step_reply(
+    response: str, step: Step, recovery: Optional[RecoveryPolicy]
+) -> Tuple[Dict[str, Any], Dict[str, Any], List[str]]:
+    """Parse and validate a step reply; returns (parsed, staged updates, repairs applied)."""
+    repairs: List[str] = []
+    parsed = _parse_runtime_response(response, step, recovery, repairs)
+    staged_updates: Dict[str, Any] = {}
+    if step.defs:
+        vars_payload = parsed["vars"]
+        for spec in step.defs:
+            value = vars_payload[spec.var_name]
+            if recovery is not None and recovery.coerce_types:
+                value, coerced = coerce_def_value(spec.value_type, value)
+                if coerced:
+                    repairs.append(f"coerced:{spec.var_name}")
+            _validate_def_value(step, spec.var_name, spec.value_type, value)
+            staged_updates[spec.var_name] = value
+    return parsed, staged_updates, repairs
+
+
+@dataclass
+class _Resume:
+    # Path of the node to restart at, relative to the items being executed,
+    # and the variables of each /IF branch scope entered along that path.
+    path: List[int]
+    scopes: List[Dict[str, Any]]
+
+
+@dataclass
+class _ExecutionRun:
+    logs: List[Dict[str, Any]]
+    visible_outputs: List[str]
+    chat_lines: List[str]
+    call_model: Optional[ModelCall]
+    cheap_model_call: Optional[CheapModelCall]
+    prefetcher: Optional[_PrefilterPrefetcher] = None
+    clock_origin: float = field(default_factory=time.perf_counter)
+    observer: Optional[ExecutionObserver] = None
+    cancel_token: Optional[CancelToken] = None
+    recovery: Optional[RecoveryPolicy] = None
+    generation: Optional[GenerationPolicy] = None
+
+
+def _widen_truncated(
+    config: Optional[GenerationConfig], model_call: Optional[Dict[str, Any]]
+) -> Optional[GenerationConfig]:
+    # A reply cut off by the output budget would be cut off again on retry.
+    if config is None or config.max_output_tokens is None or model_call is None:
+        return config
+    if model_call.get("finish_reason") != "MAX_TOKENS":
+        return config
+    return config.merged(GenerationConfig(max_output_tokens=config.max_output_tokens * 2))
+
+
+def _cancellable(token: CancelToken, fn: Callable[..., Any]) -> Callable[..., Any]:
+    def _call(*args: Any) -> Any:
+        return call_cancellable(token, fn, *args)
+
+    return _call
+
+
+def _new_execution_run(
+    chat_history: Optional[List[str]],
     call_model: Optional[ModelCall],
     cheap_model_call: Optional[CheapModelCall],
+    prefetch_prefilters: bool,
+    max_wasted_prefetches: int,
+    observers: Optional[Sequence[ExecutionObserver]] = None,
+    cancel_token: Optional[CancelToken] = None,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
+    resumed_at_s: float = 0.0,
+) -> _ExecutionRun:
+    if cancel_token is not None:
+        # Model calls stop blocking the run as soon as the token fires.
+        call_model = _cancellable(cancel_token, call_model) if call_model is not None else None
+        cheap_model_call = (
+            _cancellable(cancel_token, cheap_model_call) if cheap_model_call is not None else None
+        )
+    # A resumed run continues the clock of the logs it resumes from.
+    clock_origin = time.perf_counter() - resumed_at_s
+    prefetcher = None
+    if prefetch_prefilters and cheap_model_call is not None:
+        prefetcher = _PrefilterPrefetcher(
+            cheap_model_call, max_wasted_prefetches, clock_origin, generation
+        )
+    return _ExecutionRun(
+        logs=[],
+        visible_outputs=[],
+        chat_lines=list(chat_history or []),
+        call_model=call_model,
+        cheap_model_call=cheap_model_call,
+        prefetcher=prefetcher,
+        clock_origin=clock_origin,
+        observer=combine_observers(observers),
+        cancel_token=cancel_token,
+        recovery=recovery,
+        generation=generation,
+    )
+
+
+def _execute_step_node(
+    step: Step,
+    context: LayeredContext,
+    run: _ExecutionRun,
     node_path: List[int],
-) -> None:
+    next_step: Optional[Step] = None,
+) -> Dict[str, Any]:
     sigil = step.sigil
-    runtime_context = dict(context)
-    runtime_context.update(_build_builtin_values(context, chat_lines + visible_outputs))
+    observer = run.observer
+    step_started = time.perf_counter()
+    runtime_context = context.child()
+    runtime_context.update(
+        _build_builtin_values(
+            context, run.chat_lines + run.visible_outputs, _required_builtin_names(step)
+        )
+    )
+    builtins_done = time.perf_counter()
     nat_inputs: List[Tuple[str, str]] = []
-    prefilter_logs: List[Dict[str, str]] = []
-    for item in step.from_items or []:
+    prefilter_logs: List[Dict[str, Any]] = []
+    for item_index, item in enumerate(step.from_items or []):
         if item.kind != "nat":
             continue
-        label, filtered = _run_prefilter(item, runtime_context, cheap_model_call, sigil)
-        nat_inputs.append((label, filtered))
-        prefilter_logs.append(
-            {
-                "description": item.value,
-                "scope_var": item.scope_var or "ALL",
-                "filtered_text": filtered,
-            }
-        )
+        if observer is not None:
+            observer.on_prefilter_start(node_path, item.value, item.scope_var or "ALL")
+        result = None
+        if run.prefetcher is not None:
+            result = run.prefetcher.take(step, item_index, runtime_context)
+        speculative = result is not None
+        if result is None:
+            result = _run_prefilter(
+                item, runtime_context, run.cheap_model_call, sigil, run.clock_origin, run.generation
+            )
+        nat_inputs.append((_prefilter_label(item, sigil), result.filtered_text))
+        prefilter_log = {
+            "description": item.value,
+            "scope_var": item.scope_var or "ALL",
+            "filtered_text": result.filtered_text,
+            "speculative": speculative,
+            "started_at_s": result.started_at_s,
+            "duration_s": result.duration_s,
+            "model_call": result.model_call,
+        }
+        prefilter_logs.append(prefilter_log)
+        if observer is not None:
+            observer.on_prefilter_end(node_path, prefilter_log)
+    prefilters_done = time.perf_counter()
 
     prompt = build_step_prompt(step, runtime_context, nat_inputs=nat_inputs)
     response_schema = build_response_schema(step)
-    if call_model is None:
-        response = _default_stub_response(step)
-    else:
-        response = call_model(prompt, response_schema)
-
-    parsed = _parse_runtime_response(response, step)
-
-    staged_updates: Dict[str, Any] = {}
-    if step.defs:
-        vars_payload = parsed["vars"]
-        for spec in step.defs:
-            value = vars_payload[spec.var_name]
-            _validate_def_value(step, spec.var_name, spec.value_type, value)
-            staged_updates[spec.var_name] = value
+    prompt_done = time.perf_counter()
+    if run.prefetcher is not None and next_step is not None:
+        run.prefetcher.start(step, next_step, context)
+    model_call: Optional[Dict[str, Any]] = None
+    generation_config = (
+        step_generation_config(step, run.generation) if run.generation is not None else None
+    )
+    recovery = run.recovery
+    retries: List[Dict[str, Any]] = []
+    attempt_prompt = prompt
+    while True:
+        if run.call_model is None:
+            response = _default_stub_response(step)
+        else:
+            if observer is not None:
+                observer.on_model_call_start(node_path, attempt_prompt, response_schema)
+            with use_generation_config(generation_config):
+                response, model_call = _split_reply(run.call_model(attempt_prompt, response_schema))
+            if observer is not None:
+                observer.on_model_call_end(node_path, response, model_call)
+        model_done = time.perf_counter()
+        try:
+            parsed, staged_updates, repairs = _check_step_reply(response, step, recovery)
+        except ValueError as exc:
+            # Only contract violations are retried; error=1 replies raise RuntimeError.
+            if run.call_model is None or recovery is None or len(retries) >= recovery.max_retries:
+                raise
+            rejected = response if isinstance(response, str) else str(response)
+            if len(rejected) > _REJECTED_RESPONSE_CHARS:
+                rejected = rejected[:_REJECTED_RESPONSE_CHARS] + "…"
+            retries.append({"error": str(exc), "model_call": model_call, "raw_response": rejected})
+            attempt_prompt = build_repair_prompt(prompt, str(exc))
+            generation_config = _widen_truncated(generation_config, model_call)
+            continue
+        break
+    validate_done = time.perf_counter()
 
     context.update(staged_updates)
-    visible_outputs.append(parsed["out"])
-    logs.append(
-        {
-            "node_kind": "step",
-            "node_path": list(node_path),
-            "depth": len(node_path) - 1,
-            "execution": "executed",
-            "step_index": step.index,
-            "start_line_no": step.start_line_no,
-            "text": step.text,
-            "output": parsed["out"],
-            "prompt": prompt,
-            "response_schema": response_schema,
-            "raw_response": response,
-            "parsed_json": parsed,
-            "staged_updates": staged_updates,
-            "prefilter_logs": prefilter_logs,
-        }
+    run.visible_outputs.append(parsed["out"])
+    if observer is not None:
+        observer.on_commit(node_path, staged_updates)
+    commit_done = time.perf_counter()
+    step_log = {
+        "node_kind": "step",
+        "node_path": list(node_path),
+        "depth": len(node_path) - 1,
+        "execution": "executed",
+        "step_index": step.index,
+        "start_line_no": step.start_line_no,
+        "text": step.text,
+        "output": parsed["out"],
+        "prompt": prompt,
+        "response_schema": response_schema,
+        "raw_response": response,
+        "model_call": model_call,
+        "parsed_json": parsed,
+        "staged_updates": staged_updates,
+        "prefilter_logs": prefilter_logs,
+        "timings": {
+            "started_at_s": _elapsed(run.clock_origin, step_started),
+            "builtins_s": _elapsed(step_started, builtins_done),
+            "prefilters_s": _elapsed(builtins_done, prefilters_done),
+            "prompt_s": _elapsed(prefilters_done, prompt_done),
+            "model_call_s": _elapsed(prompt_done, model_done),
+            "validate_s": _elapsed(model_done, validate_done),
+            "commit_s": _elapsed(validate_done, commit_done),
+            "total_s": _elapsed(step_started, commit_done),
+        },
+    }
+    if generation_config is not None:
+        step_log["generation_config"] = generation_config.to_dict()
+    if repairs or retries:
+        step_log["recovery"] = {"repairs": repairs, "retries": retries}
+    run.logs.append(step_log)
+    return step_log
+
+
+def _resume_if_node(
+    item: IfNode,
+    context: LayeredContext,
+    run: _ExecutionRun,
+    node_path: List[int],
+    resume: _Resume,
+) -> Dict[str, Any]:
+    # The guard was true when the checkpoint was taken: re-enter the branch
+    # with its committed variables instead of evaluating the guard again.
+    resumed = time.perf_counter()
+    log_index = next(
+        (
+            index
+            for index, log in enumerate(run.logs)
+            if log.get("node_kind") == "if" and log.get("node_path") == node_path
+        ),
+        None,
     )
+    if log_index is None or run.logs[log_index].get("execution") != "entered":
+        raise ValueError(f"Checkpoint does not match the program: no entered /IF at {node_path}")
+    branch_context = context.child()
+    branch_context.update(resume.scopes[0])
+    _execute_program_nodes(
+        item.items, branch_context, run, node_path, _Resume(resume.path, resume.scopes[1:])
+    )
+    # The block starts with its earliest logged child and spans both attempts.
+    if_log = {
+        **run.logs[log_index],
+        "depth": len(node_path) - 1,
+        "start_line_no": item.start_line_no,
+        "child_count": len(item.items),
+    }
+    child_starts = [
+        log["timings"]["started_at_s"]
+        for log in run.logs
+        if log.get("node_path", [])[: len(node_path)] == node_path
+        and isinstance(log.get("timings"), dict)
+        and "started_at_s" in log["timings"]
+    ]
+    started_at_s = min(child_starts, default=_elapsed(run.clock_origin, resumed))
+    if_log["timings"] = {
+        "started_at_s": started_at_s,
+        "total_s": round(_elapsed(run.clock_origin) - started_at_s, 6),
+    }
+    run.logs[log_index] = if_log
+    return if_log
+
+
+def _execute_if_node(
+    item: IfNode,
+    context: LayeredContext,
+    run: _ExecutionRun,
+    node_path: List[int],
+) -> Dict[str, Any]:
+    if item.condition_var not in context:
+        raise ValueError(
+            f"Line {item.start_line_no}: missing /IF variable '{item.condition_var}' at runtime"
+        )
+
+    guard_value = context[item.condition_var]
+    if type(guard_value) is not bool:
+        raise ValueError(
+            f"Line {item.start_line_no}: /IF variable '{item.condition_var}' must be bool at runtime"
+        )
+
+    if_started = time.perf_counter()
+    if_log: Dict[str, Any] = {
+        "node_kind": "if",
+        "node_path": node_path,
+        "depth": len(node_path) - 1,
+        "start_line_no": item.start_line_no,
+        "condition_var": item.condition_var,
+        "condition_value": guard_value,
+        "execution": "entered" if guard_value else "skipped",
+        "child_count": len(item.items),
+    }
+    run.logs.append(if_log)
+    if run.observer is not None:
+        run.observer.on_condition(node_path, item.condition_var, guard_value)
+
+    if guard_value:
+        branch_context = context.child()
+        _execute_program_nodes(item.items, branch_context, run, node_path)
+    if_log["timings"] = {
+        "started_at_s": _elapsed(run.clock_origin, if_started),
+        "total_s": _elapsed(if_started),
+    }
+    return if_log
+
+
+def _execute_node(
+    item: ProgramNode,
+    context: LayeredContext,
+    run: _ExecutionRun,
+    node_path: List[int],
+    next_step: Optional[Step],
+    resume: Optional[_Resume] = None,
+) -> Dict[str, Any]:
+    if run.cancel_token is not None:
+        # Checked per node, so the remaining steps are skipped once the run is stopped.
+        run.cancel_token.check()
+    if isinstance(item, Step):
+        return _execute_step_node(item, context, run, node_path, next_step=next_step)
+    if resume is not None:
+        return _resume_if_node(item, context, run, node_path, resume)
+    return _execute_if_node(item, context, run, node_path)
+
+
+def _execute_observed_node(
+    observer: ExecutionObserver,
+    item: ProgramNode,
+    context: LayeredContext,
+    run: _ExecutionRun,
+    node_path: List[int],
+    next_step: Optional[Step],
+    resume: Optional[_Resume] = None,
+) -> None:
+    node_kind = "step" if isinstance(item, Step) else "if"
+    observer.on_node_enter(node_kind, node_path)
+    try:
+        log = _execute_node(item, context, run, node_path, next_step, resume)
+    except BaseException as exc:
+        observer.on_node_exit(node_kind, node_path, None, exc)
+        raise
+    observer.on_node_exit(node_kind, node_path, log, None)
 
 
 def _execute_program_nodes(
     items: List[ProgramNode],
-    context: Dict[str, Any],
-    logs: List[Dict[str, Any]],
-    visible_outputs: List[str],
-    chat_lines: List[str],
-    call_model: Optional[ModelCall],
-    cheap_model_call: Optional[CheapModelCall],
+    context: LayeredContext,
+    run: _ExecutionRun,
     path_prefix: List[int],
+    resume: Optional[_Resume] = None,
 ) -> None:
-    for child_index, item in enumerate(items):
-        node_path = [*path_prefix, child_index]
-        if isinstance(item, Step):
-            _execute_step_node(
-                item,
-                context,
-                logs,
-                visible_outputs,
-                chat_lines,
-                call_model,
-                cheap_model_call,
-                node_path,
-            )
-            continue
-
-        if item.condition_var not in context:
+    start = 0
+    if resume is not None:
+        start = resume.path[0]
+        # A progress checkpoint taken after a block's last node resumes just past its end.
+        nested = len(resume.path) > 1
+        if start > len(items) or (nested and (start == len(items) or not isinstance(items[start], IfNode))):
             raise ValueError(
-                f"Line {item.start_line_no}: missing /IF variable '{item.condition_var}' at runtime"
+                f"Checkpoint does not match the program: no node at {[*path_prefix, *resume.path]}"
             )
-
-        guard_value = context[item.condition_var]
-        if type(guard_value) is not bool:
-            raise ValueError(
-                f"Line {item.start_line_no}: /IF variable '{item.condition_var}' must be bool at runtime"
+    for child_index in range(start, len(items)):
+        item = items[child_index]
+        node_path = [*path_prefix, child_index]
+        next_item = items[child_index + 1] if child_index + 1 < len(items) else None
+        next_step = next_item if isinstance(next_item, Step) else None
+        child_resume = None
+        if resume is not None and child_index == start and len(resume.path) > 1:
+            child_resume = _Resume(resume.path[1:], resume.scopes)
+        if run.observer is None:
+            _execute_node(item, context, run, node_path, next_step, child_resume)
+        else:
+            _execute_observed_node(
+                run.observer, item, context, run, node_path, next_step, child_resume
             )
 
-        logs.append(
-            {
-                "node_kind": "if",
-                "node_path": node_path,
-                "depth": len(node_path) - 1,
-                "start_line_no": item.start_line_no,
-                "condition_var": item.condition_var,
-                "condition_value": guard_value,
-                "execution": "entered" if guard_value else "skipped",
-                "child_count": len(item.items),
-            }
-        )
-
-        if not guard_value:
-            continue
 
-        branch_context = dict(context)
-        _execute_program_nodes(
-            item.items,
-            branch_context,
-            logs,
-            visible_outputs,
-            chat_lines,
-            call_model,
-            cheap_model_call,
-            node_path,
-        )
+def _run_observed(run: _ExecutionRun, context: Mapping[str, Any], body: Callable[[], None]) -> None:
+    observer = run.observer
+    try:
+        if observer is not None:
+            observer.on_program_start(context)
+        body()
+    except BaseException as exc:
+        if observer is not None:
+            observer.on_program_end(run.logs, exc)
+        raise
+    finally:
+        if run.prefetcher is not None:
+            run.prefetcher.close()
+    if observer is not None:
+        observer.on_program_end(run.logs, None)
 
 
 def execute_steps(
@@ -480,25 +920,38 @@ def execute_steps(
     call_model: Optional[ModelCall] = None,
     chat_history: Optional[List[str]] = None,
     cheap_model_call: Optional[CheapModelCall] = None,
+    prefetch_prefilters: bool = False,
+    max_wasted_prefetches: int = _DEFAULT_MAX_WASTED_PREFETCHES,
+    observers: Optional[Sequence[ExecutionObserver]] = None,
+    cancel_token: Optional[CancelToken] = None,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
 ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[str]]:
     """Execute steps with prompt construction and model-call injection support."""
-    logs: List[Dict[str, Any]] = []
-    visible_outputs: List[str] = []
-    chat_lines = list(chat_history or [])
-
-    for st in steps:
-        _execute_step_node(
-            st,
-            context,
-            logs,
-            visible_outputs,
-            chat_lines,
-            call_model,
-            cheap_model_call,
-            [st.index],
-        )
+    run = _new_execution_run(
+        chat_history,
+        call_model,
+        cheap_model_call,
+        prefetch_prefilters,
+        max_wasted_prefetches,
+        observers,
+        cancel_token,
+        recovery,
+        generation,
+    )
+    root_context = LayeredContext(context)
+
+    def _body() -> None:
+        for pos, st in enumerate(steps):
+            node_path = [st.index]
+            next_step = steps[pos + 1] if pos + 1 < len(steps) else None
+            if run.observer is None:
+                _execute_node(st, root_context, run, node_path, next_step)
+            else:
+                _execute_observed_node(run.observer, st, root_context, run, node_path, next_step)
 
-    return context, logs, visible_outputs
+    _run_observed(run, context, _body)
+    return context, run.logs, run.visible_outputs
 
 
 def execute_program(
@@ -507,21 +960,63 @@ def execute_program(
     call_model: Optional[ModelCall] = None,
     chat_history: Optional[List[str]] = None,
     cheap_model_call: Optional[CheapModelCall] = None,
+    prefetch_prefilters: bool = False,
+    max_wasted_prefetches: int = _DEFAULT_MAX_WASTED_PREFETCHES,
+    observers: Optional[Sequence[ExecutionObserver]] = None,
+    cancel_token: Optional[CancelToken] = None,
+    resume_from: Optional[ExecutionCheckpoint] = None,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
 ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[str]]:
-    """Execute a v0.4 Program AST with nested /IF blocks."""
-    logs: List[Dict[str, Any]] = []
-    visible_outputs: List[str] = []
-    chat_lines = list(chat_history or [])
-
-    _execute_program_nodes(
-        program.items,
-        context,
-        logs,
-        visible_outputs,
-        chat_lines,
+    """
+    Execute a v0.4 Program AST with nested /IF blocks.
+
+    With `prefetch_prefilters`, natural-language /FROM prefilters of the next
+    sibling step start while the current step's model call is in flight,
+    provided their scope variable is not written by the current step.
+
+    `observers` receive lifecycle callbacks (see `observers_v02`); with none
+    registered the executor only pays a None check per hook site.
+
+    With a `cancel_token` (see `cancellation_v02`), `RunCancelled` is raised
+    before the next node once the token is cancelled or its deadline passes,
+    and in-flight model and prefilter calls are abandoned instead of awaited.
+
+    With `resume_from` (a checkpoint from `checkpoint_v02.CheckpointObserver`
+    of a failed run of the same program), execution restarts at the failed
+    node: `context` gets the checkpoint's committed root variables, and the
+    returned logs and outputs include those of the steps it skips.
+
+    With a `recovery` policy (see `recovery_v02`), replies that break the
+    response contract are repaired where that is lossless and otherwise
+    re-requested for the failing step only; without one they fail the run.
+
+    With a `generation` policy (see `generation_v02`), each step's model call
+    carries an output token budget and temperature derived from its /DEF
+    types and /OUT intent, and prefilter calls a budget sized to their scope;
+    model clients read it through `current_generation_config()`.
+    """
+    run = _new_execution_run(
+        chat_history,
         call_model,
         cheap_model_call,
-        [],
+        prefetch_prefilters,
+        max_wasted_prefetches,
+        observers,
+        cancel_token,
+        recovery,
+        generation,
+        resumed_at_s=resume_from.ended_at_s if resume_from is not None else 0.0,
     )
-
-    return context, logs, visible_outputs
+    resume = None
+    if resume_from is not None:
+        scopes = resume_from.scopes()
+        context.update(scopes[0])
+        run.logs.extend(resume_from.logs)
+        run.visible_outputs.extend(resume_from.outputs)
+        resume = _Resume(list(resume_from.node_path), scopes[1:])
+    root_context = LayeredContext(context)
+    _run_observed(
+        run, context, lambda: _execute_program_nodes(program.items, root_context, run, [], resume)
+    )
+    return context, run.logs, run.visible_outputs
@@ -6,8 +6,11 @@ import random
 import time
 import urllib.error
 import urllib.request
+from dataclasses import dataclass, field
 from typing import Any, Dict, Optional
 
+from .cancellation_v02 import CancelToken, current_cancel_token
+from .generation_v02 import GenerationConfig, current_generation_config
 
 _DEFAULT_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
 _API_BASE = os.environ.get(
@@ -15,6 +18,37 @@ _API_BASE = os.environ.get(
 )
 _RETRY_MAX = 3
 _RETRY_BASE_DELAY_S = 1.0
+_USAGE_FIELDS = {
+    "promptTokenCount": "prompt_tokens",
+    "candidatesTokenCount": "candidates_tokens",
+    "cachedContentTokenCount": "cached_tokens",
+    "thoughtsTokenCount": "thoughts_tokens",
+    "totalTokenCount": "total_tokens",
+}
+
+
+@dataclass
+class GeminiResult:
+    text: str
+    model: str
+    model_version: Optional[str] = None
+    usage: Dict[str, int] = field(default_factory=dict)
+    latency_s: float = 0.0
+    retries: int = 0
+    http_status: Optional[int] = None
+    finish_reason: Optional[str] = None
+
+    def metadata(self) -> Dict[str, Any]:
+        """JSON-safe call metadata for execution logs."""
+        return {
+            "model": self.model,
+            "model_version": self.model_version,
+            "usage": dict(self.usage),
+            "latency_s": self.latency_s,
+            "retries": self.retries,
+            "http_status": self.http_status,
+            "finish_reason": self.finish_reason,
+        }
 
 
 def _get_default_timeout() -> float:
@@ -25,12 +59,53 @@ def _get_default_timeout() -> float:
         return 120.0
 
 
+def _parse_usage(data: Dict[str, Any]) -> Dict[str, int]:
+    raw = data.get("usageMetadata")
+    if not isinstance(raw, dict):
+        return {}
+    return {
+        name: int(raw[key])
+        for key, name in _USAGE_FIELDS.items()
+        if isinstance(raw.get(key), (int, float))
+    }
+
+
 def call_gemini(
     prompt: str,
     model: Optional[str] = None,
     timeout_s: Optional[float] = None,
     response_schema: Optional[Dict[str, Any]] = None,
 ) -> str:
+    return call_gemini_detailed(
+        prompt,
+        model=model,
+        timeout_s=timeout_s,
+        response_schema=response_schema,
+    ).text
+
+
+def call_gemini_detailed(
+    prompt: str,
+    model: Optional[str] = None,
+    timeout_s: Optional[float] = None,
+    response_schema: Optional[Dict[str, Any]] = None,
+    cancel_token: Optional[CancelToken] = None,
+    generation_config: Optional[GenerationConfig] = None,
+) -> GeminiResult:
+    """
+    Same request as `call_gemini`, but returns the text together with token
+    usage, model version, wall-clock latency (including retry backoff), the
+    number of retries and the final HTTP status.
+
+    `cancel_token` defaults to the token of the run executing this call.
+    Each attempt's timeout is capped by the time the run has left, and a
+    cancelled or expired run raises `RunCancelled` instead of retrying.
+
+    `generation_config` (output token budget, temperature, stop sequences)
+    defaults to the config the executor set for the step being run. A reply
+    cut off by `maxOutputTokens` is returned as is, empty or not, with
+    `finish_reason` "MAX_TOKENS"; widening the budget is left to the caller.
+    """
     if not isinstance(prompt, str) or prompt.strip() == "":
         raise ValueError("prompt must be a non-empty string")
 
@@ -41,11 +116,14 @@ def call_gemini(
     model_name = model or _DEFAULT_MODEL
     url = f"{_API_BASE}/models/{model_name}:generateContent"
 
-    generation_config: Dict[str, Any] = {
+    config = generation_config if generation_config is not None else current_generation_config()
+    request_config: Dict[str, Any] = {
         "responseMimeType": "application/json",
     }
     if response_schema is not None:
-        generation_config["responseSchema"] = response_schema
+        request_config["responseSchema"] = response_schema
+    if config is not None:
+        request_config.update(config.to_gemini())
 
     payload = {
         "contents": [
@@ -56,9 +134,16 @@ def call_gemini(
             }
         ],
         # Ask Gemini to emit JSON text directly to reduce markdown/prose drift.
-        "generationConfig": generation_config,
+        "generationConfig": request_config,
     }
 
+    timeout = _get_default_timeout() if timeout_s is None else float(timeout_s)
+    timeout_arg = None if timeout <= 0 else timeout
+    token = cancel_token if cancel_token is not None else current_cancel_token()
+
+    started = time.perf_counter()
+    retries = 0
+    http_status: Optional[int] = None
     req = urllib.request.Request(
         url,
         data=json.dumps(payload).encode("utf-8"),
@@ -68,13 +153,16 @@ def call_gemini(
         },
         method="POST",
     )
-
-    timeout = _get_default_timeout() if timeout_s is None else float(timeout_s)
-    timeout_arg = None if timeout <= 0 else timeout
-
     for attempt in range(_RETRY_MAX + 1):
+        attempt_timeout = timeout_arg
+        if token is not None:
+            token.check()
+            remaining = token.remaining()
+            if remaining is not None:
+                attempt_timeout = remaining if attempt_timeout is None else min(attempt_timeout, remaining)
         try:
-            with urllib.request.urlopen(req, timeout=timeout_arg) as resp:
+            with urllib.request.urlopen(req, timeout=attempt_timeout) as resp:
+                http_status = getattr(resp, "status", None)
                 data = json.load(resp)
             break
         except urllib.error.HTTPError as e:
@@ -82,24 +170,47 @@ def call_gemini(
             if e.code == 503 and attempt < _RETRY_MAX:
                 delay = _RETRY_BASE_DELAY_S * (2 ** attempt)
                 delay += random.random() * 0.25
-                time.sleep(delay)
+                if token is None:
+                    time.sleep(delay)
+                elif token.wait(delay):
+                    token.check()
+                retries += 1
                 continue
             raise RuntimeError(f"Gemini HTTP error {e.code}: {body}") from e
-        except urllib.error.URLError as e:
+        except (urllib.error.URLError, TimeoutError) as e:
+            if token is not None:
+                # A timeout cut short by the run deadline reports the deadline.
+                token.check()
+            if isinstance(e, TimeoutError):
+                raise
             raise RuntimeError(f"Gemini connection error: {e}") from e
 
     if "error" in data:
         raise RuntimeError(f"Gemini API error: {data['error']}")
+    usage = _parse_usage(data)
 
     candidates = data.get("candidates", [])
     if not candidates:
         raise RuntimeError("Gemini returned no candidates")
 
+    finish_reason = candidates[0].get("finishReason")
     content = candidates[0].get("content", {})
     parts = content.get("parts", [])
     texts = [p.get("text", "") for p in parts if isinstance(p, dict)]
     text = "".join(texts).strip()
-    if text == "":
+    # A reply cut off by the output budget, even an empty one, is returned with
+    # its finish reason; the executor's recovery retry widens the budget.
+    if text == "" and finish_reason != "MAX_TOKENS":
         raise RuntimeError("Gemini returned empty text")
 
-    return text
+    model_version = data.get("modelVersion")
+    return GeminiResult(
+        text=text,
+        model=model_name,
+        model_version=model_version if isinstance(model_version, str) else None,
+        usage=usage,
+        latency_s=round(time.perf_counter() - started, 6),
+        retries=retries,
+        http_status=http_status if isinstance(http_status, int) else None,
+        finish_reason=finish_reason if isinstance(finish_reason, str) else None,
+    )
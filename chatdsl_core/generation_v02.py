@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import contextvars
+import math
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+from .parser_v02 import Step
+
+
+# Answer-token budgets by /DEF type, plus the JSON envelope around them.
+_DEF_TOKENS = {"bool": 4, "int": 12, "float": 16, "str": 256, "nat": 512}
+_ENVELOPE_TOKENS = 24
+_OUT_TOKENS = 1024
+_NO_OUT_TOKENS = 128
+_CHARS_PER_TOKEN = 4
+_PREFILTER_MIN_TOKENS = 64
+_PREFILTER_MAX_TOKENS = 8192
+
+_CURRENT: contextvars.ContextVar[Optional["GenerationConfig"]] = contextvars.ContextVar(
+    "chatdsl_generation_config", default=None
+)
+
+
+@dataclass(frozen=True)
+class GenerationConfig:
+    """
+    Per-call generation settings; None fields are left to the model's
+    defaults. On thinking models `max_output_tokens` also covers thinking
+    tokens, so pair tight budgets with a small `thinking_budget`.
+    """
+
+    max_output_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    stop_sequences: Optional[Tuple[str, ...]] = None
+    thinking_budget: Optional[int] = None
+
+    def merged(self, override: Optional["GenerationConfig"]) -> "GenerationConfig":
+        """This config with every field `override` sets replaced."""
+        if override is None:
+            return self
+        changes = {
+            f.name: getattr(override, f.name)
+            for f in fields(override)
+            if getattr(override, f.name) is not None
+        }
+        return replace(self, **changes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if value is not None:
+                data[f.name] = list(value) if isinstance(value, tuple) else value
+        return data
+
+    def to_gemini(self) -> Dict[str, Any]:
+        """`generationConfig` keys for the Gemini REST API."""
+        config: Dict[str, Any] = {}
+        if self.max_output_tokens is not None:
+            config["maxOutputTokens"] = self.max_output_tokens
+        if self.temperature is not None:
+            config["temperature"] = self.temperature
+        if self.stop_sequences:
+            config["stopSequences"] = list(self.stop_sequences)
+        if self.thinking_budget is not None:
+            config["thinkingConfig"] = {"thinkingBudget": self.thinking_budget}
+        return config
+
+
+@dataclass(frozen=True)
+class GenerationPolicy:
+    """
+    Derive a `GenerationConfig` per step and prefilter call. `defaults` are
+    applied on top of every derived config, then `step_overrides` by step
+    index on top of that.
+    """
+
+    defaults: GenerationConfig = field(default_factory=GenerationConfig)
+    step_overrides: Mapping[int, GenerationConfig] = field(default_factory=dict)
+
+
+def step_generation_config(step: Step, policy: Optional[GenerationPolicy] = None) -> GenerationConfig:
+    """
+    Budget the reply from the step's declarations: the JSON envelope, an `out`
+    sized by whether the step has an /OUT intent, and each /DEF value by type.
+    Steps that only produce bool/int/float values run at temperature 0.
+    """
+    policy = policy or GenerationPolicy()
+    tokens = _ENVELOPE_TOKENS + (_OUT_TOKENS if step.out_text is not None else _NO_OUT_TOKENS)
+    for spec in step.defs:
+        tokens += _DEF_TOKENS.get(spec.value_type.lower(), _DEF_TOKENS["nat"])
+        tokens += math.ceil(len(spec.var_name) / _CHARS_PER_TOKEN) + 2
+    structured = (
+        step.out_text is None
+        and bool(step.defs)
+        and all(spec.value_type.lower() in {"bool", "int", "float"} for spec in step.defs)
+    )
+    derived = GenerationConfig(max_output_tokens=tokens, temperature=0.0 if structured else None)
+    return derived.merged(policy.defaults).merged(policy.step_overrides.get(step.index))
+
+
+def prefilter_generation_config(
+    scope_text: str, policy: Optional[GenerationPolicy] = None
+) -> GenerationConfig:
+    """An extract of `scope_text` is never longer than the scope itself."""
+    policy = policy or GenerationPolicy()
+    tokens = math.ceil(len(scope_text) / _CHARS_PER_TOKEN) + _ENVELOPE_TOKENS
+    tokens = min(max(tokens, _PREFILTER_MIN_TOKENS), _PREFILTER_MAX_TOKENS)
+    return GenerationConfig(max_output_tokens=tokens, temperature=0.0).merged(policy.defaults)
+
+
+def current_generation_config() -> Optional[GenerationConfig]:
+    """The config of the model call executing on this thread, if any (read by model clients)."""
+    return _CURRENT.get()
+
+
+@contextmanager
+def use_generation_config(config: Optional[GenerationConfig]) -> Iterator[None]:
+    reset = _CURRENT.set(config)
+    try:
+        yield
+    finally:
+        _CURRENT.reset(reset)
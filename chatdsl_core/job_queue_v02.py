@@ -0,0 +1,485 @@
+"""Run with: python -m chatdsl_core.job_queue_v02 worker --queue runs.db --processes 4"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .cancellation_v02 import CancelToken
+from .executor_v02 import CheapModelCall, ModelCall
+from .generation_v02 import GenerationPolicy
+from .recovery_v02 import RecoveryPolicy
+from .runtime_v02 import RunResult, run_dsl_text
+
+
+DEFAULT_LEASE_S = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_S = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    jobs_done INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+@dataclass
+class QueuedJob:
+    job_id: str
+    status: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+
+
+def _row_to_job(row: sqlite3.Row) -> QueuedJob:
+    return QueuedJob(
+        job_id=row["job_id"],
+        status=row["status"],
+        payload=json.loads(row["payload"]),
+        attempts=row["attempts"],
+        max_attempts=row["max_attempts"],
+        result=json.loads(row["result"]) if row["result"] is not None else None,
+        error=row["error"],
+        lease_owner=row["lease_owner"],
+        lease_expires_at=row["lease_expires_at"],
+    )
+
+
+class JobQueue:
+    """
+    Durable DSL run queue in one SQLite file, shared by any number of worker
+    processes. A worker leases a job for `lease_s` seconds and must renew
+    the lease while it runs; a job whose lease expires (the worker crashed
+    or hung) is handed to the next worker. Each lease counts as an attempt,
+    and a job is marked `failed` once `max_attempts` are used up.
+
+    Statuses are `queued`, `running`, `done` and `failed`. Workers on other
+    hosts can share the file only over a filesystem with working POSIX
+    locks; network filesystems often lack them.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation keeps the queue usable
+        # from any thread and any process.
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(
+        self,
+        text: str,
+        context: Optional[Dict[str, Any]] = None,
+        sigil: str = "@",
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> str:
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        job_id = f"job-{uuid.uuid4().hex[:12]}"
+        payload = json.dumps({"text": text, "context": dict(context or {}), "sigil": sigil})
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, payload, max_attempts, created_at, updated_at)"
+                " VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, payload, max_attempts, now, now),
+            )
+        return job_id
+
+    def lease(self, worker_id: str, lease_s: float = DEFAULT_LEASE_S) -> Optional[QueuedJob]:
+        """Claim the oldest runnable job for `worker_id`, or return None if there is none."""
+        now = time.time()
+        with self._transaction() as conn:
+            # Expired leases that used their last attempt fail instead of running again.
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'lease expired after the last attempt',"
+                " lease_owner = NULL, lease_expires_at = NULL, updated_at = ?"
+                " WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued'"
+                " OR (status = 'running' AND lease_expires_at < ?)"
+                " ORDER BY created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?,"
+                " lease_expires_at = ?, updated_at = ? WHERE job_id = ?",
+                (worker_id, now + lease_s, now, row["job_id"]),
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone()
+        return _row_to_job(row)
+
+    def renew(self, job_id: str, worker_id: str, lease_s: float = DEFAULT_LEASE_S) -> bool:
+        """Extend a lease; False means the lease was lost and the result will be discarded."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ?"
+                " WHERE job_id = ? AND status = 'running' AND lease_owner = ?",
+                (now + lease_s, now, job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL,"
+                " lease_expires_at = NULL, updated_at = ?"
+                " WHERE job_id = ? AND status = 'running' AND lease_owner = ?",
+                (json.dumps(result, ensure_ascii=False, default=str), now, job_id, worker_id),
+            )
+            if cursor.rowcount == 1:
+                conn.execute(
+                    "UPDATE workers SET jobs_done = jobs_done + 1 WHERE worker_id = ?", (worker_id,)
+                )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """Release a lease after an error; the job is queued again while attempts remain."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN ? AND attempts < max_attempts"
+                " THEN 'queued' ELSE 'failed' END,"
+                " error = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?"
+                " WHERE job_id = ? AND status = 'running' AND lease_owner = ?",
+                (retry, error, now, job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[QueuedJob]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def heartbeat(self, worker_id: str) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO workers (worker_id, host, pid, started_at, heartbeat_at)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (worker_id, socket.gethostname(), os.getpid(), now, now),
+            )
+
+    def workers(self, alive_within_s: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Registered workers, optionally only those with a heartbeat in the last `alive_within_s`."""
+        query = "SELECT * FROM workers"
+        params: tuple = ()
+        if alive_within_s is not None:
+            query += " WHERE heartbeat_at >= ?"
+            params = (time.time() - alive_within_s,)
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query + " ORDER BY started_at", params)]
+
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def _is_retryable(result: RunResult) -> bool:
+    # Parse errors fail the same way every time; execution errors are
+    # mostly model or network failures worth another attempt.
+    return not result.ok and not (result.error or "").startswith("Parse error")
+
+
+def run_worker(
+    queue: JobQueue,
+    call_model: Optional[ModelCall] = None,
+    cheap_model_call: Optional[CheapModelCall] = None,
+    worker_id: Optional[str] = None,
+    lease_s: float = DEFAULT_LEASE_S,
+    poll_s: float = DEFAULT_POLL_S,
+    max_jobs: Optional[int] = None,
+    exit_when_idle: bool = False,
+    stop: Optional[threading.Event] = None,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
+) -> int:
+    """
+    Lease and execute jobs until `stop` is set, `max_jobs` have been handled
+    or, with `exit_when_idle`, the queue has nothing runnable. While a job
+    runs, a background thread renews its lease and the worker heartbeat
+    every third of `lease_s`; if a renewal fails the lease belongs to
+    another worker, so the run is cancelled and its result dropped.
+    `recovery` and `generation` apply to every run. Returns the number of
+    jobs handled.
+    """
+    worker_id = worker_id or new_worker_id()
+    stop = stop or threading.Event()
+    handled = 0
+    queue.heartbeat(worker_id)
+    while not stop.is_set() and (max_jobs is None or handled < max_jobs):
+        job = queue.lease(worker_id, lease_s)
+        if job is None:
+            if exit_when_idle:
+                break
+            queue.heartbeat(worker_id)
+            stop.wait(poll_s)
+            continue
+
+        finished = threading.Event()
+        token = CancelToken()
+
+        def keep_alive(job_id: str = job.job_id, token: CancelToken = token) -> None:
+            while not finished.wait(lease_s / 3):
+                if not queue.renew(job_id, worker_id, lease_s):
+                    token.cancel("lease lost")
+                    return
+                queue.heartbeat(worker_id)
+
+        renewer = threading.Thread(target=keep_alive, name="chatdsl-lease", daemon=True)
+        renewer.start()
+        try:
+            result = run_dsl_text(
+                job.payload["text"],
+                job.payload.get("context", {}),
+                call_model=call_model,
+                sigil=job.payload.get("sigil", "@"),
+                cheap_model_call=cheap_model_call,
+                cancel_token=token,
+                recovery=recovery,
+                generation=generation,
+            )
+        except Exception as exc:  # a worker keeps serving after a bad job
+            finished.set()
+            renewer.join()
+            queue.fail(job.job_id, worker_id, f"Worker error: {exc}")
+        else:
+            finished.set()
+            renewer.join()
+            if token.cancelled:
+                pass  # the job was re-leased; its new owner records the outcome
+            elif _is_retryable(result):
+                queue.fail(job.job_id, worker_id, result.error or "run failed")
+            else:
+                queue.complete(job.job_id, worker_id, asdict(result))
+        handled += 1
+        queue.heartbeat(worker_id)
+    return handled
+
+
+def _worker_process(
+    queue_path: str,
+    stub: bool,
+    model: Optional[str],
+    cheap_model: Optional[str],
+    timeout_s: float,
+    lease_s: float,
+    poll_s: float,
+    exit_when_idle: bool,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
+) -> None:
+    # Model callers are built per process; they do not pickle.
+    call_model: Optional[ModelCall] = None
+    cheap_model_call: Optional[CheapModelCall] = None
+    if not stub:
+        from .model_adapters_v02 import make_gemini_caller, make_gemini_cheap_caller
+
+        call_model = make_gemini_caller(model=model, timeout_s=timeout_s)
+        cheap_model_call = make_gemini_cheap_caller(model=cheap_model, timeout_s=timeout_s)
+    try:
+        run_worker(
+            JobQueue(Path(queue_path)),
+            call_model=call_model,
+            cheap_model_call=cheap_model_call,
+            lease_s=lease_s,
+            poll_s=poll_s,
+            exit_when_idle=exit_when_idle,
+            recovery=recovery,
+            generation=generation,
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+def run_worker_processes(
+    queue_path: Path,
+    processes: int,
+    stub: bool = False,
+    model: Optional[str] = None,
+    cheap_model: Optional[str] = None,
+    timeout_s: float = 60.0,
+    lease_s: float = DEFAULT_LEASE_S,
+    poll_s: float = DEFAULT_POLL_S,
+    exit_when_idle: bool = False,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
+) -> None:
+    """Start `processes` worker processes on `queue_path` and wait for them to exit."""
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(
+            target=_worker_process,
+            args=(
+                str(queue_path),
+                stub,
+                model,
+                cheap_model,
+                timeout_s,
+                lease_s,
+                poll_s,
+                exit_when_idle,
+                recovery,
+                generation,
+            ),
+            name=f"chatdsl-worker-{index}",
+        )
+        for index in range(processes)
+    ]
+    for proc in procs:
+        proc.start()
+    try:
+        for proc in procs:
+            proc.join()
+    except KeyboardInterrupt:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.join()
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Durable SQLite queue of DSL runs and its workers.")
+    parser.add_argument("--queue", type=Path, required=True, help="SQLite queue file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="queue a DSL program")
+    enqueue.add_argument("program", type=Path, help="DSL program file")
+    enqueue.add_argument("--vars", default="{}", help="JSON object of initial variables")
+    enqueue.add_argument("--sigil", default="@")
+    enqueue.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    worker = commands.add_parser("worker", help="execute queued runs")
+    worker.add_argument("--processes", type=int, default=1, help="worker processes to start")
+    worker.add_argument("--lease", type=float, default=DEFAULT_LEASE_S, help="lease length in seconds")
+    worker.add_argument("--poll", type=float, default=DEFAULT_POLL_S, help="idle poll interval in seconds")
+    worker.add_argument("--exit-when-idle", action="store_true", help="stop once the queue is drained")
+    worker.add_argument("--stub", action="store_true", help="use the executor's built-in stub responses")
+    worker.add_argument("--model", help="Gemini model for steps (default: GEMINI_MODEL)")
+    worker.add_argument("--cheap-model", help="Gemini model for prefilters")
+    worker.add_argument("--timeout", type=float, default=60.0, help="per-call timeout in seconds")
+    worker.add_argument(
+        "--repair-retries",
+        type=int,
+        help="repair malformed step replies and re-ask up to this many times per step",
+    )
+    worker.add_argument(
+        "--budget-output-tokens", action="store_true", help="size each call's output budget from the step"
+    )
+
+    status = commands.add_parser("status", help="print job counts and live workers")
+    status.add_argument("--alive-within", type=float, default=3 * DEFAULT_LEASE_S)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    if args.command == "enqueue":
+        context = json.loads(args.vars)
+        if not isinstance(context, dict):
+            print("--vars must be a JSON object", file=sys.stderr)
+            return 2
+        queue = JobQueue(args.queue)
+        print(
+            queue.enqueue(
+                args.program.read_text(encoding="utf-8"),
+                context,
+                sigil=args.sigil,
+                max_attempts=args.max_attempts,
+            )
+        )
+        return 0
+    if args.command == "worker":
+        JobQueue(args.queue)  # create the schema once, before workers race for it
+        run_worker_processes(
+            args.queue,
+            args.processes,
+            stub=args.stub,
+            model=args.model,
+            cheap_model=args.cheap_model,
+            timeout_s=args.timeout,
+            lease_s=args.lease,
+            poll_s=args.poll,
+            exit_when_idle=args.exit_when_idle,
+            recovery=RecoveryPolicy(max_retries=args.repair_retries) if args.repair_retries is not None else None,
+            generation=GenerationPolicy() if args.budget_output_tokens else None,
+        )
+        return 0
+    queue = JobQueue(args.queue)
+    print(json.dumps({"jobs": queue.counts(), "workers": queue.workers(args.alive_within)}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .observers_v02 import ExecutionObserver
+
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+_FINISHED = ("done", "failed")
+DEFAULT_WORKERS = 4
+# Finished jobs nobody claims (their session went away) are dropped after this.
+DEFAULT_FINISHED_TTL_S = 3600.0
+DEFAULT_MAX_TOMBSTONES = 1024
+_CLAIMED = "claimed"
+_EXPIRED = "expired"
+
+
+@dataclass
+class Job:
+    """
+    A background run. `payload` is caller-owned data needed when the result
+    is handed off (it is never copied or inspected); `partial_outputs`
+    grows as steps finish. Only `owner` (e.g. a UI session id) may claim the
+    job when it is set.
+    """
+
+    job_id: str
+    chat_id: str
+    owner: Optional[str] = None
+    payload: Dict[str, Any] = field(default_factory=dict)
+    status: str = "queued"
+    submitted_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    steps_done: int = 0
+    partial_outputs: List[str] = field(default_factory=list)
+    result: Any = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _FINISHED
+
+
+@dataclass
+class JobHandoff:
+    """
+    Outcome of `JobManager.collect`: finished jobs now owned by the caller,
+    ids another owner already claimed, ids whose result expired unclaimed,
+    and ids this manager does not know (it does not outlive its process, so
+    those runs were lost with a restart, or their tombstone was evicted).
+    """
+
+    claimed: List[Job] = field(default_factory=list)
+    claimed_elsewhere: List[str] = field(default_factory=list)
+    expired: List[str] = field(default_factory=list)
+    lost: List[str] = field(default_factory=list)
+
+
+class JobProgressObserver(ExecutionObserver):
+    """Reports finished steps and their visible outputs to the job's manager."""
+
+    def __init__(self, manager: "JobManager", job_id: str) -> None:
+        self.manager = manager
+        self.job_id = job_id
+
+    def on_node_exit(
+        self,
+        node_kind: str,
+        node_path: List[int],
+        log: Optional[Dict[str, Any]],
+        error: Optional[BaseException],
+    ) -> None:
+        if node_kind != "step" or error is not None or log is None:
+            return
+        output = log.get("output")
+        self.manager._record_step(self.job_id, output if isinstance(output, str) else None)
+
+
+class JobManager:
+    """
+    Runs work off the caller's thread so a UI script can return while model
+    calls are in flight. Work for different chats runs concurrently on a
+    shared pool. Callers poll `get`, and take a finished job exactly once
+    with `claim`, which removes it: that is the point where results are
+    handed back into chat state. A finished job left unclaimed for
+    `finished_ttl_s` is dropped. The last `max_tombstones` claimed or
+    expired ids are remembered so callers sharing persisted job ids can tell
+    them from a lost one.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        finished_ttl_s: float = DEFAULT_FINISHED_TTL_S,
+        max_tombstones: int = DEFAULT_MAX_TOMBSTONES,
+    ) -> None:
+        self._jobs: Dict[str, Job] = {}
+        self._tombstones: OrderedDict[str, str] = OrderedDict()
+        self._finished_ttl_s = finished_ttl_s
+        self._max_tombstones = max_tombstones
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chatdsl-jobs")
+
+    def submit(
+        self,
+        chat_id: str,
+        work: Callable[[ExecutionObserver], Any],
+        payload: Optional[Dict[str, Any]] = None,
+        owner: Optional[str] = None,
+    ) -> str:
+        """
+        Queue `work(progress_observer)`; its return value becomes the job
+        result and an exception marks the job failed. Returns the job id.
+        """
+        job = Job(
+            job_id=f"job-{uuid.uuid4().hex[:12]}",
+            chat_id=chat_id,
+            owner=owner,
+            payload=payload if payload is not None else {},
+            submitted_at=time.time(),
+        )
+        with self._lock:
+            self._expire_finished()
+            self._jobs[job.job_id] = job
+        self._pool.submit(self._run, job.job_id, work)
+        return job.job_id
+
+    def _run(self, job_id: str, work: Callable[[ExecutionObserver], Any]) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            result = work(JobProgressObserver(self, job_id))
+        except Exception as exc:  # surfaced to the UI through the job
+            with self._lock:
+                job.status = "failed"
+                job.error = str(exc) or type(exc).__name__
+                job.finished_at = time.time()
+            return
+        with self._lock:
+            job.status = "done"
+            job.result = result
+            job.finished_at = time.time()
+
+    def _bury(self, job_id: str, reason: str) -> None:
+        self._tombstones[job_id] = reason
+        while len(self._tombstones) > self._max_tombstones:
+            self._tombstones.popitem(last=False)
+
+    def _expire_finished(self) -> None:
+        # Caller holds the lock.
+        cutoff = time.time() - self._finished_ttl_s
+        for job_id in [
+            job.job_id
+            for job in self._jobs.values()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]:
+            del self._jobs[job_id]
+            self._bury(job_id, _EXPIRED)
+
+    def _record_step(self, job_id: str, output: Optional[str]) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.steps_done += 1
+            if output is not None:
+                job.partial_outputs.append(output)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A snapshot of the job (payload and result shared, progress copied), or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = copy.copy(job)
+            snapshot.partial_outputs = list(job.partial_outputs)
+            return snapshot
+
+    def jobs_for_chat(self, chat_id: str) -> List[Job]:
+        with self._lock:
+            job_ids = [job.job_id for job in self._jobs.values() if job.chat_id == chat_id]
+        return [job for job in (self.get(job_id) for job_id in job_ids) if job is not None]
+
+    def claim(self, job_id: str, owner: Optional[str] = None) -> Optional[Job]:
+        """
+        Remove and return the job if it has finished; None while it is queued
+        or running, or if it belongs to a different owner.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.finished:
+                return None
+            if job.owner is not None and job.owner != owner:
+                return None
+            self._bury(job_id, _CLAIMED)
+            return self._jobs.pop(job_id)
+
+    def collect(self, job_ids: Iterable[str], owner: Optional[str] = None) -> JobHandoff:
+        """Claim every finished job of `owner` among `job_ids` and sort out the ids that are gone."""
+        handoff = JobHandoff()
+        with self._lock:
+            self._expire_finished()
+        for job_id in job_ids:
+            job = self.claim(job_id, owner)
+            if job is not None:
+                handoff.claimed.append(job)
+                continue
+            with self._lock:
+                if job_id in self._jobs:
+                    continue
+                reason = self._tombstones.get(job_id)
+                if reason == _CLAIMED:
+                    handoff.claimed_elsewhere.append(job_id)
+                elif reason == _EXPIRED:
+                    handoff.expired.append(job_id)
+                else:
+                    handoff.lost.append(job_id)
+        return handoff
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+from .blob_store_v02 import blob_digest, get_blob, put_blob
+
+
+RETENTION_LEVELS = ("full", "truncated", "hashes")
+DEFAULT_RETENTION = "full"
+_PREVIEW_CHARS = 400
+_BLOB_FIELDS = ("prompt", "raw_response")
+
+
+def resolve_log_retention(
+    state: Optional[Mapping[str, Any]], chat: Optional[Mapping[str, Any]] = None
+) -> str:
+    """Per-chat retention wins over the global setting; invalid values are ignored."""
+    for source in (chat, state):
+        if not isinstance(source, Mapping):
+            continue
+        level = source.get("log_retention")
+        if level in RETENTION_LEVELS:
+            return level
+    return DEFAULT_RETENTION
+
+
+def _preview(text: str) -> str:
+    if len(text) <= _PREVIEW_CHARS:
+        return text
+    return text[:_PREVIEW_CHARS] + "…"
+
+
+def compact_step_log(log: Dict[str, Any], level: str) -> Dict[str, Any]:
+    """
+    Move the full prompt and raw response of a step log, and the rejected
+    replies of its recovery retries, out of line.
+
+    - full: text is written to the blob store; the log keeps a preview and ref.
+    - truncated: only the preview and ref are kept; the text is dropped.
+    - hashes: only the ref (digest and length) is kept.
+    """
+    if level not in RETENTION_LEVELS:
+        raise ValueError(f"unknown log retention level {level!r}; allowed: {list(RETENTION_LEVELS)}")
+
+    out = _compact_fields(log, level)
+    recovery = out.get("recovery")
+    if isinstance(recovery, Mapping) and isinstance(recovery.get("retries"), list):
+        # Rejected replies kept for recovery retries follow the same retention.
+        out["recovery"] = {
+            **recovery,
+            "retries": [
+                _compact_fields(entry, level) if isinstance(entry, dict) else entry
+                for entry in recovery["retries"]
+            ],
+        }
+    return out
+
+
+def _compact_fields(log: Dict[str, Any], level: str) -> Dict[str, Any]:
+    out = dict(log)
+    for field in _BLOB_FIELDS:
+        text = out.get(field)
+        if not isinstance(text, str):
+            continue
+        del out[field]
+        if level == "full":
+            digest = put_blob(text)
+        else:
+            digest = blob_digest(text)
+        out[f"{field}_ref"] = {
+            "digest": digest,
+            "chars": len(text),
+            "stored": level == "full",
+        }
+        if level != "hashes":
+            out[f"{field}_preview"] = _preview(text)
+    return out
+
+
+def compact_execution_logs(logs: List[Dict[str, Any]], level: str) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for log in logs:
+        if isinstance(log, dict) and log.get("node_kind") == "step":
+            out.append(compact_step_log(log, level))
+        else:
+            out.append(log)
+    return out
+
+
+def load_log_text(log: Mapping[str, Any], field: str) -> Optional[str]:
+    """
+    Return the full text of a logged field, reading the blob store when the
+    log was compacted. Returns None when the text was not retained or the
+    blob has since been garbage-collected.
+    """
+    inline = log.get(field)
+    if isinstance(inline, str):
+        return inline
+    ref = log.get(f"{field}_ref")
+    if not isinstance(ref, Mapping) or not ref.get("stored"):
+        return None
+    return get_blob(str(ref.get("digest", "")))
+
+
+def referenced_blob_digests(data: Any) -> Set[str]:
+    """Digests of every stored blob ref (`<field>_ref`) anywhere in `data`, e.g. the chats state."""
+    digests: Set[str] = set()
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Mapping):
+            for key, value in item.items():
+                if (
+                    isinstance(key, str)
+                    and key.endswith("_ref")
+                    and isinstance(value, Mapping)
+                    and value.get("stored")
+                    and isinstance(value.get("digest"), str)
+                ):
+                    digests.add(value["digest"])
+                else:
+                    stack.append(value)
+        elif isinstance(item, list):
+            stack.extend(item)
+    return digests
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .observers_v02 import ExecutionObserver
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Mapping[str, Any]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"metric {self.name} expects labels {list(self.label_names)}, got {sorted(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if amount < 0:
+            raise ValueError("counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts (non-cumulative, last slot is +Inf), sum, count.
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0, 0.0]))
+            counts[index] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[1][1]) if series else 0
+
+    def total(self, **labels: Any) -> float:
+        series = self._series.get(self._key(labels))
+        return series[1][0] if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = sorted((key, (list(c), list(t))) for key, (c, t) in self._series.items())
+        for key, (counts, totals) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(totals[0])}")
+            lines.append(f"{self.name}_count{labels} {_format_number(totals[1])}")
+        return lines
+
+
+Metric = Union[Counter, Histogram]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"metric {metric.name} is already registered with a different shape")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class RuntimeMetrics:
+    """The runtime's metric families, registered on one registry."""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY) -> None:
+        self.registry = registry
+        self.runs = registry.counter("chatdsl_runs_total", "DSL program runs.", ["status"])
+        self.run_seconds = registry.histogram("chatdsl_run_seconds", "DSL program execution time.")
+        self.steps = registry.counter("chatdsl_steps_total", "Executed steps.", ["status"])
+        self.step_seconds = registry.histogram("chatdsl_step_seconds", "Step execution time.")
+        self.prefilters = registry.counter(
+            "chatdsl_prefilters_total", "Natural-language /FROM prefilters.", ["speculative"]
+        )
+        self.prefilter_seconds = registry.histogram(
+            "chatdsl_prefilter_seconds", "Prefilter time, including the cheap model call."
+        )
+        self.model_calls = registry.counter(
+            "chatdsl_model_calls_total", "Model calls by model id and outcome.", ["kind", "model", "status"]
+        )
+        self.model_call_seconds = registry.histogram(
+            "chatdsl_model_call_seconds", "Model call latency.", ["kind", "model"]
+        )
+        self.model_retries = registry.counter(
+            "chatdsl_model_retries_total", "Retried model HTTP requests.", ["model"]
+        )
+        self.tokens = registry.counter(
+            "chatdsl_model_tokens_total", "Tokens reported by the model API.", ["model", "type"]
+        )
+        self.cache_hits = registry.counter(
+            "chatdsl_cache_hits_total", "Work served from a cache or speculation.", ["cache"]
+        )
+        self.parse_seconds = registry.histogram("chatdsl_parse_seconds", "DSL parse time.")
+        self.save_seconds = registry.histogram("chatdsl_save_seconds", "Chat state save time.")
+
+    def record_run_timings(self, timings: Mapping[str, Any]) -> None:
+        """Record `parse_s` / `persist_s` from a RunResult or app run timings dict."""
+        if isinstance(timings.get("parse_s"), (int, float)):
+            self.parse_seconds.observe(float(timings["parse_s"]))
+        if isinstance(timings.get("persist_s"), (int, float)):
+            self.save_seconds.observe(float(timings["persist_s"]))
+
+    def record_model_call(
+        self, kind: str, model_call: Optional[Mapping[str, Any]], status: str
+    ) -> None:
+        model_call = model_call or {}
+        model = str(model_call.get("model_version") or model_call.get("model") or "unknown")
+        self.model_calls.inc(kind=kind, model=model, status=status)
+        if isinstance(model_call.get("latency_s"), (int, float)):
+            self.model_call_seconds.observe(float(model_call["latency_s"]), kind=kind, model=model)
+        retries = model_call.get("retries")
+        if isinstance(retries, int) and retries > 0:
+            self.model_retries.inc(retries, model=model)
+        usage = model_call.get("usage")
+        if isinstance(usage, Mapping):
+            for usage_key, token_type in (
+                ("prompt_tokens", "prompt"),
+                ("candidates_tokens", "output"),
+                ("cached_tokens", "cached"),
+            ):
+                value = usage.get(usage_key)
+                if isinstance(value, int) and value > 0:
+                    self.tokens.inc(value, model=model, type=token_type)
+                    if token_type == "cached":
+                        # One hit per call; the cached token count is in `tokens`.
+                        self.cache_hits.inc(cache="model_context")
+
+
+class MetricsObserver(ExecutionObserver):
+    """
+    Feeds executor lifecycle events into `RuntimeMetrics`. Holds per-run
+    state, so use one observer per concurrent run; they can share metrics.
+    """
+
+    def __init__(self, metrics: Optional[RuntimeMetrics] = None) -> None:
+        self.metrics = metrics or RuntimeMetrics()
+        self._program_started: Optional[float] = None
+        self._model_call_open = False
+        self._prefilter_open = False
+
+    def on_program_start(self, context: Mapping[str, Any]) -> None:
+        self._program_started = time.perf_counter()
+
+    def on_program_end(self, logs: List[Dict[str, Any]], error: Optional[BaseException]) -> None:
+        self.metrics.runs.inc(status="error" if error is not None else "ok")
+        if self._program_started is not None:
+            self.metrics.run_seconds.observe(time.perf_counter() - self._program_started)
+            self._program_started = None
+
+    def on_node_exit(
+        self,
+        node_kind: str,
+        node_path: List[int],
+        log: Optional[Dict[str, Any]],
+        error: Optional[BaseException],
+    ) -> None:
+        if self._model_call_open:
+            self._model_call_open = False
+            self.metrics.record_model_call("step", None, "error")
+        if self._prefilter_open:
+            # The cheap model call raised before the prefilter finished.
+            self._prefilter_open = False
+            self.metrics.record_model_call("prefilter", None, "error")
+        if node_kind != "step":
+            return
+        self.metrics.steps.inc(status="error" if error is not None else "ok")
+        if log is not None and isinstance(log.get("timings"), dict):
+            self.metrics.step_seconds.observe(float(log["timings"].get("total_s", 0.0)))
+
+    def on_prefilter_start(self, node_path: List[int], description: str, scope_var: str) -> None:
+        self._prefilter_open = True
+
+    def on_prefilter_end(self, node_path: List[int], prefilter_log: Dict[str, Any]) -> None:
+        self._prefilter_open = False
+        speculative = bool(prefilter_log.get("speculative"))
+        self.metrics.prefilters.inc(speculative=str(speculative).lower())
+        if speculative:
+            self.metrics.cache_hits.inc(cache="prefilter_prefetch")
+        if isinstance(prefilter_log.get("duration_s"), (int, float)):
+            self.metrics.prefilter_seconds.observe(float(prefilter_log["duration_s"]))
+        if prefilter_log.get("model_call") is not None:
+            self.metrics.record_model_call("prefilter", prefilter_log["model_call"], "ok")
+
+    def on_model_call_start(
+        self, node_path: List[int], prompt: str, response_schema: Mapping[str, Any]
+    ) -> None:
+        self._model_call_open = True
+
+    def on_model_call_end(
+        self, node_path: List[int], raw_response: Any, model_call: Optional[Dict[str, Any]]
+    ) -> None:
+        self._model_call_open = False
+        self.metrics.record_model_call("step", model_call, "ok")
+
+
+def write_metrics_file(path: Union[str, Path], registry: MetricsRegistry = REGISTRY) -> None:
+    """Write the registry in Prometheus text format (e.g. for the node_exporter textfile collector)."""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_suffix(target.suffix + ".tmp")
+    tmp_path.write_text(registry.render(), encoding="utf-8")
+    tmp_path.replace(target)
+
+
+def serve_metrics(
+    port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY
+) -> ThreadingHTTPServer:
+    """Serve `/metrics` from a daemon thread; call `shutdown()` on the result to stop."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            if self.path.split("?", 1)[0] not in {"/", "/metrics"}:
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", _CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    thread = threading.Thread(target=server.serve_forever, name="chatdsl-metrics", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+
+class ExecutionObserver:
+    """
+    No-op base for executor lifecycle hooks. Subclass and override the
+    callbacks you need; every callback runs on the executing thread, in
+    execution order. `node_path` matches the `node_path` of the log entry.
+    """
+
+    def on_program_start(self, context: Mapping[str, Any]) -> None:
+        pass
+
+    def on_program_end(
+        self, logs: List[Dict[str, Any]], error: Optional[BaseException]
+    ) -> None:
+        pass
+
+    def on_node_enter(self, node_kind: str, node_path: List[int]) -> None:
+        pass
+
+    def on_node_exit(
+        self,
+        node_kind: str,
+        node_path: List[int],
+        log: Optional[Dict[str, Any]],
+        error: Optional[BaseException],
+    ) -> None:
+        pass
+
+    def on_condition(self, node_path: List[int], condition_var: str, value: bool) -> None:
+        # An /IF guard was evaluated; called before the branch body runs.
+        pass
+
+    def on_prefilter_start(self, node_path: List[int], description: str, scope_var: str) -> None:
+        pass
+
+    def on_prefilter_end(self, node_path: List[int], prefilter_log: Dict[str, Any]) -> None:
+        pass
+
+    def on_model_call_start(
+        self, node_path: List[int], prompt: str, response_schema: Mapping[str, Any]
+    ) -> None:
+        pass
+
+    def on_model_call_end(
+        self, node_path: List[int], raw_response: Any, model_call: Optional[Dict[str, Any]]
+    ) -> None:
+        pass
+
+    def on_commit(self, node_path: List[int], staged_updates: Dict[str, Any]) -> None:
+        pass
+
+
+class CompositeObserver(ExecutionObserver):
+    """Fans every callback out to several observers, in registration order."""
+
+    def __init__(self, observers: Sequence[ExecutionObserver]) -> None:
+        self.observers = list(observers)
+
+    def on_program_start(self, context: Mapping[str, Any]) -> None:
+        for observer in self.observers:
+            observer.on_program_start(context)
+
+    def on_program_end(
+        self, logs: List[Dict[str, Any]], error: Optional[BaseException]
+    ) -> None:
+        for observer in self.observers:
+            observer.on_program_end(logs, error)
+
+    def on_node_enter(self, node_kind: str, node_path: List[int]) -> None:
+        for observer in self.observers:
+            observer.on_node_enter(node_kind, node_path)
+
+    def on_node_exit(
+        self,
+        node_kind: str,
+        node_path: List[int],
+        log: Optional[Dict[str, Any]],
+        error: Optional[BaseException],
+    ) -> None:
+        for observer in self.observers:
+            observer.on_node_exit(node_kind, node_path, log, error)
+
+    def on_condition(self, node_path: List[int], condition_var: str, value: bool) -> None:
+        for observer in self.observers:
+            observer.on_condition(node_path, condition_var, value)
+
+    def on_prefilter_start(self, node_path: List[int], description: str, scope_var: str) -> None:
+        for observer in self.observers:
+            observer.on_prefilter_start(node_path, description, scope_var)
+
+    def on_prefilter_end(self, node_path: List[int], prefilter_log: Dict[str, Any]) -> None:
+        for observer in self.observers:
+            observer.on_prefilter_end(node_path, prefilter_log)
+
+    def on_model_call_start(
+        self, node_path: List[int], prompt: str, response_schema: Mapping[str, Any]
+    ) -> None:
+        for observer in self.observers:
+            observer.on_model_call_start(node_path, prompt, response_schema)
+
+    def on_model_call_end(
+        self, node_path: List[int], raw_response: Any, model_call: Optional[Dict[str, Any]]
+    ) -> None:
+        for observer in self.observers:
+            observer.on_model_call_end(node_path, raw_response, model_call)
+
+    def on_commit(self, node_path: List[int], staged_updates: Dict[str, Any]) -> None:
+        for observer in self.observers:
+            observer.on_commit(node_path, staged_updates)
+
+
+def combine_observers(
+    observers: Optional[Sequence[ExecutionObserver]],
+) -> Optional[ExecutionObserver]:
+    """Collapse a registration list to None, a single observer, or a composite."""
+    if not observers:
+        return None
+    if len(observers) == 1:
+        return observers[0]
+    return CompositeObserver(observers)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+
+_FENCE_RE = re.compile(r"^\s*```[A-Za-z0-9_-]*\s*\n?(.*?)\n?\s*```\s*$", re.DOTALL)
+_INT_RE = re.compile(r"[+-]?\d+")
+_DECODER = json.JSONDecoder()
+
+
+@dataclass(frozen=True)
+class RecoveryPolicy:
+    """
+    How the executor handles a step reply that breaks the response contract.
+
+    `lenient_json` strips markdown fences and falls back to the first JSON
+    object embedded in the reply; `coerce_types` converts /DEF values whose
+    conversion loses nothing ("42" for an int, 3.0 for an int, "true" for a
+    bool, 7 for a str); `max_retries` re-asks the model for just the failing
+    step, quoting the validation error, at most that many times. A reply with
+    `error: 1` is never retried.
+    """
+
+    lenient_json: bool = True
+    coerce_types: bool = True
+    max_retries: int = 1
+
+
+def extract_json_object(text: str) -> Optional[Any]:
+    """Parse `text` as JSON after stripping code fences, else the first balanced object in it."""
+    fenced = _FENCE_RE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _ = _DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+            continue
+        return value
+    return None
+
+
+def coerce_def_value(type_name: str, value: Any) -> Tuple[Any, bool]:
+    """Return `(value, changed)`; `value` is unchanged unless the conversion is lossless."""
+    t = type_name.lower()
+    if t in {"nat", "str"}:
+        if type(value) in {int, float}:
+            return json.dumps(value), True
+        return value, False
+    if t == "int":
+        if type(value) is float and value.is_integer():
+            return int(value), True
+        if isinstance(value, str) and _INT_RE.fullmatch(value.strip()):
+            return int(value.strip()), True
+        return value, False
+    if t == "float":
+        if isinstance(value, str):
+            try:
+                number = float(value.strip())
+            except ValueError:
+                return value, False
+            if number == number and number not in (float("inf"), float("-inf")):
+                return number, True
+        return value, False
+    if t == "bool":
+        if isinstance(value, str) and value.strip().lower() in {"true", "false"}:
+            return value.strip().lower() == "true", True
+        return value, False
+    return value, False
+
+
+def build_repair_prompt(prompt: str, error: str) -> str:
+    return (
+        f"{prompt}\n\n"
+        "Previous reply rejected:\n"
+        f"- {error}\n"
+        "- Respond again with ONLY a JSON object that follows the requirements above."
+    )
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
-from .executor_v02 import ModelCall, execute_program
+from .cancellation_v02 import CancelToken
+from .checkpoint_v02 import CheckpointObserver, ExecutionCheckpoint
+from .executor_v02 import CheapModelCall, ModelCall, execute_program
+from .generation_v02 import GenerationPolicy
+from .observers_v02 import ExecutionObserver
 from .parser_v02 import ParseError, parse_program, program_to_dicts
+from .recovery_v02 import RecoveryPolicy
 
 
 @dataclass
@@ -15,6 +21,9 @@ class RunResult:
     vars_after: Dict[str, Any]
     parsed_steps: List[Dict[str, Any]]
     error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Set when execution failed; pass it back as `resume_from` to continue.
+    checkpoint: Optional[ExecutionCheckpoint] = None
 
 
 def run_dsl_text(
@@ -22,14 +31,28 @@ def run_dsl_text(
     context: Dict[str, Any],
     call_model: Optional[ModelCall] = None,
     sigil: str = "@",
+    observers: Optional[Sequence[ExecutionObserver]] = None,
+    cheap_model_call: Optional[CheapModelCall] = None,
+    cancel_token: Optional[CancelToken] = None,
+    resume_from: Optional[ExecutionCheckpoint] = None,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
 ) -> RunResult:
     """
     App-facing helper for parse + execute.
     Returns structured success/error output without raising into the UI loop.
+    Timings are monotonic durations in seconds.
+    A cancelled or expired `cancel_token` ends the run with an execution error.
+    `resume_from` restarts a failed run of the same text and context at the
+    node where it failed.
+    `recovery` repairs or re-requests step replies that break the JSON contract.
+    `generation` sizes each model call's output budget from the step's declarations.
     """
+    started = time.perf_counter()
     try:
         program = parse_program(text, sigil=sigil, predeclared_vars=context.keys())
     except ParseError as exc:
+        parse_s = round(time.perf_counter() - started, 6)
         return RunResult(
             ok=False,
             outputs=[],
@@ -37,11 +60,32 @@ def run_dsl_text(
             vars_after=dict(context),
             parsed_steps=[],
             error=f"Parse error: {exc}",
+            timings={"parse_s": parse_s, "total_s": parse_s},
         )
+    parsed = time.perf_counter()
+
+    def _timings() -> Dict[str, float]:
+        done = time.perf_counter()
+        return {
+            "parse_s": round(parsed - started, 6),
+            "execute_s": round(done - parsed, 6),
+            "total_s": round(done - started, 6),
+        }
 
     ctx = dict(context)
+    checkpointer = CheckpointObserver(resume_from)
     try:
-        ctx, logs, outputs = execute_program(program, context=ctx, call_model=call_model)
+        ctx, logs, outputs = execute_program(
+            program,
+            context=ctx,
+            call_model=call_model,
+            cheap_model_call=cheap_model_call,
+            observers=[*(observers or []), checkpointer],
+            cancel_token=cancel_token,
+            resume_from=resume_from,
+            recovery=recovery,
+            generation=generation,
+        )
     except Exception as exc:  # runtime/model errors are surfaced to UI
         return RunResult(
             ok=False,
@@ -50,6 +94,8 @@ def run_dsl_text(
             vars_after=dict(ctx),
             parsed_steps=program_to_dicts(program),
             error=f"Execution error: {exc}",
+            timings=_timings(),
+            checkpoint=checkpointer.checkpoint,
         )
 
     return RunResult(
@@ -59,4 +105,5 @@ def run_dsl_text(
         vars_after=ctx,
         parsed_steps=program_to_dicts(program),
         error=None,
+        timings=_timings(),
     )
@@ -0,0 +1,281 @@
+"""Run with: python -m chatdsl_core.service_v02 --port 8765"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+from .cancellation_v02 import CancelToken
+from .executor_v02 import CheapModelCall, ModelCall
+from .runtime_v02 import RunResult, run_dsl_text
+
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE = 16
+DEFAULT_DEADLINE_S = 120.0
+MAX_BODY_BYTES = 1024 * 1024
+_RETRY_AFTER_S = 1
+
+
+class ServiceBusy(RuntimeError):
+    """Raised by `RunService.submit` when every worker is busy and the queue is full."""
+
+
+class RunService:
+    """
+    Bounded executor for `run_dsl_text`. At most `workers` runs execute at
+    once and `max_queue` more wait; past that, `submit` raises `ServiceBusy`
+    instead of queueing without limit. A run still queued when its deadline
+    passes is never started, and a running one is stopped at its deadline.
+    """
+
+    def __init__(
+        self,
+        call_model: Optional[ModelCall] = None,
+        cheap_model_call: Optional[CheapModelCall] = None,
+        workers: int = DEFAULT_WORKERS,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        default_deadline_s: float = DEFAULT_DEADLINE_S,
+    ) -> None:
+        if workers < 1 or max_queue < 0:
+            raise ValueError("workers must be at least 1 and max_queue non-negative")
+        self.call_model = call_model
+        self.cheap_model_call = cheap_model_call
+        self.workers = workers
+        self.capacity = workers + max_queue
+        self.default_deadline_s = default_deadline_s
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chatdsl-service")
+
+    @property
+    def admitted(self) -> int:
+        """Runs queued or executing."""
+        with self._lock:
+            return self._admitted
+
+    def _release(self, _: Optional[Future] = None) -> None:
+        with self._lock:
+            self._admitted -= 1
+        self._slots.release()
+
+    def _run(self, text: str, context: Dict[str, Any], sigil: str, deadline: float) -> RunResult:
+        if time.monotonic() >= deadline:
+            return RunResult(
+                ok=False,
+                outputs=[],
+                logs=[],
+                vars_after=dict(context),
+                parsed_steps=[],
+                error="Deadline exceeded before the run started",
+            )
+        return run_dsl_text(
+            text,
+            context,
+            call_model=self.call_model,
+            sigil=sigil,
+            cheap_model_call=self.cheap_model_call,
+            # The run stops at the request deadline instead of finishing unseen.
+            cancel_token=CancelToken(deadline),
+        )
+
+    def submit(
+        self,
+        text: str,
+        context: Dict[str, Any],
+        sigil: str = "@",
+        deadline_s: Optional[float] = None,
+    ) -> Tuple[Future, float]:
+        """Queue a run; returns its future and its monotonic deadline."""
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusy(f"all {self.capacity} run slots are taken")
+        with self._lock:
+            self._admitted += 1
+        deadline = time.monotonic() + (self.default_deadline_s if deadline_s is None else deadline_s)
+        try:
+            future = self._pool.submit(self._run, text, dict(context), sigil, deadline)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future, deadline
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_run_request(payload: Any) -> Tuple[str, Dict[str, Any], str, Optional[float]]:
+    if not isinstance(payload, Mapping):
+        raise ValueError("request body must be a JSON object")
+    text = payload.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("'text' must be a non-empty string")
+    context = payload.get("context", {})
+    if not isinstance(context, dict):
+        raise ValueError("'context' must be an object of variable bindings")
+    sigil = payload.get("sigil", "@")
+    if not isinstance(sigil, str):
+        raise ValueError("'sigil' must be a string")
+    deadline_s = payload.get("deadline_s")
+    if deadline_s is not None and (
+        isinstance(deadline_s, bool) or not isinstance(deadline_s, (int, float)) or deadline_s <= 0
+    ):
+        raise ValueError("'deadline_s' must be a positive number")
+    return text, context, sigil, None if deadline_s is None else float(deadline_s)
+
+
+def make_server(service: RunService, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    HTTP/JSON front end for `service`:
+
+    - `POST /v1/run` with `{"text", "context"?, "sigil"?, "deadline_s"?}`
+      returns the `RunResult` fields, without its checkpoint, as JSON (200
+      also for parse and execution errors, which are reported in the
+      result), 400 for a malformed request or Content-Length, 429 when the
+      service is full and 504 past the deadline.
+    - `GET /healthz` reports admitted runs and capacity.
+    """
+
+    class _Handler(BaseHTTPRequestHandler):
+        def _send_json(
+            self, status: int, body: Mapping[str, Any], headers: Optional[Mapping[str, str]] = None
+        ) -> None:
+            data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            if self.path.split("?", 1)[0] != "/healthz":
+                self._send_json(404, {"error": "not found"})
+                return
+            health = {
+                "ok": True,
+                "admitted": service.admitted,
+                "workers": service.workers,
+                "capacity": service.capacity,
+            }
+            self._send_json(200, health)
+
+        def do_POST(self) -> None:  # noqa: N802 - http.server naming
+            if self.path.split("?", 1)[0] != "/v1/run":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._send_json(400, {"error": "invalid Content-Length"})
+                return
+            if length > MAX_BODY_BYTES:
+                self._send_json(413, {"error": f"request body exceeds {MAX_BODY_BYTES} bytes"})
+                return
+            try:
+                text, context, sigil, deadline_s = _parse_run_request(
+                    json.loads(self.rfile.read(length) or b"null")
+                )
+            except ValueError as exc:  # includes JSONDecodeError
+                self._send_json(400, {"error": str(exc)})
+                return
+
+            try:
+                future, deadline = service.submit(text, context, sigil=sigil, deadline_s=deadline_s)
+            except ServiceBusy as exc:
+                self._send_json(429, {"error": str(exc)}, {"Retry-After": str(_RETRY_AFTER_S)})
+                return
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                # A queued run is dropped; a running one stops at the same deadline.
+                future.cancel()
+                result = None
+            if result is None or (not result.ok and time.monotonic() >= deadline):
+                self._send_json(504, {"error": "deadline exceeded"})
+                return
+            self._send_json(200, _result_body(result))
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return ThreadingHTTPServer((host, port), _Handler)
+
+
+def _result_body(result: RunResult) -> Dict[str, Any]:
+    # Listed explicitly so fields added to RunResult (e.g. `checkpoint`) stay in-process.
+    return {
+        "ok": result.ok,
+        "outputs": result.outputs,
+        "logs": result.logs,
+        "vars_after": result.vars_after,
+        "parsed_steps": result.parsed_steps,
+        "error": result.error,
+        "timings": result.timings,
+    }
+
+
+def serve_runtime(service: RunService, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve `service` from a daemon thread; call `shutdown()` on the result to stop."""
+    server = make_server(service, port, host)
+    thread = threading.Thread(target=server.serve_forever, name="chatdsl-service", daemon=True)
+    thread.start()
+    return server
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Serve run_dsl_text over local HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="runs executed concurrently")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="runs waiting before 429")
+    parser.add_argument(
+        "--deadline", type=float, default=DEFAULT_DEADLINE_S, help="default per-request deadline in seconds"
+    )
+    parser.add_argument("--stub", action="store_true", help="use the executor's built-in stub responses")
+    parser.add_argument("--model", help="Gemini model for steps (default: GEMINI_MODEL)")
+    parser.add_argument("--cheap-model", help="Gemini model for prefilters")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-call timeout in seconds")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    call_model: Optional[ModelCall] = None
+    cheap_model_call: Optional[CheapModelCall] = None
+    if not args.stub:
+        from .model_adapters_v02 import make_gemini_caller, make_gemini_cheap_caller
+
+        call_model = make_gemini_caller(model=args.model, timeout_s=args.timeout)
+        cheap_model_call = make_gemini_cheap_caller(model=args.cheap_model, timeout_s=args.timeout)
+    service = RunService(
+        call_model=call_model,
+        cheap_model_call=cheap_model_call,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        default_deadline_s=args.deadline,
+    )
+    server = make_server(service, args.port, args.host)
+    print(f"serving on http://{args.host}:{server.server_address[1]}/v1/run")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
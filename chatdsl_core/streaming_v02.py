@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence
+
+from .cancellation_v02 import CancelToken
+from .checkpoint_v02 import ExecutionCheckpoint
+from .executor_v02 import CheapModelCall, ModelCall, execute_program
+from .generation_v02 import GenerationPolicy
+from .observers_v02 import ExecutionObserver
+from .parser_v02 import Program
+from .recovery_v02 import RecoveryPolicy
+
+
+EVENT_KINDS = ("condition", "prefilter_done", "vars_committed", "step_done", "program_end")
+
+
+@dataclass
+class ExecutionEvent:
+    """
+    One streamed execution event. `data` by kind:
+
+    - `condition`: `condition_var`, `value` (before the branch body runs)
+    - `prefilter_done`: `prefilter_log`
+    - `vars_committed`: `updates`, the variables the step just committed
+    - `step_done`: `output` (the step's visible text) and `log`
+    - `program_end`: `context`, `logs` and `outputs`, as `execute_program` returns them
+    """
+
+    kind: str
+    node_path: List[int]
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+class _EventObserver(ExecutionObserver):
+    def __init__(self, emit: Callable[[ExecutionEvent], None]) -> None:
+        self.emit = emit
+
+    def on_condition(self, node_path: List[int], condition_var: str, value: bool) -> None:
+        self.emit(
+            ExecutionEvent("condition", list(node_path), {"condition_var": condition_var, "value": value})
+        )
+
+    def on_prefilter_end(self, node_path: List[int], prefilter_log: Dict[str, Any]) -> None:
+        self.emit(ExecutionEvent("prefilter_done", list(node_path), {"prefilter_log": prefilter_log}))
+
+    def on_commit(self, node_path: List[int], staged_updates: Dict[str, Any]) -> None:
+        self.emit(ExecutionEvent("vars_committed", list(node_path), {"updates": dict(staged_updates)}))
+
+    def on_node_exit(
+        self,
+        node_kind: str,
+        node_path: List[int],
+        log: Optional[Dict[str, Any]],
+        error: Optional[BaseException],
+    ) -> None:
+        if node_kind == "step" and log is not None:
+            self.emit(ExecutionEvent("step_done", list(node_path), {"output": log.get("output"), "log": log}))
+
+
+_DONE = object()
+
+
+def _start_execution(
+    program: Program,
+    context: Dict[str, Any],
+    emit: Callable[[Any], None],
+    call_model: Optional[ModelCall],
+    chat_history: Optional[List[str]],
+    cheap_model_call: Optional[CheapModelCall],
+    prefetch_prefilters: bool,
+    observers: Optional[Sequence[ExecutionObserver]],
+    cancel_token: CancelToken,
+    resume_from: Optional[ExecutionCheckpoint],
+    recovery: Optional[RecoveryPolicy],
+    generation: Optional[GenerationPolicy],
+) -> threading.Thread:
+    # Runs the unchanged synchronous executor on a worker thread; `emit`
+    # receives every event, then an exception or `_DONE`.
+    def run() -> None:
+        try:
+            ctx, logs, outputs = execute_program(
+                program,
+                context,
+                call_model=call_model,
+                chat_history=chat_history,
+                cheap_model_call=cheap_model_call,
+                prefetch_prefilters=prefetch_prefilters,
+                observers=[*(observers or []), _EventObserver(emit)],
+                cancel_token=cancel_token,
+                resume_from=resume_from,
+                recovery=recovery,
+                generation=generation,
+            )
+            emit(ExecutionEvent("program_end", [], {"context": ctx, "logs": logs, "outputs": outputs}))
+        except BaseException as exc:  # re-raised in the consumer
+            emit(exc)
+        emit(_DONE)
+
+    thread = threading.Thread(target=run, name="chatdsl-stream", daemon=True)
+    thread.start()
+    return thread
+
+
+def _stream_token(cancel_token: Optional[CancelToken]) -> CancelToken:
+    # Closing a stream cancels only its own run, never a token the caller shares.
+    return cancel_token.child() if cancel_token is not None else CancelToken()
+
+
+def stream_program(
+    program: Program,
+    context: Dict[str, Any],
+    call_model: Optional[ModelCall] = None,
+    chat_history: Optional[List[str]] = None,
+    cheap_model_call: Optional[CheapModelCall] = None,
+    prefetch_prefilters: bool = False,
+    observers: Optional[Sequence[ExecutionObserver]] = None,
+    cancel_token: Optional[CancelToken] = None,
+    resume_from: Optional[ExecutionCheckpoint] = None,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
+) -> Iterator[ExecutionEvent]:
+    """
+    `execute_program` as an iterator of `ExecutionEvent`s, yielded as they
+    happen; the last one is `program_end` with the final context. An
+    execution error is raised from the iterator after the events that
+    preceded it. Closing or abandoning the iterator cancels the run, which
+    stops at its next cancellation check; `cancel_token` can also stop it.
+    """
+    token = _stream_token(cancel_token)
+    events: "queue.Queue[Any]" = queue.Queue()
+    _start_execution(
+        program,
+        context,
+        events.put,
+        call_model,
+        chat_history,
+        cheap_model_call,
+        prefetch_prefilters,
+        observers,
+        token,
+        resume_from,
+        recovery,
+        generation,
+    )
+    try:
+        while True:
+            item = events.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        token.cancel("stream closed")
+
+
+async def astream_program(
+    program: Program,
+    context: Dict[str, Any],
+    call_model: Optional[ModelCall] = None,
+    chat_history: Optional[List[str]] = None,
+    cheap_model_call: Optional[CheapModelCall] = None,
+    prefetch_prefilters: bool = False,
+    observers: Optional[Sequence[ExecutionObserver]] = None,
+    cancel_token: Optional[CancelToken] = None,
+    resume_from: Optional[ExecutionCheckpoint] = None,
+    recovery: Optional[RecoveryPolicy] = None,
+    generation: Optional[GenerationPolicy] = None,
+) -> AsyncIterator[ExecutionEvent]:
+    """Async-iterator form of `stream_program`; model calls still block their worker thread, not the loop."""
+    loop = asyncio.get_running_loop()
+    events: "asyncio.Queue[Any]" = asyncio.Queue()
+
+    def emit(item: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, item)
+        except RuntimeError:  # the loop closed while the run was still going
+            pass
+
+    token = _stream_token(cancel_token)
+    _start_execution(
+        program,
+        context,
+        emit,
+        call_model,
+        chat_history,
+        cheap_model_call,
+        prefetch_prefilters,
+        observers,
+        token,
+        resume_from,
+        recovery,
+        generation,
+    )
+    try:
+        while True:
+            item = await events.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        token.cancel("stream closed")
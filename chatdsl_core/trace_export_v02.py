@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+
+_PID = 1
+_MAIN_TID = 1
+_PREFETCH_TID = 2
+_STEP_PHASES = (
+    ("builtins", "builtins_s"),
+    ("prefilters", "prefilters_s"),
+    ("prompt", "prompt_s"),
+    ("model_call", "model_call_s"),
+    ("validate", "validate_s"),
+    ("commit", "commit_s"),
+)
+
+
+def _us(seconds: Any) -> Optional[float]:
+    if not isinstance(seconds, (int, float)):
+        return None
+    return round(float(seconds) * 1_000_000, 3)
+
+
+def _complete_event(
+    name: str, category: str, ts: float, dur: float, tid: int, args: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    event: Dict[str, Any] = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": ts,
+        "dur": max(dur, 0.0),
+        "pid": _PID,
+        "tid": tid,
+    }
+    if args:
+        event["args"] = args
+    return event
+
+
+def _metadata_events(process_name: str, prefetch_lanes: int) -> List[Dict[str, Any]]:
+    events = [
+        {"name": "process_name", "ph": "M", "pid": _PID, "args": {"name": process_name}},
+        {"name": "thread_name", "ph": "M", "pid": _PID, "tid": _MAIN_TID, "args": {"name": "executor"}},
+    ]
+    for lane in range(max(prefetch_lanes, 1)):
+        events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": _PID,
+                "tid": _PREFETCH_TID + lane,
+                "args": {"name": "prefilter prefetch" if lane == 0 else f"prefilter prefetch {lane + 1}"},
+            }
+        )
+    return events
+
+
+def _assign_prefetch_lanes(events: List[Dict[str, Any]]) -> int:
+    """
+    Put each speculative prefilter on the first prefetch track free at its
+    start, so concurrent prefetches never overlap on one track. Returns the
+    number of tracks used.
+    """
+    lane_ends: List[float] = []
+    speculative = [event for event in events if event["tid"] == _PREFETCH_TID]
+    for event in sorted(speculative, key=lambda event: event["ts"]):
+        lane = next((index for index, end in enumerate(lane_ends) if end <= event["ts"]), None)
+        if lane is None:
+            lane = len(lane_ends)
+            lane_ends.append(0.0)
+        lane_ends[lane] = event["ts"] + event["dur"]
+        event["tid"] = _PREFETCH_TID + lane
+    return len(lane_ends)
+
+
+def _path_label(node_path: Any) -> str:
+    if isinstance(node_path, list) and node_path:
+        return ".".join(str(part) for part in node_path)
+    return "-"
+
+
+def _step_events(log: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    timings = log.get("timings")
+    if not isinstance(timings, Mapping):
+        return []
+    start = _us(timings.get("started_at_s"))
+    total = _us(timings.get("total_s"))
+    if start is None or total is None:
+        return []
+
+    text = str(log.get("text", "")).strip().splitlines()
+    title = text[0][:60] if text else ""
+    args: Dict[str, Any] = {
+        "node_path": log.get("node_path"),
+        "depth": log.get("depth"),
+        "line": log.get("start_line_no"),
+    }
+    model_call = log.get("model_call")
+    if isinstance(model_call, Mapping):
+        args["model"] = model_call.get("model_version") or model_call.get("model")
+        args["usage"] = model_call.get("usage")
+        args["retries"] = model_call.get("retries")
+    events = [
+        _complete_event(
+            f"step {_path_label(log.get('node_path'))}: {title}", "step", start, total, _MAIN_TID, args
+        )
+    ]
+
+    offset = start
+    for phase, key in _STEP_PHASES:
+        duration = _us(timings.get(key))
+        if duration is None:
+            continue
+        events.append(_complete_event(phase, "phase", offset, duration, _MAIN_TID))
+        offset += duration
+
+    for prefilter in log.get("prefilter_logs") or []:
+        if not isinstance(prefilter, Mapping):
+            continue
+        pf_start = _us(prefilter.get("started_at_s"))
+        pf_dur = _us(prefilter.get("duration_s"))
+        if pf_start is None or pf_dur is None:
+            continue
+        speculative = bool(prefilter.get("speculative"))
+        events.append(
+            _complete_event(
+                f"prefilter {prefilter.get('description', '')}",
+                "prefilter",
+                pf_start,
+                pf_dur,
+                _PREFETCH_TID if speculative else _MAIN_TID,
+                {
+                    "scope_var": prefilter.get("scope_var"),
+                    "speculative": speculative,
+                    "for_node_path": log.get("node_path"),
+                },
+            )
+        )
+    return events
+
+
+def _if_events(log: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    timings = log.get("timings")
+    if not isinstance(timings, Mapping):
+        return []
+    start = _us(timings.get("started_at_s"))
+    total = _us(timings.get("total_s"))
+    if start is None or total is None:
+        return []
+    return [
+        _complete_event(
+            f"if {log.get('condition_var')} ({log.get('execution', '')})",
+            "if",
+            start,
+            total,
+            _MAIN_TID,
+            {
+                "node_path": log.get("node_path"),
+                "depth": log.get("depth"),
+                "line": log.get("start_line_no"),
+                "condition_value": log.get("condition_value"),
+            },
+        )
+    ]
+
+
+def build_chrome_trace(
+    logs: Iterable[Any],
+    run_timings: Optional[Mapping[str, Any]] = None,
+    process_name: str = "chatdsl run",
+) -> Dict[str, Any]:
+    """
+    Convert execution logs into Chrome trace-event JSON (viewable in
+    chrome://tracing or Perfetto). Steps, `/IF` blocks and step phases are
+    complete events on the executor track, nested by time; speculative
+    prefilters get their own tracks because they overlap the previous step's
+    model call, and each other when several are prefetched at once. Logs
+    without timings are skipped.
+    """
+    events: List[Dict[str, Any]] = []
+    for log in logs:
+        if not isinstance(log, Mapping):
+            continue
+        kind = log.get("node_kind")
+        if kind == "step":
+            events.extend(_step_events(log))
+        elif kind == "if":
+            events.extend(_if_events(log))
+    events = _metadata_events(process_name, _assign_prefetch_lanes(events)) + events
+
+    trace: Dict[str, Any] = {"traceEvents": events, "displayTimeUnit": "ms"}
+    if isinstance(run_timings, Mapping):
+        trace["otherData"] = {f"run_{key}": value for key, value in run_timings.items()}
+    return trace
+
+
+def chrome_trace_json(
+    logs: Iterable[Any],
+    run_timings: Optional[Mapping[str, Any]] = None,
+    process_name: str = "chatdsl run",
+) -> str:
+    return json.dumps(build_chrome_trace(logs, run_timings, process_name), ensure_ascii=False)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+
+USAGE_FIELDS = (
+    "prompt_tokens",
+    "candidates_tokens",
+    "cached_tokens",
+    "thoughts_tokens",
+    "total_tokens",
+)
+
+
+def empty_usage() -> Dict[str, Any]:
+    summary: Dict[str, Any] = {"calls": 0, "retries": 0, "latency_s": 0.0}
+    summary.update({name: 0 for name in USAGE_FIELDS})
+    return summary
+
+
+def _add_call(summary: Dict[str, Any], model_call: Optional[Mapping[str, Any]]) -> None:
+    if not isinstance(model_call, Mapping):
+        return
+    summary["calls"] += 1
+    summary["retries"] += int(model_call.get("retries") or 0)
+    summary["latency_s"] = round(summary["latency_s"] + float(model_call.get("latency_s") or 0.0), 6)
+    usage = model_call.get("usage")
+    if isinstance(usage, Mapping):
+        for name in USAGE_FIELDS:
+            value = usage.get(name)
+            if isinstance(value, (int, float)):
+                summary[name] += int(value)
+
+
+def iter_model_calls(logs: Iterable[Any]) -> Iterator[Mapping[str, Any]]:
+    """Yield every recorded model-call metadata dict in execution logs, prefilters and retries included."""
+    for log in logs:
+        if not isinstance(log, Mapping) or log.get("node_kind") != "step":
+            continue
+        for prefilter in log.get("prefilter_logs") or []:
+            if isinstance(prefilter, Mapping) and isinstance(prefilter.get("model_call"), Mapping):
+                yield prefilter["model_call"]
+        recovery = log.get("recovery")
+        retries = recovery.get("retries") if isinstance(recovery, Mapping) else None
+        for retry in retries or []:
+            if isinstance(retry, Mapping) and isinstance(retry.get("model_call"), Mapping):
+                yield retry["model_call"]
+        if isinstance(log.get("model_call"), Mapping):
+            yield log["model_call"]
+
+
+def summarize_log_usage(logs: Iterable[Any]) -> Dict[str, Any]:
+    summary = empty_usage()
+    for model_call in iter_model_calls(logs):
+        _add_call(summary, model_call)
+    return summary
+
+
+def summarize_chat_usage(history: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate reported usage over a chat. DSL runs are read from the user
+    message's execution logs; raw-mode replies carry their own `model_call`.
+    """
+    summary = empty_usage()
+    for msg in history:
+        if not isinstance(msg, Mapping):
+            continue
+        meta = msg.get("meta")
+        if not isinstance(meta, Mapping):
+            continue
+        if msg.get("role") == "user" and msg.get("mode") == "dsl":
+            for model_call in iter_model_calls(meta.get("execution_logs") or []):
+                _add_call(summary, model_call)
+        elif msg.get("role") == "assistant" and msg.get("mode") == "raw":
+            _add_call(summary, meta.get("model_call"))
+    return summary
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import time
+from pathlib import Path
+from typing import AbstractSet, Any, Dict, Mapping, Optional, Set
+
+from . import state_store_v02
+
+
+_VALUES_DIR = state_store_v02._STATE_DIR / "values"
+_REF_KEY = "$value_ref"
+DEFAULT_THRESHOLD_BYTES = 16 * 1024
+
+
+def is_value_ref(value: Any) -> bool:
+    return isinstance(value, dict) and isinstance(value.get(_REF_KEY), str)
+
+
+def _value_path(digest: str) -> Path:
+    return _VALUES_DIR / digest[:2] / digest
+
+
+def store_value(text: str) -> Dict[str, Any]:
+    """Write text once under its content hash and return a JSON-safe handle."""
+    if not isinstance(text, str):
+        raise ValueError("only string values can be stored out of line")
+    data = text.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = _value_path(digest)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+    else:
+        # Refresh the age so a sweep cannot take a value that is being reused.
+        path.touch()
+    return {_REF_KEY: digest, "bytes": len(data)}
+
+
+def _read_mapped(ref: Mapping[str, Any], max_bytes: Optional[int] = None) -> bytes:
+    # Map per access and unmap right away: no descriptors are held between
+    # reads, and the backing file can be deleted (also on Windows).
+    digest = ref[_REF_KEY]
+    path = _value_path(digest)
+    try:
+        handle = path.open("rb")
+    except FileNotFoundError:
+        raise ValueError(f"stored value {digest[:12]} is missing from the value store") from None
+    with handle:
+        if path.stat().st_size == 0:
+            return b""
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[:] if max_bytes is None else mapped[:max_bytes]
+
+
+def read_value(ref: Mapping[str, Any]) -> str:
+    return _read_mapped(ref).decode("utf-8")
+
+
+def read_value_prefix(ref: Mapping[str, Any], max_chars: int) -> str:
+    # UTF-8 needs at most 4 bytes per character; a cut multibyte tail is dropped.
+    return _read_mapped(ref, max_chars * 4).decode("utf-8", errors="ignore")[:max_chars]
+
+
+def value_size_bytes(value: Any) -> int:
+    if is_value_ref(value):
+        return int(value.get("bytes", 0))
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return 0
+
+
+def externalize_large_values(
+    values: Mapping[str, Any], threshold_bytes: int = DEFAULT_THRESHOLD_BYTES
+) -> Dict[str, Any]:
+    """Replace string values at or above the threshold with value-store handles."""
+    out: Dict[str, Any] = {}
+    for name, value in values.items():
+        if isinstance(value, str) and len(value) * 4 >= threshold_bytes:
+            if len(value.encode("utf-8")) >= threshold_bytes:
+                out[name] = store_value(value)
+                continue
+        out[name] = value
+    return out
+
+
+def materialize_values(values: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        name: read_value(value) if is_value_ref(value) else value
+        for name, value in values.items()
+    }
+
+
+def referenced_value_digests(data: Any) -> Set[str]:
+    """Digests of every value handle anywhere in `data`, e.g. the chats state."""
+    digests: Set[str] = set()
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if is_value_ref(item):
+            digests.add(item[_REF_KEY])
+        elif isinstance(item, Mapping):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return digests
+
+
+def gc_values(
+    referenced: AbstractSet[str],
+    max_age_s: Optional[float] = None,
+    now: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Delete stored values whose digest is not in `referenced` (see
+    `referenced_value_digests`). With `max_age_s`, younger values are kept,
+    so a handle written but not yet saved with its chat survives the sweep.
+    Returns a summary of the pass.
+    """
+    current = time.time() if now is None else now
+    removed = 0
+    removed_bytes = 0
+    remaining = 0
+    remaining_bytes = 0
+    paths = _VALUES_DIR.glob("*/*") if _VALUES_DIR.exists() else []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        # Leftover `.tmp` files from an interrupted write are never referenced.
+        if path.name not in referenced and (
+            max_age_s is None or current - stat.st_mtime > max_age_s
+        ):
+            path.unlink(missing_ok=True)
+            removed += 1
+            removed_bytes += stat.st_size
+            continue
+        remaining += 1
+        remaining_bytes += stat.st_size
+    return {
+        "removed": removed,
+        "removed_bytes": removed_bytes,
+        "remaining": remaining,
+        "remaining_bytes": remaining_bytes,
+    }
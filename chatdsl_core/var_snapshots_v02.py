@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+
+_KEYFRAME_INTERVAL = 16
+_SNAPSHOT_KINDS = ("before", "after")
+
+
+def diff_vars(base: Mapping[str, Any], target: Mapping[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    set_vals = {name: value for name, value in target.items() if name not in base or base[name] != value}
+    unset = sorted(name for name in base if name not in target)
+    return set_vals, unset
+
+
+def apply_vars_delta(base: Mapping[str, Any], delta: Mapping[str, Any]) -> Dict[str, Any]:
+    out = dict(base)
+    for name in delta.get("unset", []):
+        out.pop(name, None)
+    out.update(delta.get("set", {}))
+    return out
+
+
+def _snapshot_key(which: str) -> str:
+    if which not in _SNAPSHOT_KINDS:
+        raise ValueError(f"snapshot kind must be one of {list(_SNAPSHOT_KINDS)}, got {which!r}")
+    return f"vars_{which}"
+
+
+def _has_snapshot(msg: Mapping[str, Any], which: str) -> bool:
+    meta = msg.get("meta")
+    if not isinstance(meta, Mapping):
+        return False
+    key = _snapshot_key(which)
+    return isinstance(meta.get(key), dict) or isinstance(meta.get(f"{key}_delta"), dict)
+
+
+def index_messages_by_id(history: Sequence[Mapping[str, Any]]) -> Dict[str, Mapping[str, Any]]:
+    return {
+        msg["id"]: msg
+        for msg in history
+        if isinstance(msg, Mapping) and isinstance(msg.get("id"), str)
+    }
+
+
+def _snapshot_depth(msg: Mapping[str, Any], which: str) -> int:
+    meta = msg.get("meta", {})
+    delta = meta.get(f"{_snapshot_key(which)}_delta")
+    if isinstance(delta, Mapping):
+        return int(delta.get("depth", 0))
+    return 0
+
+
+def resolve_vars_snapshot(
+    history: Sequence[Mapping[str, Any]],
+    msg: Mapping[str, Any],
+    which: str,
+    messages_by_id: Optional[Mapping[str, Mapping[str, Any]]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Reconstruct the `vars_before` / `vars_after` snapshot of a DSL message.
+    Full (legacy) snapshots are returned as-is; delta snapshots are replayed
+    from the nearest keyframe, which is at most `_KEYFRAME_INTERVAL` links away.
+    """
+    by_id = messages_by_id if messages_by_id is not None else index_messages_by_id(history)
+    chain: List[Mapping[str, Any]] = []
+    current_msg: Optional[Mapping[str, Any]] = msg
+    current_which = which
+
+    for _ in range(_KEYFRAME_INTERVAL + 1):
+        if current_msg is None:
+            return None
+        meta = current_msg.get("meta")
+        if not isinstance(meta, Mapping):
+            return None
+        key = _snapshot_key(current_which)
+        full = meta.get(key)
+        if isinstance(full, dict):
+            base: Dict[str, Any] = dict(full)
+            break
+        delta = meta.get(f"{key}_delta")
+        if not isinstance(delta, Mapping):
+            return None
+        chain.append(delta)
+        base_ref = delta.get("base")
+        if base_ref is None:
+            base = {}
+            break
+        base_id, _, base_which = str(base_ref).rpartition(":")
+        current_msg = by_id.get(base_id)
+        current_which = base_which
+    else:
+        raise ValueError("vars snapshot chain exceeds the keyframe interval")
+
+    for delta in reversed(chain):
+        base = apply_vars_delta(base, delta)
+    return base
+
+
+def _latest_snapshot_message(history: Sequence[Mapping[str, Any]]) -> Optional[Mapping[str, Any]]:
+    for msg in reversed(history):
+        if not isinstance(msg, Mapping):
+            continue
+        if msg.get("role") != "user" or msg.get("mode") != "dsl":
+            continue
+        if _has_snapshot(msg, "after"):
+            return msg
+    return None
+
+
+def _encode_delta(
+    base_ref: Optional[str],
+    base_vars: Mapping[str, Any],
+    base_depth: int,
+    target: Mapping[str, Any],
+) -> Dict[str, Any]:
+    if base_ref is None or base_depth + 1 >= _KEYFRAME_INTERVAL:
+        return {"base": None, "depth": 0, "set": dict(target), "unset": []}
+    set_vals, unset = diff_vars(base_vars, target)
+    return {"base": base_ref, "depth": base_depth + 1, "set": set_vals, "unset": unset}
+
+
+def record_vars_snapshots(
+    history: Sequence[Mapping[str, Any]],
+    message_id: str,
+    meta: Dict[str, Any],
+    vars_before: Mapping[str, Any],
+    vars_after: Mapping[str, Any],
+    timeline: Optional[Sequence[Mapping[str, Any]]] = None,
+    messages_by_id: Optional[Mapping[str, Mapping[str, Any]]] = None,
+) -> None:
+    """
+    Store delta-encoded snapshots on the meta of a DSL message that is about
+    to be appended to `history`. `vars_before` is encoded against the
+    `vars_after` of the previous run in `timeline` (the messages the new one
+    follows in its own edit branch; all of `history` by default), and
+    `vars_after` against `vars_before`.
+    """
+    prev = _latest_snapshot_message(history if timeline is None else timeline)
+    prev_vars = None
+    if prev is not None and isinstance(prev.get("id"), str):
+        prev_vars = resolve_vars_snapshot(history, prev, "after", messages_by_id=messages_by_id)
+    if prev is None or prev_vars is None:
+        before_delta = _encode_delta(None, {}, 0, vars_before)
+    else:
+        before_delta = _encode_delta(
+            f"{prev['id']}:after",
+            prev_vars,
+            _snapshot_depth(prev, "after"),
+            vars_before,
+        )
+    after_delta = _encode_delta(
+        f"{message_id}:before",
+        vars_before,
+        before_delta["depth"],
+        vars_after,
+    )
+    meta.pop("vars_before", None)
+    meta.pop("vars_after", None)
+    meta["vars_before_delta"] = before_delta
+    meta["vars_after_delta"] = after_delta
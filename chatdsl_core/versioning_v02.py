@@ -4,6 +4,8 @@ from dataclasses import dataclass
 import uuid
 from typing import Any, Dict, List, Optional
 
+from .var_snapshots_v02 import index_messages_by_id, resolve_vars_snapshot
+
 
 def new_message_id(prefix: str = "msg") -> str:
     return f"{prefix}-{uuid.uuid4().hex[:12]}"
@@ -254,25 +256,28 @@ def build_edit_run_context(
     if not source_found:
         visible_history_before = projected_history
 
-    source_meta = history[msg_idx].get("meta", {})
-    vars_before = source_meta.get("vars_before")
-    if isinstance(vars_before, dict):
+    messages_by_id = index_messages_by_id(history)
+    vars_before = resolve_vars_snapshot(
+        history, history[msg_idx], "before", messages_by_id=messages_by_id
+    )
+    if vars_before is not None:
         return EditRunContext(
             source_cutoff_index=source_cutoff_index,
             visible_history_before=visible_history_before,
-            vars_before=dict(vars_before),
+            vars_before=vars_before,
         )
 
     for msg in reversed(visible_history_before):
         if msg.get("role") != "user" or msg.get("mode") != "dsl":
             continue
-        meta = msg.get("meta", {})
-        prev_vars_after = meta.get("vars_after")
-        if isinstance(prev_vars_after, dict):
+        prev_vars_after = resolve_vars_snapshot(
+            history, msg, "after", messages_by_id=messages_by_id
+        )
+        if prev_vars_after is not None:
             return EditRunContext(
                 source_cutoff_index=source_cutoff_index,
                 visible_history_before=visible_history_before,
-                vars_before=dict(prev_vars_after),
+                vars_before=prev_vars_after,
             )
 
     return EditRunContext(
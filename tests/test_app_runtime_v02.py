@@ -123,3 +123,22 @@ def test_run_dsl_text_executes_if_block_without_leaking_branch_vars() -> None:
     assert res.vars_after == {"ok": True}
     assert res.parsed_steps[1]["node_kind"] == "if"
     assert res.logs[1]["node_kind"] == "if"
+
+
+def test_run_dsl_text_passes_cheap_model_call_to_prefilters() -> None:
+    prompts = []
+
+    def cheap_model_call(prompt: str) -> str:
+        prompts.append(prompt)
+        return "filtered"
+
+    res = run_dsl_text(
+        "Answer\n/FROM key facts /IN @notes\n/OUT answer",
+        context={"notes": "long notes"},
+        call_model=lambda *_: json.dumps({"error": 0, "out": "answer"}),
+        cheap_model_call=cheap_model_call,
+    )
+
+    assert res.ok is True
+    assert len(prompts) == 1
+    assert res.logs[0]["prefilter_logs"][0]["filtered_text"] == "filtered"
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+
+from chatdsl_core.batch_v02 import load_completed_rows, main, run_batch
+from chatdsl_core.cancellation_v02 import CancelToken
+from chatdsl_core.recovery_v02 import RecoveryPolicy
+
+
+PROGRAM = "Greet the user\n/FROM @name\n/DEF greeting /TYPE str\n/THEN Shout the greeting\n/FROM @greeting\n/OUT shouted"
+
+
+def _records(path) -> list:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _model(prompt: str, response_schema: dict) -> str:
+    payload = {"error": 0, "out": "done"}
+    if "vars" in response_schema["properties"]:
+        name = re.search(r"\b(user\d+|ada|bob)\b", prompt)
+        payload["vars"] = {"greeting": f"hello {name.group(1) if name else '?'}"}
+    return json.dumps(payload)
+
+
+def test_run_batch_executes_every_row_on_the_pool(tmp_path) -> None:
+    output = tmp_path / "out.jsonl"
+    threads = set()
+
+    def model(prompt: str, response_schema: dict) -> str:
+        threads.add(threading.get_ident())
+        time.sleep(0.01)
+        return _model(prompt, response_schema)
+
+    rows = [{"name": f"user{index}"} for index in range(6)]
+    summary = run_batch(PROGRAM, rows, output, call_model=model, workers=3)
+
+    assert (summary.rows_total, summary.rows_run, summary.rows_skipped, summary.rows_failed) == (6, 6, 0, 0)
+    records = sorted(_records(output), key=lambda record: record["row_index"])
+    assert [record["vars_after"]["greeting"] for record in records] == [f"hello user{i}" for i in range(6)]
+    assert records[0]["outputs"] == ["done", "done"]
+    assert records[0]["logs"][0]["node_kind"] == "step"
+    assert records[0]["timings"]["execute_s"] >= 0
+    assert len(threads) > 1
+
+
+def test_run_batch_resumes_after_an_interrupted_run(tmp_path) -> None:
+    output = tmp_path / "out.jsonl"
+    rows = [{"name": f"user{index}"} for index in range(4)]
+    run_batch(PROGRAM, rows[:2], output, call_model=_model)
+    with output.open("a", encoding="utf-8") as handle:
+        handle.write('{"row_index": 2, "ok"')  # killed mid-write
+
+    assert load_completed_rows(output) == {0, 1}
+    summary = run_batch(PROGRAM, rows, output, call_model=_model)
+
+    assert (summary.rows_run, summary.rows_skipped) == (2, 2)
+    assert sorted(record["row_index"] for record in _records(output)) == [0, 1, 2, 3]
+
+
+def test_rows_missing_variables_fail_and_can_be_retried(tmp_path) -> None:
+    output = tmp_path / "out.jsonl"
+    rows = [{"name": "ada"}, {"nickname": "bob"}]
+
+    summary = run_batch(PROGRAM, rows, output, call_model=_model)
+
+    assert summary.rows_failed == 1
+    failed = next(record for record in _records(output) if not record["ok"])
+    assert failed["row_index"] == 1 and failed["error"] == "Missing variables: name"
+
+    rows[1] = {"name": "bob"}
+    retried = run_batch(PROGRAM, rows, output, call_model=_model, retry_failed=True)
+    assert (retried.rows_run, retried.rows_failed) == (1, 0)
+    assert _records(output)[-1]["vars_after"]["greeting"] == "hello bob"
+
+
+def test_run_batch_without_resume_creates_the_output_directory(tmp_path) -> None:
+    output = tmp_path / "new" / "dir" / "out.jsonl"
+    summary = run_batch(PROGRAM, [{"name": "ada"}], output, call_model=_model, resume=False)
+
+    assert summary.rows_run == 1
+    assert [record["row_index"] for record in _records(output)] == [0]
+
+
+def test_cancelled_batch_leaves_unfinished_rows_for_resume(tmp_path) -> None:
+    output = tmp_path / "out.jsonl"
+    token = CancelToken()
+    rows = [{"name": f"user{index}"} for index in range(5)]
+
+    def model(prompt: str, response_schema: dict) -> str:
+        if "user1" in prompt:
+            raise RuntimeError("model unavailable")
+        if "user2" in prompt:
+            token.cancel("operator stop")
+        return _model(prompt, response_schema)
+
+    summary = run_batch(PROGRAM, rows, output, call_model=model, workers=1, cancel_token=token)
+
+    # Row 1 failed before the cancel and stays recorded as a failure.
+    assert (summary.rows_run, summary.rows_failed, summary.rows_cancelled) == (2, 1, 3)
+    assert sorted(record["row_index"] for record in _records(output)) == [0, 1]
+    resumed = run_batch(PROGRAM, rows, output, call_model=_model)
+    assert (resumed.rows_run, resumed.rows_skipped) == (3, 2)
+
+
+def test_run_batch_applies_the_recovery_policy(tmp_path) -> None:
+    output = tmp_path / "out.jsonl"
+
+    def fenced(prompt: str, response_schema: dict) -> str:
+        return f"```json\n{_model(prompt, response_schema)}\n```"
+
+    summary = run_batch(
+        PROGRAM, [{"name": "ada"}], output, call_model=fenced, recovery=RecoveryPolicy(max_retries=0)
+    )
+
+    assert summary.rows_failed == 0
+    assert _records(output)[0]["logs"][0]["recovery"]["repairs"] == ["extracted_json"]
+
+
+def test_cli_runs_with_stub_responses(tmp_path, capsys) -> None:
+    program = tmp_path / "program.dsl"
+    program.write_text(PROGRAM, encoding="utf-8")
+    dataset = tmp_path / "rows.jsonl"
+    dataset.write_text('{"name": "ada"}\n\n{"name": "bob"}\n', encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+
+    assert main([str(program), str(dataset), str(output), "--stub", "--workers", "2"]) == 0
+
+    assert len(_records(output)) == 2
+    assert "2 rows run, 0 skipped, 0 failed, 0 cancelled" in capsys.readouterr().err
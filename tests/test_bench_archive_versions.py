@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+import sys
+
+from benchmarks import bench_archive_versions
+from benchmarks.bench_archive_versions import VERSIONS, relative_to_active
+
+
+def test_archive_versions_load_without_leaking_modules() -> None:
+    path_before = list(sys.path)
+
+    versions = {name: load() for name, load in VERSIONS.items()}
+
+    assert sys.path == path_before
+    assert "parser_v02" not in sys.modules and "example_parser" not in sys.modules
+    assert versions["v0.1"].execute is None
+    assert versions["v0.2"].parse is not versions["v0.3"].parse
+    steps = versions["v0.3"].parse("Make x\n/DEF x /TYPE int")
+    _, logs, _ = versions["v0.3"].execute(steps, bench_archive_versions._stub_model)
+    assert logs[0]["parsed_json"]["vars"] == {"x": 7}
+
+
+def test_relative_to_active_divides_by_matching_active_case() -> None:
+    def result(version: str, median: float) -> dict:
+        return {
+            "group": "chain",
+            "size": 10,
+            "params": {"target": "parse", "version": version},
+            "wall_s": {"median": median},
+        }
+
+    rows = relative_to_active([result("active", 0.002), result("v0.2", 0.001)])
+
+    assert rows == [
+        {"target": "parse", "workload": "chain", "size": 10, "version": "v0.2", "ratio_to_active": 0.5}
+    ]
+
+
+def test_archive_suite_quick_run_reports_ratios(tmp_path) -> None:
+    output = tmp_path / "archive.json"
+
+    exit_code = bench_archive_versions.main(
+        ["--quick", "--repeat", "1", "--version", "v0.1", "--output", str(output)]
+    )
+
+    assert exit_code == 0
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert {result["params"]["version"] for result in report["results"]} == {"v0.1", "active"}
+    assert [(row["target"], row["version"]) for row in report["relative_to_active"]] == [("parse", "v0.1")]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from benchmarks import bench_executor_v02
+from benchmarks.simulated_backend import SimulatedBackend, parse_latency
+from chatdsl_core.executor_v02 import execute_program
+from chatdsl_core.parser_v02 import parse_program
+
+
+def test_parse_latency_supports_distribution_specs() -> None:
+    rng = random.Random(1)
+
+    assert parse_latency("zero")(rng) == 0.0
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert 0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2
+    assert parse_latency("lognormal:-3,0.5")(rng) > 0
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1")
+
+
+def test_simulated_backend_returns_schema_valid_responses() -> None:
+    program = parse_program(
+        "Seed\n/DEF count /TYPE int\n/DEF flag /TYPE bool\n/DEF note\n/THEN Use notes\n/FROM key facts /IN @note\n/OUT done"
+    )
+    backend = SimulatedBackend()
+
+    ctx, logs, _ = execute_program(
+        program,
+        {},
+        call_model=backend.call_model,
+        cheap_model_call=backend.cheap_model_call,
+    )
+
+    assert ctx == {"count": 7, "flag": True, "note": "simulated value"}
+    assert backend.step_calls == 2
+    assert backend.cheap_calls == 1
+    assert json.loads(logs[1]["raw_response"])["out"] == "simulated output"
+
+
+def test_executor_suite_quick_run_reports_per_step_metrics(tmp_path) -> None:
+    report_path = tmp_path / "executor.json"
+    argv = ["--quick", "--repeat", "1", "--step-latency", "zero", "--cheap-latency", "zero"]
+
+    assert bench_executor_v02.main([*argv, "--output", str(report_path)]) == 0
+
+    results = {
+        result["name"]: result
+        for result in json.loads(report_path.read_text(encoding="utf-8"))["results"]
+    }
+    prefetch = results["execute_program/prefiltered=5/prefetch"]
+    assert prefetch["per_unit"]["units"] == 5
+    assert prefetch["extra"]["cheap_calls"] == 5
+    assert results["execute_program/if_depth=4/serial"]["extra"]["steps"] == 5
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import json
+import time
+
+from benchmarks import bench_parser_v02
+from benchmarks.common import BenchCase, build_arg_parser, compare_reports, run_suite
+
+
+def _report(**medians: float) -> dict:
+    return {"results": [{"name": name, "wall_s": {"median": value}} for name, value in medians.items()]}
+
+
+def test_compare_reports_flags_only_cases_past_threshold() -> None:
+    baseline = _report(fast=0.010, slow=0.010, tiny=0.00001, gone=0.010)
+    current = _report(fast=0.012, slow=0.030, tiny=0.0001, new=0.5)
+
+    regressions = compare_reports(current, baseline, threshold=1.5)
+
+    assert [regression["name"] for regression in regressions] == ["slow"]
+    assert regressions[0]["ratio"] == 3.0
+
+
+def test_parser_suite_quick_run_writes_report_and_detects_regressions(tmp_path) -> None:
+    report_path = tmp_path / "parser.json"
+
+    assert bench_parser_v02.main(["--quick", "--repeat", "1", "--output", str(report_path)]) == 0
+
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    names = {result["name"] for result in report["results"]}
+    assert "parse_program/steps=10" in names
+    assert "validate_program/if_depth=4" in names
+    assert all(result["peak_bytes"] >= 0 for result in report["results"])
+
+
+def test_run_suite_exits_non_zero_on_regression(tmp_path) -> None:
+    case = BenchCase(name="sleepy", group="demo", size=1, setup=lambda: lambda: time.sleep(0.002))
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps(_report(sleepy=0.0001)), encoding="utf-8")
+    args = build_arg_parser("demo").parse_args(["--repeat", "1", "--baseline", str(baseline_path)])
+
+    assert run_suite("demo", [case], args) == 1
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from benchmarks import bench_storage_v02
+from benchmarks.bench_storage_v02 import BACKENDS, StorageBackend, resolve_backend
+from benchmarks.workloads import synthetic_chats_state
+from chatdsl_core import state_store_v02
+
+
+PLUGIN = StorageBackend(
+    "plugin",
+    save=lambda directory, state: (directory / "plugin.json").write_text(json.dumps(state)),
+    load=lambda directory: json.loads((directory / "plugin.json").read_text()),
+    files=lambda directory: [directory / "plugin.json"],
+)
+
+
+def test_backends_round_trip_state_and_restore_state_store_paths(tmp_path) -> None:
+    state = synthetic_chats_state(2, 12)
+    chats_path = state_store_v02._CHATS_PATH
+
+    for name, backend in BACKENDS.items():
+        directory = tmp_path / name
+        directory.mkdir()
+        backend.save(directory, state)
+        assert backend.load(directory) == state
+        assert all(path.exists() for path in backend.files(directory))
+
+    assert state_store_v02._CHATS_PATH == chats_path
+    user_meta = state["chats"][0]["history"][0]["meta"]
+    assert user_meta["execution_logs"] and "vars_after_delta" in user_meta
+
+
+def test_resolve_backend_accepts_names_and_import_specs() -> None:
+    assert resolve_backend("pickle") is BACKENDS["pickle"]
+    assert resolve_backend(f"{__name__}:PLUGIN") is PLUGIN
+    with pytest.raises(ValueError):
+        resolve_backend("sqlite")
+    with pytest.raises(ValueError):
+        resolve_backend("benchmarks.bench_storage_v02:BACKENDS")
+
+
+def test_storage_suite_quick_run_reports_bytes(tmp_path) -> None:
+    output = tmp_path / "storage.json"
+
+    exit_code = bench_storage_v02.main(
+        ["--quick", "--repeat", "1", "--workdir", str(tmp_path / "work"), "--output", str(output)]
+    )
+
+    assert exit_code == 0
+    results = {result["name"]: result for result in json.loads(output.read_text())["results"]}
+    saved = results["save_chats/state_store/messages=200"]["extra"]["bytes_written"]
+    assert results["run_persist/state_store/messages=200"]["extra"]["bytes_written_per_run"] > saved
+    assert results["load_chats/pickle/messages=200"]["extra"]["bytes_read"] > 0
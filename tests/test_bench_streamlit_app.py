@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from benchmarks import bench_streamlit_app
+
+
+def test_streamlit_suite_reports_missing_streamlit(monkeypatch, capsys) -> None:
+    monkeypatch.setattr(bench_streamlit_app, "AppTest", None)
+
+    assert bench_streamlit_app.main(["--quick"]) == 2
+    assert "streamlit is not installed" in capsys.readouterr().err
+
+
+def test_streamlit_suite_quick_run(tmp_path) -> None:
+    pytest.importorskip("streamlit.testing.v1")
+    output = tmp_path / "app.json"
+
+    assert bench_streamlit_app.main(["--quick", "--repeat", "1", "--output", str(output)]) == 0
+
+    names = {result["name"] for result in json.loads(output.read_text(encoding="utf-8"))["results"]}
+    assert {"open_app/messages=50", "send_dsl_run/messages=50"} <= names
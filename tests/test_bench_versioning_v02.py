@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+
+from benchmarks import bench_versioning_v02
+from benchmarks.common import BenchCase, build_arg_parser, run_suite
+from benchmarks.workloads import synthetic_history
+from chatdsl_core.versioning_v02 import (
+    backfill_history_metadata,
+    build_edit_run_context,
+    project_visible_history_indices,
+)
+
+
+def test_synthetic_history_is_consistent_with_versioning() -> None:
+    history = synthetic_history(300, hidden_edit_fraction=0.25, seed=3)
+    by_id = {msg["id"]: msg for msg in history}
+    users = [msg for msg in history if msg["role"] == "user"]
+    edits = [msg for msg in users if "edited_from_message_id" in msg["meta"]]
+
+    assert len(history) == 300
+    assert edits
+    assert any(by_id[msg["meta"]["edited_from_message_id"]]["meta"]["version"] > 1 for msg in edits)
+    assert any(msg["meta"]["source_cutoff_index"] < history.index(msg) - 1 for msg in edits)
+    assert backfill_history_metadata(history) is False
+
+    visible = project_visible_history_indices(history)
+    assert visible[-1] == len(history) - 1
+    context = build_edit_run_context(history, users[-1]["id"])
+    assert context.vars_before
+
+
+def test_versioning_suite_quick_run_writes_report(tmp_path) -> None:
+    output = tmp_path / "versioning.json"
+
+    assert bench_versioning_v02.main(["--quick", "--repeat", "1", "--output", str(output)]) == 0
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    names = {result["name"] for result in report["results"]}
+    assert "cutoff_index_for_version_view/oldest_visible/history=200" in names
+    assert "backfill_history_metadata/legacy/hidden_edits=100" in names
+    assert report["skipped"] == []
+
+
+def test_budget_skips_larger_sizes_in_a_series(tmp_path) -> None:
+    def slow_setup():
+        return lambda: sum(range(20000))
+
+    cases = [
+        BenchCase(name=f"sum/n={size}", group="sum", size=size, setup=slow_setup, series="sum")
+        for size in (1, 2, 3)
+    ]
+    output = tmp_path / "budget.json"
+    args = build_arg_parser("demo").parse_args(["--repeat", "1", "--budget", "0", "--output", str(output)])
+
+    assert run_suite("demo", cases, args) == 0
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert [result["name"] for result in report["results"]] == ["sum/n=1"]
+    assert report["results"][0]["over_budget"] is True
+    assert report["skipped"] == ["sum/n=2", "sum/n=3"]
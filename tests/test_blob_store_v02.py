@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from chatdsl_core import blob_store_v02
+from chatdsl_core.log_retention_v02 import referenced_blob_digests
+
+
+def _set_blob_dir(tmp_path: Path) -> Path:
+    blob_dir = tmp_path / "blobs"
+    blob_store_v02._BLOBS_DIR = blob_dir
+    return blob_dir
+
+
+def test_put_blob_round_trips_and_deduplicates(tmp_path: Path) -> None:
+    _set_blob_dir(tmp_path)
+    text = "prompt body " * 200
+
+    digest = blob_store_v02.put_blob(text)
+    again = blob_store_v02.put_blob(text)
+
+    assert digest == again == blob_store_v02.blob_digest(text)
+    assert blob_store_v02.get_blob(digest) == text
+    stats = blob_store_v02.blob_store_stats()
+    assert stats["count"] == 1
+    assert stats["total_bytes"] < len(text)
+
+
+def test_get_blob_returns_none_for_unknown_digest(tmp_path: Path) -> None:
+    _set_blob_dir(tmp_path)
+
+    assert blob_store_v02.get_blob("ab" * 32) is None
+    assert blob_store_v02.has_blob("ab" * 32) is False
+
+
+def test_gc_blobs_removes_by_age_then_size_budget(tmp_path: Path) -> None:
+    _set_blob_dir(tmp_path)
+    old = blob_store_v02.put_blob("old")
+    mid = blob_store_v02.put_blob("middle " * 50)
+    new = blob_store_v02.put_blob("newest " * 50)
+    now = 1_000_000.0
+    os.utime(blob_store_v02._blob_path(old), (now - 500, now - 500))
+    os.utime(blob_store_v02._blob_path(mid), (now - 50, now - 50))
+    os.utime(blob_store_v02._blob_path(new), (now - 5, now - 5))
+    new_size = blob_store_v02._blob_path(new).stat().st_size
+
+    summary = blob_store_v02.gc_blobs(max_age_s=100, max_total_bytes=new_size, now=now)
+
+    assert summary["removed"] == 2
+    assert summary["remaining"] == 1
+    assert blob_store_v02.get_blob(old) is None
+    assert blob_store_v02.get_blob(mid) is None
+    assert blob_store_v02.get_blob(new) == "newest " * 50
+
+
+def test_gc_blobs_keeps_referenced_blobs(tmp_path: Path) -> None:
+    _set_blob_dir(tmp_path)
+    live = blob_store_v02.put_blob("live prompt " * 20)
+    orphan = blob_store_v02.put_blob("orphan prompt " * 20)
+    now = 1_000_000.0
+    for digest in (live, orphan):
+        os.utime(blob_store_v02._blob_path(digest), (now - 500, now - 500))
+    state = {
+        "chats": [
+            {
+                "history": [
+                    {"meta": {"execution_logs": [{"prompt_ref": {"digest": live, "stored": True}}]}},
+                    {"meta": {"execution_logs": [{"raw_response_ref": {"digest": orphan, "stored": False}}]}},
+                ]
+            }
+        ]
+    }
+    referenced = referenced_blob_digests(state)
+    assert referenced == {live}
+
+    summary = blob_store_v02.gc_blobs(max_age_s=100, max_total_bytes=0, now=now, referenced=referenced)
+
+    assert summary["removed"] == 1 and summary["remaining"] == 1
+    assert blob_store_v02.get_blob(live) == "live prompt " * 20
+    assert blob_store_v02.get_blob(orphan) is None
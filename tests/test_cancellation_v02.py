@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import io
+import json
+import threading
+import time
+import urllib.error
+
+import pytest
+
+from chatdsl_core import gemini_client_v02
+from chatdsl_core.cancellation_v02 import CancelToken, RunCancelled, use_cancel_token
+from chatdsl_core.executor_v02 import execute_program
+from chatdsl_core.observers_v02 import ExecutionObserver
+from chatdsl_core.parser_v02 import parse_program
+from chatdsl_core.runtime_v02 import run_dsl_text
+
+
+_THREE_STEPS = "First\n/OUT one\n/THEN Second\n/OUT two\n/THEN Third\n/OUT three"
+
+
+def test_cancel_skips_remaining_steps() -> None:
+    token = CancelToken()
+    prompts = []
+
+    class CancelAfterFirstCommit(ExecutionObserver):
+        def on_commit(self, node_path, staged_updates):
+            token.cancel("user pressed stop")
+
+    def call_model(prompt: str, response_schema: dict) -> str:
+        prompts.append(prompt)
+        return json.dumps({"error": 0, "out": "ok"})
+
+    with pytest.raises(RunCancelled, match="user pressed stop"):
+        execute_program(
+            parse_program(_THREE_STEPS),
+            {},
+            call_model=call_model,
+            observers=[CancelAfterFirstCommit()],
+            cancel_token=token,
+        )
+    assert len(prompts) == 1
+
+
+def test_child_token_follows_its_parent_but_not_the_reverse() -> None:
+    parent = CancelToken.after(60)
+    child = parent.child()
+    assert child.deadline == parent.deadline
+
+    child.cancel("stream closed")
+    assert child.cancelled and not parent.cancelled
+
+    sibling = parent.child()
+    parent.cancel("shutdown")
+    assert sibling.reason() == "shutdown" and parent.child().reason() == "shutdown"
+
+
+def test_deadline_abandons_in_flight_model_call() -> None:
+    release = threading.Event()
+
+    def hung_model(prompt: str, response_schema: dict) -> str:
+        release.wait(5)
+        return json.dumps({"error": 0, "out": "late"})
+
+    started = time.monotonic()
+    try:
+        with pytest.raises(RunCancelled, match="deadline of 0.1s exceeded"):
+            execute_program(
+                parse_program(_THREE_STEPS),
+                {},
+                call_model=hung_model,
+                cancel_token=CancelToken.after(0.1),
+            )
+    finally:
+        release.set()
+    assert time.monotonic() - started < 1.0
+
+
+def test_prefilter_calls_are_cancellable() -> None:
+    release = threading.Event()
+
+    def hung_prefilter(prompt: str) -> str:
+        release.wait(5)
+        return "late"
+
+    program = parse_program("Use notes\n/FROM tasks /IN @notes\n/OUT done", predeclared_vars=["notes"])
+    try:
+        with pytest.raises(RunCancelled):
+            execute_program(
+                program,
+                {"notes": "n"},
+                cheap_model_call=hung_prefilter,
+                cancel_token=CancelToken.after(0.05),
+            )
+    finally:
+        release.set()
+
+
+def test_run_dsl_text_reports_deadline_as_execution_error() -> None:
+    result = run_dsl_text("Make x\n/OUT x", {}, cancel_token=CancelToken.after(0))
+    assert not result.ok
+    assert result.error.startswith("Execution error: Run stopped: deadline of 0.0s exceeded")
+
+
+def test_gemini_client_caps_timeout_and_stops_retrying(monkeypatch) -> None:
+    timeouts = []
+
+    def fake_urlopen(req, timeout=None):
+        timeouts.append(timeout)
+        raise urllib.error.HTTPError(req.full_url, 503, "busy", hdrs=None, fp=io.BytesIO(b"busy"))
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_client_v02.urllib.request, "urlopen", fake_urlopen)
+    token = CancelToken.after(0.3)
+    started = time.monotonic()
+    with use_cancel_token(token), pytest.raises(RunCancelled):
+        gemini_client_v02.call_gemini("hello", timeout_s=60)
+    # The first 1s backoff is cut short by the 0.3s budget.
+    assert time.monotonic() - started < 0.9
+    assert len(timeouts) == 1 and timeouts[0] <= 0.3
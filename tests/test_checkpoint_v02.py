@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from chatdsl_core.checkpoint_v02 import CheckpointObserver, ExecutionCheckpoint
+from chatdsl_core.executor_v02 import execute_program
+from chatdsl_core.parser_v02 import parse_program
+from chatdsl_core.runtime_v02 import run_dsl_text
+
+
+_BRANCHED = """Decide
+/DEF go /TYPE bool
+/IF @go
+/THEN Draft a note
+/DEF note /TYPE str
+/THEN Polish @note
+/FROM @note
+/DEF polished /TYPE str
+/OUT polished
+/END
+/THEN Wrap up
+/OUT bye
+"""
+
+_LINEAR = "Make a\n/DEF a /TYPE str\n/THEN Make b\n/DEF b /TYPE str\n/THEN Use both\n/OUT done"
+
+
+def _scripted(responses, prompts):
+    def call_model(prompt: str, response_schema: dict) -> str:
+        prompts.append(prompt)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return json.dumps(response)
+
+    return call_model
+
+
+def _run_until_failure(program, context, responses):
+    prompts: list = []
+    checkpointer = CheckpointObserver()
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        execute_program(
+            program, dict(context), call_model=_scripted(responses, prompts), observers=[checkpointer]
+        )
+    return checkpointer.checkpoint, prompts
+
+
+def test_resume_inside_if_branch_skips_completed_steps() -> None:
+    program = parse_program(_BRANCHED)
+    checkpoint, prompts = _run_until_failure(
+        program,
+        {},
+        [
+            {"error": 0, "out": "", "vars": {"go": True}},
+            {"error": 0, "out": "drafted", "vars": {"note": "raw note"}},
+            RuntimeError("model unavailable"),
+        ],
+    )
+    assert len(prompts) == 3
+    assert checkpoint.node_path == [1, 1] and checkpoint.error == "model unavailable"
+    assert checkpoint.outputs == ["", "drafted"] and checkpoint.steps_done == 2
+    assert checkpoint.scopes() == [{"go": True}, {"note": "raw note"}]
+
+    # Checkpoints live in chat state, so they must survive JSON.
+    restored = ExecutionCheckpoint.from_dict(json.loads(json.dumps(checkpoint.to_dict())))
+    prompts = []
+    ctx, logs, outputs = execute_program(
+        program,
+        {},
+        call_model=_scripted(
+            [
+                {"error": 0, "out": "polished", "vars": {"polished": "nice note"}},
+                {"error": 0, "out": "bye"},
+            ],
+            prompts,
+        ),
+        resume_from=restored,
+    )
+    assert len(prompts) == 2 and "raw note" in prompts[0]
+    assert outputs == ["", "drafted", "polished", "bye"]
+    # Branch variables stay in the branch, as in an uninterrupted run.
+    assert ctx == {"go": True}
+    assert [log["node_path"] for log in logs] == [[0], [1], [1, 0], [1, 1], [2]]
+    assert "timings" in logs[1]
+    # Resumed steps continue the failed attempt's clock, so traces stay on one timeline.
+    assert logs[3]["timings"]["started_at_s"] >= restored.ended_at_s > 0
+
+
+def test_second_failure_keeps_commits_from_before_the_first() -> None:
+    program = parse_program(_LINEAR)
+    first = run_dsl_text(
+        _LINEAR,
+        {"seed": 1},
+        call_model=_scripted(
+            [{"error": 0, "out": "a", "vars": {"a": "A"}}, RuntimeError("model unavailable")], []
+        ),
+    )
+    assert not first.ok and first.checkpoint.node_path == [1]
+
+    checkpointer = CheckpointObserver(first.checkpoint)
+    with pytest.raises(RuntimeError):
+        execute_program(
+            program,
+            {"seed": 1},
+            call_model=_scripted(
+                [{"error": 0, "out": "b", "vars": {"b": "B"}}, RuntimeError("model unavailable")], []
+            ),
+            observers=[checkpointer],
+            resume_from=first.checkpoint,
+        )
+    second = checkpointer.checkpoint
+    assert second.node_path == [2] and second.outputs == ["a", "b"]
+    assert second.scopes() == [{"seed": 1, "a": "A", "b": "B"}]
+
+    resumed = run_dsl_text(
+        _LINEAR,
+        {"seed": 1},
+        call_model=_scripted([{"error": 0, "out": "done"}], []),
+        resume_from=second,
+    )
+    assert resumed.ok and resumed.outputs == ["a", "b", "done"]
+    assert resumed.vars_after == {"seed": 1, "a": "A", "b": "B"} and resumed.checkpoint is None
+
+
+def test_progress_checkpoints_resume_a_run_that_died_mid_way() -> None:
+    program = parse_program(_BRANCHED)
+    snapshots = []
+
+    class Snapshot(CheckpointObserver):
+        def on_node_exit(self, node_kind, node_path, log, error) -> None:
+            super().on_node_exit(node_kind, node_path, log, error)
+            snapshots.append(self.progress)
+
+    checkpointer = Snapshot()
+    execute_program(
+        program,
+        {},
+        call_model=_scripted(
+            [
+                {"error": 0, "out": "", "vars": {"go": True}},
+                {"error": 0, "out": "drafted", "vars": {"note": "raw note"}},
+                {"error": 0, "out": "polished", "vars": {"polished": "nice"}},
+                {"error": 0, "out": "bye"},
+            ],
+            [],
+        ),
+        observers=[checkpointer],
+    )
+    assert checkpointer.checkpoint is None
+    assert [snapshot.node_path for snapshot in snapshots] == [[1], [1, 1], [1, 2], [2], [3]]
+
+    # The process died after the first branch step; only its progress checkpoint was saved.
+    saved = ExecutionCheckpoint.from_dict(json.loads(json.dumps(snapshots[1].to_dict())))
+    assert saved.error is None and saved.outputs == ["", "drafted"]
+    prompts = []
+    ctx, logs, outputs = execute_program(
+        program,
+        {},
+        call_model=_scripted(
+            [{"error": 0, "out": "polished", "vars": {"polished": "nice"}}, {"error": 0, "out": "bye"}],
+            prompts,
+        ),
+        resume_from=saved,
+    )
+    assert len(prompts) == 2 and "raw note" in prompts[0]
+    assert outputs == ["", "drafted", "polished", "bye"] and ctx == {"go": True}
+    assert logs[1]["start_line_no"] == 3 and logs[1]["child_count"] == 2
+
+    # A run that died after its last node resumes to the same result without model calls.
+    finished = execute_program(program, {}, resume_from=snapshots[-1])
+    assert finished[2] == outputs
+
+
+def test_resume_rejects_a_checkpoint_from_another_program() -> None:
+    checkpoint = ExecutionCheckpoint(node_path=[3, 0], initial_vars={})
+    with pytest.raises(ValueError, match="Checkpoint does not match the program"):
+        execute_program(parse_program("Only\n/OUT one"), {}, resume_from=checkpoint)
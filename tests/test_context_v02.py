@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import pytest
+
+from chatdsl_core.context_v02 import LayeredContext
+
+
+def test_child_reads_through_and_writes_locally() -> None:
+    base = {"a": 1, "b": 2}
+    root = LayeredContext(base)
+    child = root.child()
+
+    child["b"] = 20
+    child["c"] = 30
+
+    assert child["a"] == 1
+    assert dict(child) == {"a": 1, "b": 20, "c": 30}
+    assert list(child) == ["a", "b", "c"]
+    assert base == {"a": 1, "b": 2}
+    assert child.local_items() == {"b": 20, "c": 30}
+
+
+def test_root_writes_go_to_the_wrapped_dict() -> None:
+    base: dict = {}
+    root = LayeredContext(base)
+    nested = root.child().child()
+
+    root["x"] = "shared"
+
+    assert base == {"x": "shared"}
+    assert nested["x"] == "shared"
+
+
+def test_delete_hides_parent_value_only_in_child() -> None:
+    root = LayeredContext({"a": 1, "b": 2})
+    child = root.child()
+
+    del child["a"]
+
+    assert "a" not in child
+    assert len(child) == 1
+    assert root["a"] == 1
+    with pytest.raises(KeyError):
+        child["a"]
+    child["a"] = 3
+    assert child["a"] == 3
+
+
+def test_layered_context_compares_equal_to_flat_dict() -> None:
+    root = LayeredContext({"a": 1})
+    child = root.child()
+    child.update({"b": True})
+
+    assert child == {"a": 1, "b": True}
+    assert child.flatten() == {"a": 1, "b": True}
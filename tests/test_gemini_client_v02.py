@@ -172,3 +172,62 @@ def test_call_gemini_requires_api_key(monkeypatch) -> None:
 
     with pytest.raises(EnvironmentError, match="GEMINI_API_KEY is not set"):
         gemini_client_v02.call_gemini("hello")
+
+def test_call_gemini_detailed_returns_usage_and_model_metadata(monkeypatch) -> None:
+    attempts: list[int] = []
+
+    def fake_urlopen(req, timeout=None):
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise urllib.error.HTTPError(
+                req.full_url, 503, "busy", hdrs=None, fp=io.BytesIO(b"retry later")
+            )
+        resp = _json_response(
+            {
+                "candidates": [{"content": {"parts": [{"text": "ok"}]}}],
+                "usageMetadata": {
+                    "promptTokenCount": 12,
+                    "candidatesTokenCount": 3,
+                    "cachedContentTokenCount": 8,
+                    "totalTokenCount": 15,
+                },
+                "modelVersion": "gemini-2.5-flash-001",
+            }
+        )
+        resp.status = 200
+        return resp
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_client_v02.urllib.request, "urlopen", fake_urlopen)
+    monkeypatch.setattr(gemini_client_v02.time, "sleep", lambda _: None)
+
+    result = gemini_client_v02.call_gemini_detailed("hello", model="gemini-2.5-flash")
+
+    assert result.text == "ok"
+    assert result.model == "gemini-2.5-flash"
+    assert result.model_version == "gemini-2.5-flash-001"
+    assert result.usage == {
+        "prompt_tokens": 12,
+        "candidates_tokens": 3,
+        "cached_tokens": 8,
+        "total_tokens": 15,
+    }
+    assert result.retries == 1
+    assert result.http_status == 200
+    assert result.latency_s >= 0
+    assert result.metadata()["usage"] == result.usage
+
+def test_call_gemini_detailed_tolerates_missing_usage(monkeypatch) -> None:
+    def fake_urlopen(req, timeout=None):
+        return _json_response({"candidates": [{"content": {"parts": [{"text": "ok"}]}}]})
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_client_v02.urllib.request, "urlopen", fake_urlopen)
+
+    result = gemini_client_v02.call_gemini_detailed("hello")
+
+    assert result.usage == {}
+    assert result.model_version is None
+    assert result.retries == 0
+    # No status on the response: reported as unknown rather than assumed 200.
+    assert result.http_status is None
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import io
+import json
+
+from chatdsl_core import gemini_client_v02
+from chatdsl_core.cancellation_v02 import CancelToken
+from chatdsl_core.executor_v02 import ModelReply, execute_program
+from chatdsl_core.generation_v02 import (
+    GenerationConfig,
+    GenerationPolicy,
+    current_generation_config,
+    prefilter_generation_config,
+    step_generation_config,
+    use_generation_config,
+)
+from chatdsl_core.parser_v02 import parse_program
+from chatdsl_core.recovery_v02 import RecoveryPolicy
+
+
+_PROGRAM = """Is this urgent?
+/DEF urgent /TYPE bool
+/THEN Write a reply
+/FROM the open questions /IN @notes
+/DEF summary /TYPE nat
+/OUT reply
+"""
+
+
+class FakeResp(io.BytesIO):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+def test_step_budget_follows_declarations_and_overrides() -> None:
+    classify, reply = parse_program(_PROGRAM, predeclared_vars=["notes"]).items
+    small = step_generation_config(classify)
+    large = step_generation_config(reply)
+    assert small.temperature == 0.0 and small.max_output_tokens < 200
+    assert large.temperature is None and large.max_output_tokens > 1500
+
+    policy = GenerationPolicy(
+        defaults=GenerationConfig(temperature=0.3),
+        step_overrides={reply.index: GenerationConfig(max_output_tokens=4000, stop_sequences=("END",))},
+    )
+    assert step_generation_config(classify, policy).temperature == 0.3
+    overridden = step_generation_config(reply, policy)
+    assert overridden.to_gemini() == {"maxOutputTokens": 4000, "temperature": 0.3, "stopSequences": ["END"]}
+
+
+def test_prefilter_budget_scales_with_scope_within_bounds() -> None:
+    assert prefilter_generation_config("").max_output_tokens == 64
+    assert prefilter_generation_config("x" * 4000).max_output_tokens == 1024
+    assert prefilter_generation_config("x" * 10**6).max_output_tokens == 8192
+
+
+def test_executor_exposes_configs_to_model_calls() -> None:
+    seen = []
+
+    def call_model(prompt: str, response_schema: dict) -> str:
+        seen.append(("step", current_generation_config()))
+        if "urgent" in response_schema["properties"].get("vars", {}).get("properties", {}):
+            return json.dumps({"error": 0, "out": "", "vars": {"urgent": True}})
+        return json.dumps({"error": 0, "out": "ok", "vars": {"summary": "s"}})
+
+    def cheap_model_call(prompt: str) -> str:
+        seen.append(("prefilter", current_generation_config()))
+        return "q1"
+
+    program = parse_program(_PROGRAM, predeclared_vars=["notes"])
+    _, logs, _ = execute_program(
+        program,
+        {"notes": "n" * 800},
+        call_model=call_model,
+        cheap_model_call=cheap_model_call,
+        prefetch_prefilters=True,
+        cancel_token=CancelToken(),
+        generation=GenerationPolicy(),
+    )
+    # The prefilter runs speculatively on a prefetch thread and still gets its config.
+    assert [config for kind, config in seen if kind == "step"] == [
+        step_generation_config(step) for step in program.items
+    ]
+    assert [config for kind, config in seen if kind == "prefilter"] == [
+        prefilter_generation_config("n" * 800)
+    ]
+    assert logs[0]["generation_config"] == step_generation_config(program.items[0]).to_dict()
+    assert logs[0]["generation_config"]["temperature"] == 0.0
+    assert current_generation_config() is None
+
+    _, logs, _ = execute_program(program, {"notes": "n"}, call_model=call_model)
+    assert "generation_config" not in logs[0]
+
+
+def test_truncated_reply_is_retried_with_a_wider_budget() -> None:
+    budgets = []
+    replies = [
+        ModelReply('{"error": 0, "out": "', {"finish_reason": "MAX_TOKENS"}),
+        json.dumps({"error": 0, "out": "done"}),
+    ]
+
+    def call_model(prompt: str, response_schema: dict):
+        budgets.append(current_generation_config().max_output_tokens)
+        return replies.pop(0)
+
+    _, logs, _ = execute_program(
+        parse_program("Answer\n/OUT answer"),
+        {},
+        call_model=call_model,
+        recovery=RecoveryPolicy(),
+        generation=GenerationPolicy(),
+    )
+    assert budgets[1] == budgets[0] * 2
+    assert logs[0]["generation_config"]["max_output_tokens"] == budgets[1]
+
+
+def test_gemini_client_returns_an_exhausted_budget_without_widening(monkeypatch) -> None:
+    payloads = []
+    exhausted = {
+        "candidates": [{"content": {"parts": []}, "finishReason": "MAX_TOKENS"}],
+        "usageMetadata": {"thoughtsTokenCount": 40, "totalTokenCount": 50},
+    }
+
+    def fake_urlopen(req, timeout=None):
+        payloads.append(json.loads(req.data.decode("utf-8")))
+        return FakeResp(json.dumps(exhausted).encode("utf-8"))
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_client_v02.urllib.request, "urlopen", fake_urlopen)
+    with use_generation_config(GenerationConfig(max_output_tokens=40, temperature=0.0)):
+        result = gemini_client_v02.call_gemini_detailed("hello")
+
+    # Widening is the executor's job: one request, the truncation reported.
+    assert [p["generationConfig"]["maxOutputTokens"] for p in payloads] == [40]
+    assert payloads[0]["generationConfig"]["temperature"] == 0.0
+    assert result.text == "" and result.finish_reason == "MAX_TOKENS"
+    assert result.retries == 0 and "budget_widenings" not in result.metadata()
+    assert result.usage == {"thoughts_tokens": 40, "total_tokens": 50}
+
+
+def test_exhausted_gemini_budget_is_widened_once_per_executor_retry(monkeypatch) -> None:
+    budgets = []
+    replies = [
+        {"candidates": [{"content": {"parts": []}, "finishReason": "MAX_TOKENS"}]},
+        {"candidates": [{"content": {"parts": [{"text": '{"error": 0, "out": "ok"}'}]}, "finishReason": "STOP"}]},
+    ]
+
+    def fake_urlopen(req, timeout=None):
+        budgets.append(json.loads(req.data.decode("utf-8"))["generationConfig"]["maxOutputTokens"])
+        return FakeResp(json.dumps(replies.pop(0)).encode("utf-8"))
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_client_v02.urllib.request, "urlopen", fake_urlopen)
+
+    def call_model(prompt, schema):
+        result = gemini_client_v02.call_gemini_detailed(prompt, response_schema=schema)
+        return ModelReply(text=result.text, metadata=result.metadata())
+
+    _, logs, outputs = execute_program(
+        parse_program("Answer\n/OUT answer"),
+        {},
+        call_model=call_model,
+        recovery=RecoveryPolicy(),
+        generation=GenerationPolicy(),
+    )
+    assert outputs == ["ok"]
+    assert budgets[1] == budgets[0] * 2 and len(budgets) == 2
+    assert len(logs[0]["recovery"]["retries"]) == 1
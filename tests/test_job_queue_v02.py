@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from chatdsl_core.job_queue_v02 import JobQueue, run_worker, run_worker_processes
+from chatdsl_core.recovery_v02 import RecoveryPolicy
+
+
+_PROGRAM = "Make x\n/DEF x /TYPE int\n/THEN Report\n/OUT report"
+
+
+def test_lease_complete_and_expired_lease_reclaim(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "runs.db")
+    job_id = queue.enqueue(_PROGRAM, {"seed": 1}, max_attempts=2)
+
+    first = queue.lease("worker-a", lease_s=0.05)
+    assert first is not None and first.job_id == job_id and first.attempts == 1
+    assert first.payload["context"] == {"seed": 1}
+    assert queue.lease("worker-b", lease_s=0.05) is None
+
+    time.sleep(0.1)
+    second = queue.lease("worker-b", lease_s=10)
+    assert second is not None and second.attempts == 2 and second.lease_owner == "worker-b"
+    # The first worker lost its lease; its late result is discarded.
+    assert not queue.renew(job_id, "worker-a")
+    assert not queue.complete(job_id, "worker-a", {"ok": True})
+    assert queue.complete(job_id, "worker-b", {"ok": True})
+    assert queue.get(job_id).status == "done" and queue.get(job_id).result == {"ok": True}
+
+
+def test_failures_retry_until_attempts_run_out(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "runs.db")
+    job_id = queue.enqueue(_PROGRAM, max_attempts=2)
+    queue.lease("worker-a")
+    assert queue.fail(job_id, "worker-a", "model unavailable")
+    assert queue.get(job_id).status == "queued"
+    queue.lease("worker-a")
+    queue.fail(job_id, "worker-a", "model unavailable")
+    job = queue.get(job_id)
+    assert job.status == "failed" and job.error == "model unavailable" and job.attempts == 2
+
+    expired = queue.enqueue(_PROGRAM, max_attempts=1)
+    queue.lease("worker-a", lease_s=0.01)
+    time.sleep(0.05)
+    assert queue.lease("worker-b") is None
+    assert queue.get(expired).status == "failed"
+
+
+def test_worker_executes_jobs_and_retries_model_errors(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "runs.db")
+    calls = []
+
+    def call_model(prompt: str, response_schema: dict) -> str:
+        calls.append(prompt)
+        if len(calls) == 1:
+            raise RuntimeError("503 from model")
+        return json.dumps({"error": 0, "out": "done", "vars": {"x": 3}})
+
+    ok_id = queue.enqueue(_PROGRAM)
+    parse_error_id = queue.enqueue("Use @missing\n/FROM @missing")
+    handled = run_worker(queue, call_model=call_model, worker_id="w1", exit_when_idle=True)
+
+    assert handled == 3
+    ok_job = queue.get(ok_id)
+    assert ok_job.status == "done" and ok_job.attempts == 2
+    assert ok_job.result["ok"] is True and ok_job.result["vars_after"] == {"x": 3}
+    # Parse errors are final results, not retried.
+    bad_job = queue.get(parse_error_id)
+    assert bad_job.status == "done" and bad_job.attempts == 1
+    assert bad_job.result["error"].startswith("Parse error")
+    assert queue.counts() == {"queued": 0, "running": 0, "done": 2, "failed": 0}
+    assert [(w["worker_id"], w["jobs_done"]) for w in queue.workers(alive_within_s=60)] == [("w1", 2)]
+
+
+def test_worker_renews_lease_during_long_runs(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "runs.db")
+    job_id = queue.enqueue(_PROGRAM)
+
+    def slow_model(prompt: str, response_schema: dict) -> str:
+        time.sleep(0.5)
+        return json.dumps({"error": 0, "out": "done", "vars": {"x": 1}})
+
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=run_worker,
+        args=(queue,),
+        kwargs={"call_model": slow_model, "worker_id": "w1", "lease_s": 0.2, "max_jobs": 1, "stop": stop},
+    )
+    worker.start()
+    time.sleep(0.35)
+    # Past the original lease, but renewed, so nobody else can take it.
+    assert queue.lease("w2") is None
+    worker.join(5)
+    assert queue.get(job_id).status == "done" and queue.get(job_id).attempts == 1
+
+
+def test_worker_stops_a_run_whose_lease_was_taken(tmp_path: Path) -> None:
+    path = tmp_path / "runs.db"
+    queue = JobQueue(path)
+    job_id = queue.enqueue(_PROGRAM)
+    calls = []
+
+    def model(prompt: str, response_schema: dict) -> str:
+        calls.append(prompt)
+        # Another worker re-leases the job while this call is in flight.
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE jobs SET lease_owner = 'w2' WHERE job_id = ?", (job_id,))
+        time.sleep(1.0)
+        return json.dumps({"error": 0, "out": "", "vars": {"x": 1}})
+
+    started = time.monotonic()
+    assert run_worker(queue, call_model=model, worker_id="w1", lease_s=0.15, max_jobs=1) == 1
+
+    assert time.monotonic() - started < 0.9 and len(calls) == 1
+    job = queue.get(job_id)
+    assert job.status == "running" and job.lease_owner == "w2" and job.error is None
+
+
+def test_worker_applies_the_recovery_policy(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "runs.db")
+    job_id = queue.enqueue("Make x\n/DEF x /TYPE int")
+
+    def fenced(prompt: str, response_schema: dict) -> str:
+        return '```json\n{"error": 0, "out": "", "vars": {"x": "7"}}\n```'
+
+    run_worker(queue, call_model=fenced, exit_when_idle=True, recovery=RecoveryPolicy(max_retries=0))
+
+    assert queue.get(job_id).result["vars_after"] == {"x": 7}
+
+
+def test_worker_processes_share_the_queue(tmp_path: Path) -> None:
+    path = tmp_path / "runs.db"
+    queue = JobQueue(path)
+    # Stub responses define string vars.
+    stub_program = _PROGRAM.replace("/TYPE int", "/TYPE str")
+    job_ids = [queue.enqueue(stub_program) for _ in range(6)]
+    run_worker_processes(path, processes=2, stub=True, poll_s=0.05, exit_when_idle=True)
+    assert all(queue.get(job_id).status == "done" for job_id in job_ids)
+    assert sum(w["jobs_done"] for w in queue.workers()) == 6
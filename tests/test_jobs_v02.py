@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+from chatdsl_core.executor_v02 import execute_program
+from chatdsl_core.jobs_v02 import JobManager
+from chatdsl_core.parser_v02 import parse_program
+
+
+def _wait_finished(manager: JobManager, job_id: str, timeout_s: float = 5.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job is not None and job.finished:
+            return job
+        time.sleep(0.005)
+    raise AssertionError(f"{job_id} did not finish")
+
+
+def test_job_reports_partial_outputs_and_is_claimed_once() -> None:
+    gate = threading.Event()
+    calls = []
+
+    def call_model(prompt: str, response_schema: dict) -> str:
+        calls.append(prompt)
+        if len(calls) == 2:
+            gate.wait(5)
+        return json.dumps({"error": 0, "out": f"out {len(calls)}"})
+
+    program = parse_program("First\n/OUT one\n/THEN Second\n/OUT two")
+    manager = JobManager(workers=2)
+    try:
+        job_id = manager.submit(
+            "chat-1",
+            lambda progress: execute_program(program, {}, call_model=call_model, observers=[progress]),
+            payload={"input": "First"},
+        )
+        deadline = time.monotonic() + 5
+        while manager.get(job_id).steps_done < 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        running = manager.get(job_id)
+        assert running.status == "running"
+        assert running.partial_outputs == ["out 1"]
+        assert manager.claim(job_id) is None
+
+        gate.set()
+        _wait_finished(manager, job_id)
+        job = manager.claim(job_id)
+        assert job is not None and job.status == "done" and job.payload == {"input": "First"}
+        assert job.result[2] == ["out 1", "out 2"] and job.partial_outputs == ["out 1", "out 2"]
+        assert manager.claim(job_id) is None and manager.get(job_id) is None
+    finally:
+        manager.shutdown()
+
+
+def test_failed_job_keeps_error() -> None:
+    def work(progress):
+        raise RuntimeError("model unavailable")
+
+    manager = JobManager(workers=1)
+    try:
+        job = _wait_finished(manager, manager.submit("chat-1", work))
+        assert job.status == "failed" and job.error == "model unavailable" and job.result is None
+    finally:
+        manager.shutdown()
+
+
+def test_jobs_for_different_chats_run_concurrently() -> None:
+    barrier = threading.Barrier(2, timeout=5)
+
+    def work(progress):
+        barrier.wait()
+        return "ok"
+
+    manager = JobManager(workers=2)
+    try:
+        first = manager.submit("chat-1", work)
+        second = manager.submit("chat-2", work)
+        assert _wait_finished(manager, first).status == "done"
+        assert _wait_finished(manager, second).status == "done"
+        assert [job.job_id for job in manager.jobs_for_chat("chat-2")] == [second]
+    finally:
+        manager.shutdown()
+
+
+def test_only_the_owner_collects_a_job_and_other_ids_are_sorted_out() -> None:
+    manager = JobManager(workers=1)
+    try:
+        job_id = manager.submit("chat-1", lambda progress: "ok", owner="session-a")
+        _wait_finished(manager, job_id)
+
+        other = manager.collect([job_id], owner="session-b")
+        assert (other.claimed, other.claimed_elsewhere, other.lost) == ([], [], [])
+        assert manager.claim(job_id) is None
+
+        handoff = manager.collect([job_id, "job-from-a-previous-process"], owner="session-a")
+        assert [job.result for job in handoff.claimed] == ["ok"]
+        assert handoff.lost == ["job-from-a-previous-process"]
+
+        # The other session sees the id it loaded with the chat as claimed, not lost to a restart.
+        later = manager.collect([job_id], owner="session-b")
+        assert (later.claimed, later.claimed_elsewhere, later.lost) == ([], [job_id], [])
+    finally:
+        manager.shutdown()
+
+
+def test_unclaimed_finished_jobs_expire_and_tombstones_stay_bounded() -> None:
+    manager = JobManager(workers=1, finished_ttl_s=0.05, max_tombstones=2)
+    try:
+        abandoned = manager.submit("chat-1", lambda progress: "ok", owner="gone-session")
+        _wait_finished(manager, abandoned)
+        time.sleep(0.1)
+
+        handoff = manager.collect([abandoned], owner="gone-session")
+        assert (handoff.claimed, handoff.expired, handoff.lost) == ([], [abandoned], [])
+        assert manager.get(abandoned) is None
+
+        claimed = []
+        for _ in range(2):
+            job_id = manager.submit("chat-1", lambda progress: "ok")
+            _wait_finished(manager, job_id)
+            assert manager.claim(job_id) is not None
+            claimed.append(job_id)
+
+        # Only the newest tombstones are kept; the oldest id now reads as lost.
+        handoff = manager.collect([abandoned, *claimed])
+        assert handoff.claimed_elsewhere == claimed
+        assert (handoff.expired, handoff.lost) == ([], [abandoned])
+    finally:
+        manager.shutdown()
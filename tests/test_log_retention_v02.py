@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from chatdsl_core import blob_store_v02
+from chatdsl_core.log_retention_v02 import (
+    compact_execution_logs,
+    compact_step_log,
+    load_log_text,
+    resolve_log_retention,
+)
+
+
+def _step_log(prompt: str, raw: str) -> dict:
+    return {
+        "node_kind": "step",
+        "node_path": [0],
+        "prompt": prompt,
+        "raw_response": raw,
+        "parsed_json": {"error": 0, "out": "ok"},
+    }
+
+
+def test_resolve_log_retention_prefers_chat_then_global_then_default() -> None:
+    assert resolve_log_retention({"log_retention": "hashes"}, {"log_retention": "truncated"}) == "truncated"
+    assert resolve_log_retention({"log_retention": "hashes"}, {"log_retention": "bogus"}) == "hashes"
+    assert resolve_log_retention({}, {}) == "full"
+    assert resolve_log_retention(None) == "full"
+
+
+def test_full_retention_moves_text_to_blob_store(tmp_path: Path) -> None:
+    blob_store_v02._BLOBS_DIR = tmp_path / "blobs"
+    prompt = "Instruction:\n" + "x" * 2000
+    log = _step_log(prompt, '{"error":0,"out":"ok"}')
+
+    compacted = compact_step_log(log, "full")
+
+    assert "prompt" not in compacted
+    assert compacted["prompt_ref"]["stored"] is True
+    assert compacted["prompt_ref"]["chars"] == len(prompt)
+    assert len(compacted["prompt_preview"]) < len(prompt)
+    assert load_log_text(compacted, "prompt") == prompt
+    assert load_log_text(compacted, "raw_response") == '{"error":0,"out":"ok"}'
+    assert log["prompt"] == prompt
+
+
+def test_truncated_and_hashes_retention_do_not_write_blobs(tmp_path: Path) -> None:
+    blob_store_v02._BLOBS_DIR = tmp_path / "blobs"
+    log = _step_log("p" * 1000, "r")
+
+    truncated = compact_step_log(log, "truncated")
+    hashed = compact_step_log(log, "hashes")
+
+    assert truncated["prompt_preview"].startswith("ppp")
+    assert truncated["prompt_ref"]["stored"] is False
+    assert "prompt_preview" not in hashed
+    assert hashed["prompt_ref"]["digest"] == truncated["prompt_ref"]["digest"]
+    assert load_log_text(hashed, "prompt") is None
+    assert blob_store_v02.blob_store_stats()["count"] == 0
+
+
+def test_compact_execution_logs_leaves_if_logs_untouched(tmp_path: Path) -> None:
+    blob_store_v02._BLOBS_DIR = tmp_path / "blobs"
+    if_log = {"node_kind": "if", "node_path": [1], "execution": "skipped"}
+
+    out = compact_execution_logs([_step_log("p", "r"), if_log], "hashes")
+
+    assert out[1] is if_log
+    assert "prompt_ref" in out[0]
+
+
+def test_rejected_retry_replies_follow_the_retention_level(tmp_path: Path) -> None:
+    blob_store_v02._BLOBS_DIR = tmp_path / "blobs"
+    log = _step_log("p", "r")
+    log["recovery"] = {"repairs": [], "retries": [{"error": "bad", "raw_response": "not json"}]}
+
+    full = compact_step_log(log, "full")["recovery"]["retries"][0]
+    hashed = compact_step_log(log, "hashes")["recovery"]["retries"][0]
+
+    assert load_log_text(full, "raw_response") == "not json" and full["error"] == "bad"
+    assert "raw_response" not in hashed and "raw_response_preview" not in hashed
+    assert log["recovery"]["retries"][0]["raw_response"] == "not json"
+
+
+def test_compact_step_log_rejects_unknown_level() -> None:
+    with pytest.raises(ValueError, match="unknown log retention level"):
+        compact_step_log(_step_log("p", "r"), "everything")
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import urllib.request
+
+import pytest
+
+from chatdsl_core.executor_v02 import ModelReply, execute_program
+from chatdsl_core.metrics_v02 import (
+    MetricsObserver,
+    MetricsRegistry,
+    RuntimeMetrics,
+    serve_metrics,
+    write_metrics_file,
+)
+from chatdsl_core.parser_v02 import parse_program
+
+
+def test_counter_and_histogram_render_prometheus_text() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("demo_total", "Demo counter.", ["status"])
+    histogram = registry.histogram("demo_seconds", "Demo latency.", buckets=(0.1, 1.0))
+    counter.inc(status="ok")
+    counter.inc(2, status="ok")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5.0)
+
+    text = registry.render()
+
+    assert "# TYPE demo_total counter" in text
+    assert 'demo_total{status="ok"} 3' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in text
+    assert "demo_seconds_count 3" in text
+    assert "demo_seconds_sum 5.55" in text
+
+
+def test_registry_rejects_wrong_labels_and_conflicting_shapes() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("demo_total", "Demo.", ["status"])
+
+    assert registry.counter("demo_total", "Demo.", ["status"]) is counter
+    with pytest.raises(ValueError):
+        counter.inc(model="x")
+    with pytest.raises(ValueError):
+        registry.histogram("demo_total", "Demo.")
+
+
+def test_metrics_observer_counts_runs_steps_prefilters_and_model_calls() -> None:
+    metrics = RuntimeMetrics(MetricsRegistry())
+    program = parse_program(
+        "Summarize\n/FROM key tasks /IN @notes\n/OUT done",
+        predeclared_vars=["notes"],
+    )
+
+    def main(prompt: str, _: dict) -> ModelReply:
+        return ModelReply(
+            text=json.dumps({"error": 0, "out": "ok"}),
+            metadata={
+                "model": "main-model",
+                "latency_s": 0.2,
+                "retries": 2,
+                "usage": {"prompt_tokens": 10, "candidates_tokens": 3, "cached_tokens": 4},
+            },
+        )
+
+    execute_program(
+        program,
+        {"notes": "A"},
+        call_model=main,
+        cheap_model_call=lambda _p: ModelReply(text="T", metadata={"model": "cheap"}),
+        observers=[MetricsObserver(metrics)],
+    )
+    metrics.record_run_timings({"parse_s": 0.01, "persist_s": 0.02})
+
+    assert metrics.runs.value(status="ok") == 1
+    assert metrics.steps.value(status="ok") == 1
+    assert metrics.prefilters.value(speculative="false") == 1
+    assert metrics.model_calls.value(kind="step", model="main-model", status="ok") == 1
+    assert metrics.model_calls.value(kind="prefilter", model="cheap", status="ok") == 1
+    assert metrics.model_retries.value(model="main-model") == 2
+    assert metrics.tokens.value(model="main-model", type="prompt") == 10
+    assert metrics.tokens.value(model="main-model", type="cached") == 4
+    assert metrics.cache_hits.value(cache="model_context") == 1
+    assert metrics.parse_seconds.count() == 1
+    assert metrics.save_seconds.count() == 1
+
+
+def test_metrics_observer_records_failed_model_calls() -> None:
+    metrics = RuntimeMetrics(MetricsRegistry())
+    program = parse_program("Hello\n/OUT hi")
+
+    def failing(prompt: str, _: dict) -> str:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        execute_program(program, {}, call_model=failing, observers=[MetricsObserver(metrics)])
+
+    assert metrics.runs.value(status="error") == 1
+    assert metrics.steps.value(status="error") == 1
+    assert metrics.model_calls.value(kind="step", model="unknown", status="error") == 1
+
+
+def test_metrics_observer_records_failed_prefilter_calls() -> None:
+    metrics = RuntimeMetrics(MetricsRegistry())
+    program = parse_program("Summarise\n/FROM the decisions /IN @notes\n/OUT summary", predeclared_vars=["notes"])
+
+    def failing_cheap(prompt: str) -> str:
+        raise RuntimeError("cheap model down")
+
+    with pytest.raises(RuntimeError):
+        execute_program(
+            program,
+            {"notes": "n"},
+            call_model=lambda prompt, schema: "{}",
+            cheap_model_call=failing_cheap,
+            observers=[MetricsObserver(metrics)],
+        )
+
+    assert metrics.model_calls.value(kind="prefilter", model="unknown", status="error") == 1
+    assert metrics.model_calls.value(kind="step", model="unknown", status="error") == 0
+    assert metrics.steps.value(status="error") == 1
+
+
+def test_metrics_can_be_written_to_file_and_served(tmp_path) -> None:
+    registry = MetricsRegistry()
+    registry.counter("demo_total", "Demo.").inc()
+    target = tmp_path / "metrics" / "chatdsl.prom"
+
+    write_metrics_file(target, registry)
+    server = serve_metrics(0, registry=registry)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+            served = resp.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert target.read_text(encoding="utf-8") == served
+    assert "demo_total 1" in served
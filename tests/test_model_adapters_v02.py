@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from chatdsl_core import model_adapters_v02
+from chatdsl_core.executor_v02 import ModelReply
+from chatdsl_core.gemini_client_v02 import GeminiResult
 
 def test_make_gemini_caller_forwards_model_and_timeout(monkeypatch) -> None:
     captured: dict = {}
@@ -12,18 +14,20 @@ def test_make_gemini_caller_forwards_model_and_timeout(monkeypatch) -> None:
 
     def fake_call_gemini(
         prompt: str, model: str, timeout_s: float, response_schema: dict
-    ) -> str:
+    ) -> GeminiResult:
         captured["prompt"] = prompt
         captured["model"] = model
         captured["timeout_s"] = timeout_s
         captured["response_schema"] = response_schema
-        return '{"error":0,"out":"ok"}'
+        return GeminiResult(text='{"error":0,"out":"ok"}', model=model)
 
-    monkeypatch.setattr(model_adapters_v02, "call_gemini", fake_call_gemini)
+    monkeypatch.setattr(model_adapters_v02, "call_gemini_detailed", fake_call_gemini)
     caller = model_adapters_v02.make_gemini_caller("gemini-2.5-flash", timeout_s=42)
 
     out = caller("hello", schema)
-    assert out == '{"error":0,"out":"ok"}'
+    assert isinstance(out, ModelReply)
+    assert out.text == '{"error":0,"out":"ok"}'
+    assert out.metadata["model"] == "gemini-2.5-flash"
     assert captured == {
         "prompt": "hello",
         "model": "gemini-2.5-flash",
@@ -39,18 +43,19 @@ def test_make_gemini_cheap_caller_omits_response_schema(monkeypatch) -> None:
         model: str,
         timeout_s: float,
         response_schema: dict | None = None,
-    ) -> str:
+    ) -> GeminiResult:
         captured["prompt"] = prompt
         captured["model"] = model
         captured["timeout_s"] = timeout_s
         captured["response_schema"] = response_schema
-        return "filtered text"
+        return GeminiResult(text="filtered text", model=model, usage={"total_tokens": 9})
 
-    monkeypatch.setattr(model_adapters_v02, "call_gemini", fake_call_gemini)
+    monkeypatch.setattr(model_adapters_v02, "call_gemini_detailed", fake_call_gemini)
     caller = model_adapters_v02.make_gemini_cheap_caller("gemini-3-flash-preview", timeout_s=15)
 
     out = caller("extract goals")
-    assert out == "filtered text"
+    assert out.text == "filtered text"
+    assert out.metadata["usage"] == {"total_tokens": 9}
     assert captured == {
         "prompt": "extract goals",
         "model": "gemini-3-flash-preview",
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from chatdsl_core.executor_v02 import execute_program, execute_steps
+from chatdsl_core.observers_v02 import CompositeObserver, ExecutionObserver, combine_observers
+from chatdsl_core.parser_v02 import parse_dsl, parse_program
+from chatdsl_core.runtime_v02 import run_dsl_text
+
+
+class RecordingObserver(ExecutionObserver):
+    def __init__(self) -> None:
+        self.events: list[tuple] = []
+
+    def on_program_start(self, context):
+        self.events.append(("program_start",))
+
+    def on_program_end(self, logs, error):
+        self.events.append(("program_end", len(logs), type(error).__name__ if error else None))
+
+    def on_node_enter(self, node_kind, node_path):
+        self.events.append(("enter", node_kind, list(node_path)))
+
+    def on_node_exit(self, node_kind, node_path, log, error):
+        self.events.append(("exit", node_kind, list(node_path), log is not None, error is not None))
+
+    def on_prefilter_start(self, node_path, description, scope_var):
+        self.events.append(("prefilter_start", list(node_path), description, scope_var))
+
+    def on_prefilter_end(self, node_path, prefilter_log):
+        self.events.append(("prefilter_end", list(node_path), prefilter_log["filtered_text"]))
+
+    def on_model_call_start(self, node_path, prompt, response_schema):
+        self.events.append(("model_start", list(node_path)))
+
+    def on_model_call_end(self, node_path, raw_response, model_call):
+        self.events.append(("model_end", list(node_path)))
+
+    def on_commit(self, node_path, staged_updates):
+        self.events.append(("commit", list(node_path), dict(staged_updates)))
+
+
+def test_observer_receives_lifecycle_events_in_execution_order() -> None:
+    program = parse_program(
+        """Decide
+/DEF go /TYPE bool
+/IF @go
+/THEN Use notes
+/FROM key tasks /IN @notes
+/OUT done
+/END
+""",
+        predeclared_vars=["notes"],
+    )
+    responses = iter(
+        [
+            json.dumps({"error": 0, "out": "", "vars": {"go": True}}),
+            json.dumps({"error": 0, "out": "done"}),
+        ]
+    )
+    observer = RecordingObserver()
+
+    execute_program(
+        program,
+        {"notes": "A"},
+        call_model=lambda *_: next(responses),
+        cheap_model_call=lambda _p: "TASKS",
+        observers=[observer],
+    )
+
+    assert observer.events == [
+        ("program_start",),
+        ("enter", "step", [0]),
+        ("model_start", [0]),
+        ("model_end", [0]),
+        ("commit", [0], {"go": True}),
+        ("exit", "step", [0], True, False),
+        ("enter", "if", [1]),
+        ("enter", "step", [1, 0]),
+        ("prefilter_start", [1, 0], "key tasks", "notes"),
+        ("prefilter_end", [1, 0], "TASKS"),
+        ("model_start", [1, 0]),
+        ("model_end", [1, 0]),
+        ("commit", [1, 0], {}),
+        ("exit", "step", [1, 0], True, False),
+        ("exit", "if", [1], True, False),
+        ("program_end", 3, None),
+    ]
+
+
+def test_observer_sees_node_and_program_errors() -> None:
+    program = parse_program("Broken\n/OUT x")
+    observer = RecordingObserver()
+
+    with pytest.raises(ValueError):
+        execute_program(program, {}, call_model=lambda *_: "not json", observers=[observer])
+
+    assert observer.events[-2:] == [
+        ("exit", "step", [0], False, True),
+        ("program_end", 0, "ValueError"),
+    ]
+
+
+def test_execute_steps_and_run_dsl_text_accept_observers() -> None:
+    first = RecordingObserver()
+    second = RecordingObserver()
+    steps = parse_dsl("Hello\n/OUT hi")
+
+    execute_steps(steps, {}, observers=[first, second])
+    result = run_dsl_text("Hello\n/OUT hi", {}, observers=[first])
+
+    assert result.ok
+    assert second.events[0] == ("program_start",)
+    assert first.events.count(("program_start",)) == 2
+
+
+def test_combine_observers_collapses_registrations() -> None:
+    observer = ExecutionObserver()
+
+    assert combine_observers(None) is None
+    assert combine_observers([]) is None
+    assert combine_observers([observer]) is observer
+    assert isinstance(combine_observers([observer, observer]), CompositeObserver)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from chatdsl_core.executor_v02 import ModelReply, execute_program
+from chatdsl_core.parser_v02 import parse_program
+from chatdsl_core.recovery_v02 import RecoveryPolicy, coerce_def_value, extract_json_object
+from chatdsl_core.runtime_v02 import run_dsl_text
+from chatdsl_core.usage_v02 import summarize_log_usage
+
+
+_PROGRAM = "Count items\n/DEF n /TYPE int\n/DEF ok /TYPE bool\n/THEN Report @n\n/FROM @n\n/OUT report"
+
+
+def _scripted(replies, prompts):
+    def call_model(prompt: str, response_schema: dict):
+        prompts.append(prompt)
+        return replies.pop(0)
+
+    return call_model
+
+
+def test_extract_json_object_strips_fences_and_surrounding_text() -> None:
+    assert extract_json_object('```json\n{"out": "a"}\n```') == {"out": "a"}
+    assert extract_json_object('Sure! {"out": "}"} and {"x": 1}') == {"out": "}"}
+    assert extract_json_object("{broken {\"out\": 1}") == {"out": 1}
+    assert extract_json_object("no json here") is None
+
+
+@pytest.mark.parametrize(
+    "type_name, value, expected",
+    [
+        ("int", "42", (42, True)),
+        ("int", 3.0, (3, True)),
+        ("int", 3.5, (3.5, False)),
+        ("int", True, (True, False)),
+        ("float", "2.5", (2.5, True)),
+        ("float", "nan", ("nan", False)),
+        ("bool", "True", (True, True)),
+        ("bool", 1, (1, False)),
+        ("str", 7, ("7", True)),
+        ("str", None, (None, False)),
+    ],
+)
+def test_coerce_def_value_is_lossless_only(type_name, value, expected) -> None:
+    assert coerce_def_value(type_name, value) == expected
+
+
+def test_fenced_reply_with_string_values_is_repaired_without_retry() -> None:
+    prompts: list = []
+    replies = [
+        'Here you go:\n```json\n{"error": 0, "out": "", "vars": {"n": "3", "ok": "true"}}\n```',
+        json.dumps({"error": 0, "out": "three"}),
+    ]
+    ctx, logs, outputs = execute_program(
+        parse_program(_PROGRAM),
+        {},
+        call_model=_scripted(replies, prompts),
+        recovery=RecoveryPolicy(max_retries=0),
+    )
+    assert ctx == {"n": 3, "ok": True} and outputs == ["", "three"]
+    assert len(prompts) == 2
+    assert logs[0]["recovery"] == {"repairs": ["extracted_json", "coerced:n", "coerced:ok"], "retries": []}
+    assert "recovery" not in logs[1]
+
+
+def test_invalid_reply_retries_only_the_failing_step() -> None:
+    prompts: list = []
+    replies = [
+        ModelReply(json.dumps({"error": 0, "out": ""}), {"usage": {"total_tokens": 5}}),
+        ModelReply(
+            json.dumps({"error": 0, "out": "", "vars": {"n": 2, "ok": False}}),
+            {"usage": {"total_tokens": 7}},
+        ),
+        json.dumps({"error": 0, "out": "two"}),
+    ]
+    ctx, logs, outputs = execute_program(
+        parse_program(_PROGRAM), {}, call_model=_scripted(replies, prompts), recovery=RecoveryPolicy()
+    )
+    assert ctx == {"n": 2, "ok": False} and outputs == ["", "two"]
+    assert len(prompts) == 3
+    assert "Previous reply rejected:" in prompts[1] and "'vars'" in prompts[1]
+    assert prompts[1].startswith(prompts[0]) and "Previous reply rejected:" not in prompts[2]
+    retries = logs[0]["recovery"]["retries"]
+    assert len(retries) == 1 and "must include object key 'vars'" in retries[0]["error"]
+    assert retries[0]["raw_response"] == json.dumps({"error": 0, "out": ""})
+    # The rejected attempt still counts towards usage.
+    assert summarize_log_usage(logs)["total_tokens"] == 12
+
+
+def test_retries_are_bounded_and_error_replies_are_not_retried() -> None:
+    bad = json.dumps({"error": 0, "out": "", "vars": {"n": "many", "ok": True}})
+    prompts: list = []
+    with pytest.raises(ValueError, match="'n' expected int"):
+        execute_program(
+            parse_program(_PROGRAM),
+            {},
+            call_model=_scripted([bad, bad, bad], prompts),
+            recovery=RecoveryPolicy(max_retries=2),
+        )
+    assert len(prompts) == 3
+
+    prompts = []
+    result = run_dsl_text(
+        _PROGRAM,
+        {},
+        call_model=_scripted([json.dumps({"error": 1, "out": "cannot count"})], prompts),
+        recovery=RecoveryPolicy(),
+    )
+    assert not result.ok and "model returned error=1" in result.error
+    assert len(prompts) == 1
+
+
+def test_retry_entries_keep_a_truncated_rejected_reply() -> None:
+    long_reply = "x" * 5000
+    _, logs, _ = execute_program(
+        parse_program("Answer\n/OUT answer"),
+        {},
+        call_model=_scripted([long_reply, json.dumps({"error": 0, "out": "ok"})], []),
+        recovery=RecoveryPolicy(),
+    )
+    rejected = logs[0]["recovery"]["retries"][0]["raw_response"]
+    assert rejected.startswith("xxx") and len(rejected) == 2001 and rejected.endswith("…")
+
+
+def test_without_policy_malformed_replies_still_fail() -> None:
+    with pytest.raises(ValueError, match="not valid JSON"):
+        execute_program(
+            parse_program(_PROGRAM),
+            {},
+            call_model=_scripted(['```json\n{"error": 0, "out": ""}\n```'], []),
+        )
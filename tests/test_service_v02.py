@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from chatdsl_core.service_v02 import RunService, ServiceBusy, serve_runtime
+
+
+def _post(port: int, body: object) -> tuple:
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/v1/run",
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as resp:
+            return resp.status, json.loads(resp.read()), dict(resp.headers)
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read()), dict(exc.headers)
+
+
+@pytest.fixture
+def gate():
+    return threading.Event()
+
+
+def _gated_model(gate: threading.Event):
+    def call_model(prompt: str, response_schema: dict) -> str:
+        gate.wait(5)
+        return json.dumps({"error": 0, "out": "served", "vars": {"x": 4}})
+
+    return call_model
+
+
+def _serve(service: RunService):
+    server = serve_runtime(service, 0)
+    return server, server.server_address[1]
+
+
+def _stop(server, service: RunService) -> None:
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def test_run_endpoint_returns_structured_results(gate) -> None:
+    gate.set()
+    service = RunService(call_model=_gated_model(gate), workers=2)
+    server, port = _serve(service)
+    try:
+        status, body, _ = _post(port, {"text": "Make x\n/DEF x /TYPE int", "context": {}})
+        assert status == 200
+        assert body["ok"] is True and body["vars_after"] == {"x": 4} and body["outputs"] == ["served"]
+        assert set(body["timings"]) == {"parse_s", "execute_s", "total_s"}
+        assert set(body) == {"ok", "outputs", "logs", "vars_after", "parsed_steps", "error", "timings"}
+
+        status, body, _ = _post(port, {"text": "/OUT only output"})
+        assert status == 200 and body["ok"] is False and body["error"].startswith("Parse error")
+
+        status, body, _ = _post(port, {"text": "Make x", "context": []})
+        assert status == 400 and "context" in body["error"]
+
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        connection.putrequest("POST", "/v1/run")
+        connection.putheader("Content-Length", "lots")
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == 400 and json.loads(response.read()) == {"error": "invalid Content-Length"}
+        connection.close()
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=5) as resp:
+            health = json.loads(resp.read())
+        assert (health["ok"], health["workers"], health["capacity"]) == (True, 2, 18)
+    finally:
+        _stop(server, service)
+
+
+def test_full_service_answers_429_and_deadlines_answer_504(gate) -> None:
+    service = RunService(call_model=_gated_model(gate), workers=1, max_queue=0)
+    server, port = _serve(service)
+    try:
+        blocked = service.submit("Make x\n/DEF x /TYPE int", {})[0]
+
+        status, body, headers = _post(port, {"text": "Hello\n/OUT hi"})
+        assert status == 429 and headers["Retry-After"] == "1"
+
+        gate.set()
+        assert blocked.result(timeout=5).ok
+        gate.clear()
+        status, body, _ = _post(port, {"text": "Make x\n/DEF x /TYPE int", "deadline_s": 0.05})
+        assert status == 504 and body == {"error": "deadline exceeded"}
+    finally:
+        gate.set()
+        _stop(server, service)
+
+
+def test_runs_queued_past_their_deadline_are_not_started(gate) -> None:
+    calls = []
+
+    def call_model(prompt: str, response_schema: dict) -> str:
+        calls.append(prompt)
+        gate.wait(5)
+        return json.dumps({"error": 0, "out": "ok"})
+
+    service = RunService(call_model=call_model, workers=1, max_queue=1)
+    try:
+        running, _ = service.submit("First\n/OUT a", {})
+        queued, _ = service.submit("Second\n/OUT b", {}, deadline_s=0.01)
+        with pytest.raises(ServiceBusy):
+            service.submit("Third\n/OUT c", {})
+        threading.Event().wait(0.05)
+        gate.set()
+
+        assert running.result(timeout=5).ok
+        late = queued.result(timeout=5)
+        assert late.ok is False and "Deadline exceeded" in late.error
+        assert len(calls) == 1
+    finally:
+        gate.set()
+        service.shutdown()
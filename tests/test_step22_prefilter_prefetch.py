@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import threading
+
+from chatdsl_core.executor_v02 import _PrefilterPrefetcher, execute_program
+from chatdsl_core.parser_v02 import parse_program
+
+
+def test_next_step_prefilter_runs_during_current_model_call() -> None:
+    program = parse_program(
+        "Draft intro\n/OUT intro\n/THEN Use notes\n/FROM key tasks /IN @notes\n/OUT done",
+        predeclared_vars=["notes"],
+    )
+    prefilter_started = threading.Event()
+    overlapped: list[bool] = []
+
+    def fake_cheap(prompt: str) -> str:
+        prefilter_started.set()
+        return "TASKS"
+
+    def fake_main(prompt: str, _: dict) -> str:
+        if "Draft intro" in prompt:
+            overlapped.append(prefilter_started.wait(timeout=5))
+        return json.dumps({"error": 0, "out": "ok"})
+
+    _, logs, _ = execute_program(
+        program,
+        {"notes": "A\nB"},
+        call_model=fake_main,
+        cheap_model_call=fake_cheap,
+        prefetch_prefilters=True,
+    )
+
+    assert overlapped == [True]
+    prefilter_logs = [
+        {key: value for key, value in log.items() if key not in {"started_at_s", "duration_s", "model_call"}}
+        for log in logs[1]["prefilter_logs"]
+    ]
+    assert prefilter_logs == [
+        {
+            "description": "key tasks",
+            "scope_var": "notes",
+            "filtered_text": "TASKS",
+            "speculative": True,
+        }
+    ]
+
+
+def test_prefilter_is_not_speculated_when_current_step_writes_its_scope() -> None:
+    program = parse_program(
+        "Seed notes\n/DEF notes\n/THEN Use notes\n/FROM key tasks /IN @notes\n/OUT done"
+    )
+    cheap_prompts: list[str] = []
+    responses = iter(
+        [
+            json.dumps({"error": 0, "out": "ok1", "vars": {"notes": "fresh"}}),
+            json.dumps({"error": 0, "out": "ok2"}),
+        ]
+    )
+
+    def fake_cheap(prompt: str) -> str:
+        cheap_prompts.append(prompt)
+        return "filtered"
+
+    _, logs, _ = execute_program(
+        program,
+        {},
+        call_model=lambda *_: next(responses),
+        cheap_model_call=fake_cheap,
+        prefetch_prefilters=True,
+    )
+
+    assert len(cheap_prompts) == 1
+    assert "Scope (@notes):\nfresh" in cheap_prompts[0]
+    assert logs[1]["prefilter_logs"][0]["speculative"] is False
+
+
+def test_prefetch_is_invalidated_when_scope_value_changes() -> None:
+    program = parse_program(
+        "First\n/OUT one\n/THEN Second\n/FROM tasks /IN @notes\n/OUT two",
+        predeclared_vars=["notes"],
+    )
+    first, second = program.items
+    prefetcher = _PrefilterPrefetcher(lambda _: "stale", max_wasted=4)
+    context = {"notes": "old"}
+
+    prefetcher.start(first, second, context)
+    context["notes"] = "new"
+    result = prefetcher.take(second, 0, context)
+    prefetcher.close()
+
+    assert result is None
+    assert prefetcher.wasted == 1
+    assert prefetcher.hits == 0
+
+
+def test_prefetch_stops_after_wasted_cap() -> None:
+    program = parse_program(
+        "First\n/OUT one\n/THEN Second\n/FROM tasks /IN @notes\n/OUT two",
+        predeclared_vars=["notes"],
+    )
+    first, second = program.items
+    calls: list[str] = []
+    prefetcher = _PrefilterPrefetcher(lambda prompt: calls.append(prompt) or "x", max_wasted=0)
+
+    prefetcher.start(first, second, {"notes": "n"})
+    prefetcher.close()
+
+    assert calls == []
+    assert prefetcher.take(second, 0, {"notes": "n"}) is None
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+import time
+
+from chatdsl_core.executor_v02 import execute_program
+from chatdsl_core.parser_v02 import parse_program
+from chatdsl_core.runtime_v02 import run_dsl_text
+
+
+_STEP_PHASES = ("builtins_s", "prefilters_s", "prompt_s", "model_call_s", "validate_s", "commit_s")
+
+
+def test_step_log_records_per_phase_timings() -> None:
+    program = parse_program(
+        "Summarize\n/FROM key tasks /IN @notes\n/OUT done",
+        predeclared_vars=["notes"],
+    )
+
+    def slow_cheap(prompt: str) -> str:
+        time.sleep(0.02)
+        return "TASKS"
+
+    def slow_main(prompt: str, _: dict) -> str:
+        time.sleep(0.03)
+        return json.dumps({"error": 0, "out": "ok"})
+
+    _, logs, _ = execute_program(
+        program, {"notes": "A"}, call_model=slow_main, cheap_model_call=slow_cheap
+    )
+
+    timings = logs[0]["timings"]
+    assert all(timings[phase] >= 0 for phase in _STEP_PHASES)
+    assert timings["model_call_s"] >= 0.03
+    assert timings["prefilters_s"] >= 0.02
+    assert timings["total_s"] >= sum(timings[phase] for phase in _STEP_PHASES) - 1e-5
+    prefilter = logs[0]["prefilter_logs"][0]
+    assert prefilter["duration_s"] >= 0.02
+    assert prefilter["started_at_s"] >= timings["started_at_s"]
+
+
+def test_step_and_if_start_offsets_follow_execution_order() -> None:
+    program = parse_program(
+        """Decide
+/DEF go /TYPE bool
+/IF @go
+/THEN Inner
+/OUT inner
+/END
+/THEN Last
+/OUT last
+"""
+    )
+    responses = iter(
+        [
+            json.dumps({"error": 0, "out": "", "vars": {"go": True}}),
+            json.dumps({"error": 0, "out": "inner"}),
+            json.dumps({"error": 0, "out": "last"}),
+        ]
+    )
+
+    _, logs, _ = execute_program(program, {}, call_model=lambda _p, _s: next(responses))
+
+    starts = [log["timings"]["started_at_s"] for log in logs]
+    assert starts == sorted(starts)
+    if_log = next(log for log in logs if log["node_kind"] == "if")
+    inner_log = next(log for log in logs if log["node_path"] == [1, 0])
+    assert if_log["timings"]["total_s"] >= inner_log["timings"]["total_s"]
+
+
+def test_run_dsl_text_reports_parse_and_execute_timings() -> None:
+    result = run_dsl_text("Hello\n/OUT hi", {})
+
+    assert result.ok
+    assert set(result.timings) == {"parse_s", "execute_s", "total_s"}
+    assert result.timings["total_s"] >= result.timings["parse_s"] + result.timings["execute_s"] - 1e-5
+
+
+def test_run_dsl_text_reports_parse_timing_on_parse_error() -> None:
+    result = run_dsl_text("Hello\n/BOGUS", {})
+
+    assert not result.ok
+    assert set(result.timings) == {"parse_s", "total_s"}
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from chatdsl_core.cancellation_v02 import CancelToken, RunCancelled
+from chatdsl_core.observers_v02 import ExecutionObserver
+from chatdsl_core.parser_v02 import parse_program
+from chatdsl_core.recovery_v02 import RecoveryPolicy
+from chatdsl_core.streaming_v02 import astream_program, stream_program
+
+
+_PROGRAM = """Decide
+/DEF go /TYPE bool
+/IF @go
+/THEN Use notes
+/FROM key tasks /IN @notes
+/OUT done
+/END
+"""
+
+
+def _model(responses):
+    it = iter(responses)
+
+    def call_model(prompt: str, response_schema: dict) -> str:
+        return next(it)
+
+    return call_model
+
+
+def _responses():
+    return [
+        json.dumps({"error": 0, "out": "decided", "vars": {"go": True}}),
+        json.dumps({"error": 0, "out": "done"}),
+    ]
+
+
+def test_stream_program_yields_events_in_execution_order() -> None:
+    program = parse_program(_PROGRAM, predeclared_vars=["notes"])
+    events = list(
+        stream_program(
+            program,
+            {"notes": "buy milk"},
+            call_model=_model(_responses()),
+            cheap_model_call=lambda prompt: "milk",
+        )
+    )
+    assert [(event.kind, event.node_path) for event in events] == [
+        ("vars_committed", [0]),
+        ("step_done", [0]),
+        ("condition", [1]),
+        ("prefilter_done", [1, 0]),
+        ("vars_committed", [1, 0]),
+        ("step_done", [1, 0]),
+        ("program_end", []),
+    ]
+    assert events[0].data["updates"] == {"go": True}
+    assert events[1].data["output"] == "decided"
+    assert events[2].data == {"condition_var": "go", "value": True}
+    assert events[3].data["prefilter_log"]["filtered_text"] == "milk"
+    end = events[-1].data
+    assert end["outputs"] == ["decided", "done"] and end["context"]["go"] is True
+
+
+def test_stream_program_delivers_events_before_the_run_finishes() -> None:
+    program = parse_program("First\n/OUT one\n/THEN Second\n/OUT two")
+    gate = threading.Event()
+    calls = []
+
+    def call_model(prompt: str, response_schema: dict) -> str:
+        calls.append(prompt)
+        if len(calls) == 2:
+            assert gate.wait(5)
+        return json.dumps({"error": 0, "out": f"out {len(calls)}"})
+
+    stream = stream_program(program, {}, call_model=call_model)
+    first = next(stream)
+    assert first.kind == "vars_committed" and next(stream).data["output"] == "out 1"
+    gate.set()
+    assert [event.kind for event in stream] == ["vars_committed", "step_done", "program_end"]
+
+
+def test_stream_program_raises_execution_errors_after_prior_events() -> None:
+    program = parse_program("Make x\n/DEF x /TYPE int\n/THEN Make y\n/DEF y /TYPE int")
+    stream = stream_program(
+        program,
+        {},
+        call_model=_model(
+            [
+                json.dumps({"error": 0, "out": "", "vars": {"x": 1}}),
+                json.dumps({"error": 0, "out": "", "vars": {"y": "nope"}}),
+            ]
+        ),
+    )
+    assert [next(stream).kind, next(stream).kind] == ["vars_committed", "step_done"]
+    with pytest.raises(ValueError, match="expected int"):
+        next(stream)
+
+
+def test_stream_program_forwards_run_options() -> None:
+    program = parse_program("Make x\n/DEF x /TYPE int")
+    fenced = '```json\n{"error": 0, "out": "", "vars": {"x": "2"}}\n```'
+    events = list(stream_program(program, {}, call_model=_model([fenced]), recovery=RecoveryPolicy()))
+    assert events[-1].data["context"] == {"x": 2}
+
+    cancelled = CancelToken()
+    cancelled.cancel("stopped by caller")
+    with pytest.raises(RunCancelled, match="stopped by caller"):
+        list(stream_program(program, {}, call_model=_model([fenced]), cancel_token=cancelled))
+
+
+def test_closing_the_stream_stops_the_run() -> None:
+    program = parse_program("First\n/OUT one\n/THEN Second\n/OUT two\n/THEN Third\n/OUT three")
+    calls = []
+    ended = threading.Event()
+    errors = []
+
+    class EndObserver(ExecutionObserver):
+        def on_program_end(self, logs, error) -> None:
+            errors.append(error)
+            ended.set()
+
+    def call_model(prompt: str, response_schema: dict) -> str:
+        calls.append(prompt)
+        if len(calls) == 2:
+            threading.Event().wait(5)  # still in flight when the consumer leaves
+        return json.dumps({"error": 0, "out": f"out {len(calls)}"})
+
+    shared = CancelToken()
+    stream = stream_program(program, {}, call_model=call_model, observers=[EndObserver()], cancel_token=shared)
+    assert next(stream).kind == "vars_committed"
+    stream.close()
+
+    assert ended.wait(2)
+    assert isinstance(errors[0], RunCancelled) and len(calls) <= 2
+    # The caller's token is left alone.
+    assert not shared.cancelled
+
+
+def test_astream_program_matches_sync_stream() -> None:
+    program = parse_program(_PROGRAM, predeclared_vars=["notes"])
+
+    async def collect():
+        return [
+            event.kind
+            async for event in astream_program(
+                program,
+                {"notes": "buy milk"},
+                call_model=_model(_responses()),
+                cheap_model_call=lambda prompt: "milk",
+            )
+        ]
+
+    assert asyncio.run(collect()) == [
+        "vars_committed",
+        "step_done",
+        "condition",
+        "prefilter_done",
+        "vars_committed",
+        "step_done",
+        "program_end",
+    ]
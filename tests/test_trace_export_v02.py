@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+import threading
+
+from chatdsl_core.executor_v02 import execute_program
+from chatdsl_core.parser_v02 import parse_program
+from chatdsl_core.trace_export_v02 import build_chrome_trace, chrome_trace_json
+
+
+def _complete_events(trace: dict) -> list[dict]:
+    return [event for event in trace["traceEvents"] if event["ph"] == "X"]
+
+
+def test_trace_nests_steps_inside_if_blocks() -> None:
+    program = parse_program(
+        """Decide
+/DEF go /TYPE bool
+/IF @go
+/THEN Inner
+/OUT inner
+/END
+"""
+    )
+    responses = iter(
+        [
+            json.dumps({"error": 0, "out": "", "vars": {"go": True}}),
+            json.dumps({"error": 0, "out": "inner"}),
+        ]
+    )
+    _, logs, _ = execute_program(program, {}, call_model=lambda *_: next(responses))
+
+    trace = build_chrome_trace(logs, run_timings={"parse_s": 0.001})
+    events = _complete_events(trace)
+    if_event = next(event for event in events if event["cat"] == "if")
+    inner = next(event for event in events if event["cat"] == "step" and event["args"]["depth"] == 1)
+
+    assert if_event["name"] == "if go (entered)"
+    assert if_event["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= if_event["ts"] + if_event["dur"] + 1
+    assert {event["name"] for event in events if event["cat"] == "phase"} >= {"model_call", "commit"}
+    assert trace["otherData"] == {"run_parse_s": 0.001}
+
+
+def test_speculative_prefilters_use_their_own_track() -> None:
+    program = parse_program(
+        "Draft intro\n/OUT intro\n/THEN Use notes\n/FROM key tasks /IN @notes\n/OUT done",
+        predeclared_vars=["notes"],
+    )
+    started = threading.Event()
+
+    def fake_cheap(prompt: str) -> str:
+        started.set()
+        return "TASKS"
+
+    def fake_main(prompt: str, _: dict) -> str:
+        if "Draft intro" in prompt:
+            started.wait(timeout=5)
+        return json.dumps({"error": 0, "out": "ok"})
+
+    _, logs, _ = execute_program(
+        program,
+        {"notes": "A"},
+        call_model=fake_main,
+        cheap_model_call=fake_cheap,
+        prefetch_prefilters=True,
+    )
+
+    events = _complete_events(build_chrome_trace(logs))
+    prefilter = next(event for event in events if event["cat"] == "prefilter")
+    first_step = next(event for event in events if event["cat"] == "step")
+
+    assert prefilter["tid"] == 2
+    assert prefilter["args"]["speculative"] is True
+    assert prefilter["ts"] < first_step["ts"] + first_step["dur"]
+
+
+def test_concurrent_prefetches_get_separate_tracks() -> None:
+    def prefilter(description: str, start: float, duration: float) -> dict:
+        return {
+            "description": description,
+            "speculative": True,
+            "started_at_s": start,
+            "duration_s": duration,
+        }
+
+    step = {
+        "node_kind": "step",
+        "node_path": [1],
+        "timings": {"started_at_s": 0.5, "total_s": 0.1},
+        "prefilter_logs": [
+            prefilter("tasks", 0.1, 0.3),
+            prefilter("owners", 0.2, 0.3),
+            prefilter("dates", 0.45, 0.01),
+        ],
+    }
+
+    trace = build_chrome_trace([step])
+    tids = {event["name"]: event["tid"] for event in _complete_events(trace) if event["cat"] == "prefilter"}
+    lanes = [event["tid"] for event in trace["traceEvents"] if event["name"] == "thread_name"]
+
+    assert tids["prefilter tasks"] != tids["prefilter owners"]
+    assert tids["prefilter dates"] == tids["prefilter tasks"] == 2
+    assert lanes == [1, 2, 3]
+
+
+def test_logs_without_timings_export_only_metadata() -> None:
+    payload = json.loads(chrome_trace_json([{"node_kind": "step", "text": "old"}]))
+
+    assert all(event["ph"] == "M" for event in payload["traceEvents"])
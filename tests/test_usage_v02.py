@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+
+from chatdsl_core.executor_v02 import ModelReply, execute_program
+from chatdsl_core.parser_v02 import parse_program
+from chatdsl_core.usage_v02 import summarize_chat_usage, summarize_log_usage
+
+
+def _reply(text: str, prompt_tokens: int, output_tokens: int, retries: int = 0) -> ModelReply:
+    return ModelReply(
+        text=text,
+        metadata={
+            "model": "m",
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "candidates_tokens": output_tokens,
+                "total_tokens": prompt_tokens + output_tokens,
+            },
+            "latency_s": 0.5,
+            "retries": retries,
+        },
+    )
+
+
+def test_executor_records_model_call_metadata_per_step_and_prefilter() -> None:
+    program = parse_program(
+        "Summarize\n/FROM key tasks /IN @notes\n/OUT done",
+        predeclared_vars=["notes"],
+    )
+
+    _, logs, outputs = execute_program(
+        program,
+        {"notes": "A"},
+        call_model=lambda _p, _s: _reply(json.dumps({"error": 0, "out": "ok"}), 10, 2),
+        cheap_model_call=lambda _p: _reply("TASKS", 4, 1, retries=1),
+    )
+
+    assert outputs == ["ok"]
+    assert logs[0]["model_call"]["usage"]["total_tokens"] == 12
+    assert logs[0]["prefilter_logs"][0]["model_call"]["retries"] == 1
+    assert logs[0]["raw_response"] == json.dumps({"error": 0, "out": "ok"})
+
+    summary = summarize_log_usage(logs)
+    assert summary["calls"] == 2
+    assert summary["prompt_tokens"] == 14
+    assert summary["candidates_tokens"] == 3
+    assert summary["retries"] == 1
+    assert summary["latency_s"] == 1.0
+
+
+def test_plain_string_callers_leave_model_call_empty() -> None:
+    program = parse_program("Hello\n/OUT hi")
+
+    _, logs, _ = execute_program(
+        program, {}, call_model=lambda _p, _s: json.dumps({"error": 0, "out": "hi"})
+    )
+
+    assert logs[0]["model_call"] is None
+    assert summarize_log_usage(logs)["calls"] == 0
+
+
+def test_summarize_chat_usage_covers_dsl_runs_and_raw_replies() -> None:
+    step_log = {
+        "node_kind": "step",
+        "model_call": {"usage": {"prompt_tokens": 5, "total_tokens": 6}},
+        "prefilter_logs": [],
+    }
+    history = [
+        {"role": "user", "mode": "dsl", "meta": {"execution_logs": [step_log, {"node_kind": "if"}]}},
+        {"role": "assistant", "mode": "dsl", "meta": {"step_log": step_log}},
+        {"role": "user", "mode": "raw", "meta": {}},
+        {
+            "role": "assistant",
+            "mode": "raw",
+            "meta": {"model_call": {"usage": {"prompt_tokens": 7, "total_tokens": 9}}},
+        },
+    ]
+
+    summary = summarize_chat_usage(history)
+
+    assert summary["calls"] == 2
+    assert summary["prompt_tokens"] == 12
+    assert summary["total_tokens"] == 15
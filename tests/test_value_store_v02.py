@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from chatdsl_core import value_store_v02
+from chatdsl_core.executor_v02 import _build_builtin_values, execute_program
+from chatdsl_core.parser_v02 import parse_program
+from chatdsl_core.value_store_v02 import (
+    externalize_large_values,
+    gc_values,
+    is_value_ref,
+    materialize_values,
+    read_value,
+    read_value_prefix,
+    referenced_value_digests,
+    store_value,
+)
+
+
+def _set_values_dir(tmp_path: Path) -> None:
+    value_store_v02._VALUES_DIR = tmp_path / "values"
+
+
+def test_store_value_round_trips_through_mmap(tmp_path: Path) -> None:
+    _set_values_dir(tmp_path)
+    text = "naïve document\n" * 1000
+
+    ref = store_value(text)
+
+    assert is_value_ref(ref)
+    assert ref["bytes"] == len(text.encode("utf-8"))
+    assert read_value(ref) == text
+    assert read_value_prefix(ref, 7) == "naïve d"
+    assert store_value(text) == ref
+
+
+def test_externalize_large_values_only_moves_big_strings(tmp_path: Path) -> None:
+    _set_values_dir(tmp_path)
+    big = "x" * 100
+
+    out = externalize_large_values({"big": big, "small": "hi", "n": 3}, threshold_bytes=64)
+
+    assert is_value_ref(out["big"])
+    assert out["small"] == "hi"
+    assert out["n"] == 3
+    assert json.loads(json.dumps(out))["big"] == out["big"]
+    assert materialize_values(out) == {"big": big, "small": "hi", "n": 3}
+
+
+def test_read_value_reports_missing_values(tmp_path: Path) -> None:
+    _set_values_dir(tmp_path)
+
+    with pytest.raises(ValueError, match="missing from the value store"):
+        read_value({"$value_ref": "ab" * 32, "bytes": 1})
+
+
+def test_executor_reads_handles_only_for_prompts_that_need_them(tmp_path: Path) -> None:
+    _set_values_dir(tmp_path)
+    doc_ref = store_value("FULL DOCUMENT TEXT")
+    program = parse_program(
+        "Summarize\n/FROM @doc\n/OUT summary\n/THEN Chat only\n/OUT done",
+        predeclared_vars=["doc"],
+    )
+    prompts: list[str] = []
+
+    def fake_model(prompt: str, _: dict) -> str:
+        prompts.append(prompt)
+        return json.dumps({"error": 0, "out": "ok"})
+
+    ctx, _, _ = execute_program(program, {"doc": doc_ref}, call_model=fake_model)
+
+    assert "- doc: FULL DOCUMENT TEXT" in prompts[0]
+    assert "FULL DOCUMENT TEXT" not in prompts[1]
+    assert ctx["doc"] == doc_ref
+
+
+def test_build_builtin_values_skips_unrequested_builtins() -> None:
+    values = _build_builtin_values({"x": "1"}, ["hello"], names={"CHAT"})
+
+    assert values == {"CHAT": "hello"}
+    assert _build_builtin_values({"x": "1"}, ["hello"], names=set()) == {}
+
+
+def test_reads_hold_no_mapping_after_they_return(tmp_path: Path) -> None:
+    _set_values_dir(tmp_path)
+    ref = store_value("mapped once")
+    empty = store_value("")
+    assert read_value(ref) == "mapped once" and read_value(empty) == ""
+
+    # Nothing keeps the file mapped, so it can be removed and the next read sees that.
+    value_store_v02._value_path(ref["$value_ref"]).unlink()
+    with pytest.raises(ValueError, match="missing from the value store"):
+        read_value(ref)
+
+
+def test_gc_values_sweeps_only_old_unreferenced_values(tmp_path: Path) -> None:
+    _set_values_dir(tmp_path)
+    kept = store_value("kept " * 100)
+    orphan = store_value("orphan " * 100)
+    fresh = store_value("fresh " * 100)
+    old = time.time() - 7200
+    for ref in (kept, orphan):
+        path = value_store_v02._value_path(ref["$value_ref"])
+        os.utime(path, (old, old))
+    state = {"chats": [{"failed_run": {"checkpoint": {"initial_vars": {"doc": kept}}}}]}
+
+    assert referenced_value_digests(state) == {kept["$value_ref"]}
+    summary = gc_values(referenced_value_digests(state), max_age_s=3600)
+
+    assert (summary["removed"], summary["remaining"]) == (1, 2)
+    assert read_value(kept) == "kept " * 100 and read_value(fresh) == "fresh " * 100
+    with pytest.raises(ValueError, match="missing"):
+        read_value(orphan)
+    # Storing an existing value again renews its age.
+    os.utime(value_store_v02._value_path(kept["$value_ref"]), (old, old))
+    store_value("kept " * 100)
+    assert gc_values(set(), max_age_s=3600)["remaining"] == 2
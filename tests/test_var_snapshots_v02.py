@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+
+from chatdsl_core import var_snapshots_v02
+from chatdsl_core.var_snapshots_v02 import (
+    apply_vars_delta,
+    diff_vars,
+    record_vars_snapshots,
+    resolve_vars_snapshot,
+)
+from chatdsl_core.versioning_v02 import build_edit_run_context
+
+
+def _append_run(history: list[dict], msg_id: str, vars_before: dict, vars_after: dict) -> dict:
+    meta: dict = {"thread_id": msg_id, "version": 1, "run_id": f"run-{msg_id}"}
+    record_vars_snapshots(history, msg_id, meta, vars_before, vars_after)
+    msg = {"id": msg_id, "role": "user", "mode": "dsl", "content": msg_id, "meta": meta}
+    history.append(msg)
+    history.append({"id": f"a-{msg_id}", "role": "assistant", "mode": "dsl", "content": "ok"})
+    return msg
+
+
+def test_diff_and_apply_round_trip() -> None:
+    base = {"a": 1, "b": "keep", "c": True}
+    target = {"a": 2, "b": "keep", "d": "new"}
+
+    set_vals, unset = diff_vars(base, target)
+
+    assert set_vals == {"a": 2, "d": "new"}
+    assert unset == ["c"]
+    assert apply_vars_delta(base, {"set": set_vals, "unset": unset}) == target
+
+
+def test_unchanged_vars_between_runs_store_empty_deltas() -> None:
+    history: list[dict] = []
+    big = "document " * 500
+    _append_run(history, "m1", {}, {"doc": big, "n": 1})
+    second = _append_run(history, "m2", {"doc": big, "n": 1}, {"doc": big, "n": 2})
+
+    before_delta = second["meta"]["vars_before_delta"]
+    after_delta = second["meta"]["vars_after_delta"]
+    assert before_delta["base"] == "m1:after"
+    assert before_delta["set"] == {} and before_delta["unset"] == []
+    assert after_delta["set"] == {"n": 2}
+    assert "vars_before" not in second["meta"]
+    assert big not in json.dumps(second["meta"])
+    assert resolve_vars_snapshot(history, second, "after") == {"doc": big, "n": 2}
+
+
+def test_keyframes_bound_reconstruction_chain() -> None:
+    history: list[dict] = []
+    vars_now: dict = {}
+    msgs = []
+    for i in range(40):
+        next_vars = dict(vars_now)
+        next_vars[f"v{i % 5}"] = i
+        msgs.append(_append_run(history, f"m{i}", vars_now, next_vars))
+        vars_now = next_vars
+
+    depths = [m["meta"]["vars_after_delta"]["depth"] for m in msgs]
+    assert max(depths) < var_snapshots_v02._KEYFRAME_INTERVAL
+    assert any(m["meta"]["vars_before_delta"]["base"] is None for m in msgs[1:])
+    assert resolve_vars_snapshot(history, msgs[-1], "after") == vars_now
+    assert resolve_vars_snapshot(history, msgs[10], "before") == resolve_vars_snapshot(
+        history, msgs[9], "after"
+    )
+
+
+def test_resolve_reads_legacy_full_snapshots_and_deltas_on_top() -> None:
+    history = [
+        {
+            "id": "legacy",
+            "role": "user",
+            "mode": "dsl",
+            "meta": {"vars_before": {}, "vars_after": {"x": "old"}},
+        }
+    ]
+    msg = _append_run(history, "m2", {"x": "old"}, {"x": "new"})
+
+    assert resolve_vars_snapshot(history, history[0], "after") == {"x": "old"}
+    assert msg["meta"]["vars_before_delta"]["base"] == "legacy:after"
+    assert resolve_vars_snapshot(history, msg, "after") == {"x": "new"}
+
+
+def test_build_edit_run_context_reconstructs_delta_vars_before() -> None:
+    history: list[dict] = []
+    _append_run(history, "m1", {}, {"topic": "a"})
+    _append_run(history, "m2", {"topic": "a"}, {"topic": "b", "extra": 1})
+
+    ctx = build_edit_run_context(history, "m2")
+
+    assert ctx.vars_before == {"topic": "a"}
+
+
+def test_edit_branch_deltas_skip_runs_from_other_branches() -> None:
+    history: list[dict] = []
+    _append_run(history, "m1", {}, {"topic": "a"})
+    _append_run(history, "m2", {"topic": "a"}, {"topic": "b", "extra": 1})
+    timeline = build_edit_run_context(history, "m2").visible_history_before
+
+    meta: dict = {"edited_from_message_id": "m2", "source_cutoff_index": 3}
+    record_vars_snapshots(
+        history,
+        "m2b",
+        meta,
+        {"topic": "a"},
+        {"topic": "c"},
+        timeline=timeline,
+        messages_by_id=var_snapshots_v02.index_messages_by_id(history),
+    )
+    history.append({"id": "m2b", "role": "user", "mode": "dsl", "content": "m2b", "meta": meta})
+
+    # The edit replaces m2, so its vars_before is based on m1, not on the discarded m2.
+    assert meta["vars_before_delta"]["base"] == "m1:after"
+    assert meta["vars_before_delta"]["set"] == {} and meta["vars_before_delta"]["unset"] == []
+    assert resolve_vars_snapshot(history, history[-1], "after") == {"topic": "c"}
@@ -60,3 +60,36 @@ def test_resolve_vars_panel_data_returns_none_for_non_dsl_mode() -> None:
     )
 
     assert vars_data is None
+
+
+def test_resolve_vars_panel_data_reconstructs_delta_snapshots_from_chat_history() -> None:
+    history = [
+        {
+            "id": "m1",
+            "role": "user",
+            "mode": "dsl",
+            "meta": {
+                "vars_before_delta": {"base": None, "depth": 0, "set": {}, "unset": []},
+                "vars_after_delta": {"base": "m1:before", "depth": 1, "set": {"x": 1}, "unset": []},
+            },
+        },
+        {
+            "id": "m2",
+            "role": "user",
+            "mode": "dsl",
+            "meta": {
+                "vars_before_delta": {"base": "m1:after", "depth": 2, "set": {}, "unset": []},
+                "vars_after_delta": {"base": "m2:before", "depth": 3, "set": {"y": 2}, "unset": []},
+            },
+        },
+    ]
+
+    vars_data = resolve_vars_panel_data(
+        mode="Use DSL",
+        active_chat={"vars": {}, "history": history},
+        active_last_run=None,
+        history_view_msg=history[1],
+        display_history=[history[1]],
+    )
+
+    assert vars_data == {"x": 1, "y": 2}